@@ -3,38 +3,140 @@ METHEFOR FİNANSAL ÖZGÜRLÜK v2.1 - Web Dashboard Backend
 Flask + SocketIO + RESTful API + SQLite
 """
 
-from flask import Flask, render_template, jsonify, request
-from flask_cors import CORS
-from flask_socketio import SocketIO, emit
-import json
+import hmac
 import os
 import sys
 from pathlib import Path
-from datetime import datetime
-import threading
-import time
 
 # Ana dizin
 BASE_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(BASE_DIR))
 
+# gevent/eventlet modunda monkey patch diğer import'lardan önce yapılmalı
+from src.concurrency import ASYNC_MODE, monkey_patch, run_blocking, offload, server_run_options
+monkey_patch()
+
+import threading
+import time
+import uuid
+
+# Açılış süresi raporu (aşamalar aşağıda işaretlenir, modül sonunda loglanır)
+from src.monitoring.startup import StartupReport
+startup_report = StartupReport('dashboard')
+
+from flask import Flask, render_template, jsonify, request, has_request_context, g, Response
+from flask.json.provider import JSONProvider
+from flask_cors import CORS
+from flask_socketio import SocketIO, emit
+from sqlalchemy import func, or_
+from datetime import datetime, timedelta
+
 # Database Imports
-from src.database import init_db, get_session, NewsItem, TechnicalResult, Signal, PortfolioItem, PortfolioSnapshot
+from src.database import (init_db, get_session, keyset_page, NewsItem, TechnicalResult, Signal,
+                          PortfolioItem, PortfolioSnapshot, TradeExecution, PriceBar, CycleMetric,
+                          CycleMetricDetail, DiscoveredSymbol)
+from src.serialization import (dumps, loads, packb, to_json, HAS_MSGPACK, MSGPACK_MIMETYPES,
+                               SocketIOJSON)
+from src.charting.downsample import epoch_seconds, lttb_indices, bucket_ohlc, aggregate_ohlc, to_columns
+from src.config_store import get_watchlist_store, get_config_store
+from src.monitoring import prometheus as prom
+from src.monitoring.profiling import get_profiler
 from src.ai.chatbot import AIChatbot
 from src.trading.paper import PaperTrader
+startup_report.mark('imports')
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    jsonify için hızlı encoder (orjson + NumPy).
+    İstemci Accept: application/msgpack gönderirse yanıt MessagePack olarak döner.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return to_json(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if HAS_MSGPACK and has_request_context():
+            best = request.accept_mimetypes.best_match(('application/json',) + MSGPACK_MIMETYPES)
+            if best in MSGPACK_MIMETYPES:
+                response = self._app.response_class(packb(obj), mimetype=best)
+                response.vary.add('Accept')
+                return response
+        response = self._app.response_class(dumps(obj) + b'\n', mimetype='application/json')
+        if HAS_MSGPACK:
+            response.vary.add('Accept')
+        return response
+
 
 app = Flask(__name__, 
             template_folder='templates',
             static_folder='static')
+app.json = FastJSONProvider(app)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+
+# Socket.IO paketleri: varsayılan JSON (hızlı encoder) veya opt-in MessagePack
+# (SOCKETIO_SERIALIZER=msgpack, istemcide socket.io-msgpack-parser gerekir)
+socketio_serializer = os.getenv('SOCKETIO_SERIALIZER', 'default')
+if socketio_serializer == 'msgpack' and not HAS_MSGPACK:
+    print("⚠️ SOCKETIO_SERIALIZER=msgpack fakat msgpack kurulu değil, JSON kullanılacak")
+    socketio_serializer = 'default'
+if socketio_serializer == 'msgpack':
+    from socketio.msgpack_packet import MsgPackPacket as socketio_packet_class
+else:
+    from socketio.packet import Packet as socketio_packet_class
+# Paket sınıfı giden byte'ları /metrics için sayar
+socketio = SocketIO(app, cors_allowed_origins="*", json=SocketIOJSON,
+                    serializer=prom.metered_packet_class(socketio_packet_class), async_mode=ASYNC_MODE)
+startup_report.mark('flask_socketio')
 
 # Database Engine
-db_engine = init_db(str(BASE_DIR / 'methefor.db'))
+db_engine = init_db(os.getenv('METHEFOR_DB_PATH', str(BASE_DIR / 'methefor.db')))
+prom.instrument_engine(db_engine)
+prom.register_engine_collector(lambda: get_session(db_engine))
+startup_report.mark('database')
+
+# Opt-in profil modu (METHEFOR_PROFILE env veya /api/admin/profiling)
+profiler = get_profiler(BASE_DIR / 'config' / 'profiling.json')
+ADMIN_TOKEN = os.getenv('METHEFOR_ADMIN_TOKEN')
+# Engine'in arka planda doldurduğu AI açıklamalarını kontrol etme aralığı (saniye)
+EXPLANATION_POLL_SECONDS = float(os.getenv('METHEFOR_EXPLANATION_POLL_SECONDS', '5'))
+# Panelde gösterilen semboller: watchlist + kayıtlı keşifler + son bu kadar saatte sinyali olanlar
+RECENT_SYMBOL_HOURS = float(os.getenv('METHEFOR_DASHBOARD_RECENT_HOURS', '24'))
+# Sohbet oturumu çerezi (kullanıcı başına ayrı geçmiş)
+CHAT_COOKIE = 'methefor_chat_id'
+# Akışlı sohbet istekleri: socket sid -> {request_id: iptal bayrağı}
+chat_streams = {}
 
 # Watchlist dosya yolu
 WATCHLIST_FILE = BASE_DIR / 'config' / 'watchlist.json'
 SETTINGS_FILE = BASE_DIR / 'config' / 'settings.json'
+DEFAULT_SETTINGS = {"ui": {"theme": "dark"}, "analysis": {"rsi_overbought": 70}}
+
+watchlist_store = get_watchlist_store(WATCHLIST_FILE)
+settings_store = get_config_store(SETTINGS_FILE, default=DEFAULT_SETTINGS)
+startup_report.mark('config')
+
+# Emtia olarak sınıflandırılan semboller (watchlist/add ile aynı liste)
+COMMODITY_SYMBOLS = {'SLV', 'GLD', 'GC=F', 'SI=F'}
+# Günlük barlardan takvim bazlı birleştirilen grafik aralıkları
+CHART_BUCKETS = {
+    '1d': lambda ts: ts.date(),
+    '1wk': lambda ts: ts.isocalendar()[:2],
+    '1mo': lambda ts: (ts.year, ts.month)
+}
+MAX_CHART_POINTS = 5000
+
+DECISION_KEYS = {
+    'STRONG BUY': 'strong_buy',
+    'BUY': 'buy',
+    'HOLD': 'hold',
+    'SELL': 'sell',
+    'STRONG SELL': 'strong_sell'
+}
 
 class AppData:
     """Uygulama verilerini ve ayarlarını yöneten sınıf"""
@@ -43,36 +145,218 @@ class AppData:
         self.latest_news = []
         self.technical_data = {}
         self.portfolio_summary = {}
-        self.chatbot = AIChatbot()
+        self.summary = compute_summary([], [])
+        self.chatbot = AIChatbot(context_provider=self.chat_context)
         self.paper_trader = PaperTrader(lambda: get_session(db_engine))
-        self.settings = self.load_settings()
 
-    def load_settings(self):
-        if SETTINGS_FILE.exists():
-            with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {"ui": {"theme": "dark"}, "analysis": {"rsi_overbought": 70}}
+    def chat_context(self):
+        """Sohbet için sistem durumu metni (DB yerine bellekteki son snapshot'tan)"""
+        holdings = self.portfolio_summary.get('holdings', [])
+        p_text = "Portföy: " + ", ".join(f"{h['symbol']} ({h['quantity']} adet)" for h in holdings if h['quantity'] > 0)
+        recent = sorted(self.current_signals, key=lambda s: s['timestamp'], reverse=True)[:5]
+        s_text = "Son Sinyaller: " + ", ".join(f"{s['symbol']} ({s['decision']})" for s in recent)
+        return f"\n[SİSTEM DURUMU]\n{p_text}\n{s_text}\n"
+
+    @property
+    def settings(self):
+        return settings_store.get()
 
     def save_settings(self, new_settings):
-        self.settings.update(new_settings)
-        with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.settings, f, indent=2, ensure_ascii=False)
+        settings_store.update(lambda settings: settings.update(new_settings))
+
+
+def symbol_category(symbol):
+    """Sembolü özet kategorisine ayır (US, TR, crypto, commodities)"""
+    if symbol.endswith('.IS'):
+        return 'TR'
+    if symbol.endswith('-USD'):
+        return 'crypto'
+    if symbol in COMMODITY_SYMBOLS or symbol.endswith('=F'):
+        return 'commodities'
+    return 'US'
+
+
+def compute_summary(signals, news):
+    """
+    Dashboard özet istatistiklerini tek geçişte hesapla.
+    Snapshot değiştiğinde (load_latest_data) bir kez çağrılır, /api/summary hazır sonucu döndürür.
+    signals listesi combined_score'a göre sıralı gelmelidir.
+    """
+    distribution = dict.fromkeys(DECISION_KEYS.values(), 0)
+    categories = {}
+    
+    for s in signals:
+        key = DECISION_KEYS.get(s['decision'])
+        if key:
+            distribution[key] += 1
+        
+        category = categories.setdefault(symbol_category(s['symbol']), {
+            'total': 0,
+            'signal_distribution': dict.fromkeys(DECISION_KEYS.values(), 0),
+            'avg_score': 0.0
+        })
+        category['total'] += 1
+        category['avg_score'] += s['combined_score']
+        if key:
+            category['signal_distribution'][key] += 1
+    
+    for category in categories.values():
+        category['avg_score'] = category['avg_score'] / category['total']
+    
+    positive_news = 0
+    negative_news = 0
+    for n in news:
+        label = n.get('sentiment', {}).get('label')
+        if label == 'positive':
+            positive_news += 1
+        elif label == 'negative':
+            negative_news += 1
+    
+    return {
+        'total_signals': len(signals),
+        'signal_distribution': distribution,
+        'categories': categories,
+        'news_stats': {
+            'total': len(news),
+            'positive': positive_news,
+            'negative': negative_news,
+            'neutral': len(news) - positive_news - negative_news
+        },
+        'top_signals': signals[:5]
+    }
+
 
 data = AppData()
+startup_report.mark('app_data')
+
+
+def serialize_news(n):
+    """NewsItem satırını API formatına çevir"""
+    related = loads(n.related_symbols) if n.related_symbols else []
+    return {
+        'id': n.id,
+        'source': n.source,
+        'title': n.title,
+        'summary': n.summary,
+        'link': n.link,
+        'published': n.published_date.isoformat() if n.published_date else "",
+        'category': n.category,
+        'sentiment': {
+            'score': n.sentiment_score,
+            'label': n.sentiment_label or ('positive' if n.sentiment_score > 0 else 'negative' if n.sentiment_score < 0 else 'neutral')
+        },
+        'matched_symbol': related[0] if related else None
+    }
+
+
+def serialize_signal(s):
+    """Signal satırını geçmiş (history) API formatına çevir"""
+    return {
+        'id': s.id,
+        'symbol': s.symbol,
+        'decision': s.decision,
+        'combined_score': s.combined_score,
+        'confidence': s.confidence,
+        'sentiment_score': s.news_sentiment_score,
+        'technical_score': s.technical_score,
+        'reasons': loads(s.reasons) if s.reasons else [],
+        'ai_explanation': s.ai_explanation,
+        'timestamp': s.timestamp.isoformat()
+    }
+
+
+def serialize_trade(t):
+    """TradeExecution satırını API formatına çevir"""
+    return {
+        'id': t.id,
+        'symbol': t.symbol,
+        'action': t.action,
+        'quantity': t.quantity,
+        'price': t.price,
+        'total_amount': t.total_amount,
+        'pnl': t.pnl,
+        'timestamp': t.timestamp.isoformat()
+    }
+
+
+def parse_page_args(max_limit=200, default_limit=50):
+    """Sayfalama query parametrelerini oku: limit, cursor, from, to (ISO 8601)"""
+    limit = max(1, min(request.args.get('limit', default_limit, type=int), max_limit))
+    start = request.args.get('from')
+    end = request.args.get('to')
+    return {
+        'limit': limit,
+        'cursor': request.args.get('cursor'),
+        'start': datetime.fromisoformat(start) if start else None,
+        'end': datetime.fromisoformat(end) if end else None
+    }
+
+
+def paginated_response(model, ts_column, serializer, key, symbol_filter=True):
+    """Keyset sayfalı geçmiş endpoint'lerinin ortak gövdesi"""
+    try:
+        page_args = parse_page_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    session = get_session(db_engine)
+    try:
+        query = session.query(model)
+        symbol = request.args.get('symbol')
+        if symbol_filter and symbol:
+            query = query.filter(model.symbol == symbol.upper())
+        
+        rows, next_cursor = keyset_page(query, ts_column, model.id, **page_args)
+        return jsonify({
+            'success': True,
+            'count': len(rows),
+            key: [serializer(r) for r in rows],
+            'next_cursor': next_cursor
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    finally:
+        session.close()
+
+
+def current_symbols(session) -> set:
+    """Engine'in şu an izlediği semboller: watchlist + son keşif taramasının sonucu"""
+    symbols = set(watchlist_store.get_engine_symbols())
+    symbols.update(symbol for (symbol,) in session.query(DiscoveredSymbol.symbol))
+    return symbols
 
 
+def latest_ids(session, model, symbols: set):
+    """
+    Sembol başına en son satırın id'si (alt sorgu). Yalnızca izlenen semboller ve
+    son RECENT_SYMBOL_HOURS içinde yazılanlar; watchlist'ten çıkarılan veya eskiden
+    keşfedilen semboller panelde kalmaz.
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=RECENT_SYMBOL_HOURS)
+    return session.query(func.max(model.id)) \
+        .filter(or_(model.symbol.in_(symbols), model.timestamp >= cutoff)) \
+        .group_by(model.symbol)
+
+
+@prom.LOAD_LATEST_DURATION.time()
+@profiler.profiled('load_latest_data')
 def load_latest_data():
     """En son veriyi veritabanından yükle"""
     session = get_session(db_engine)
     try:
-        # 1. Signals
-        db_signals = session.query(Signal).order_by(Signal.timestamp.desc()).limit(100).all()
+        symbols = current_symbols(session)
+        
+        # 1. Signals (sembol başına en son satır; engine girdisi değişmeyen sembolleri yeniden yazmaz)
+        latest_signal_ids = latest_ids(session, Signal, symbols)
+        db_signals = session.query(Signal).filter(Signal.id.in_(latest_signal_ids)) \
+            .order_by(Signal.timestamp.desc()).all()
         
         temp_signals = {}
         for s in db_signals:
             if s.symbol not in temp_signals:
-                reasons = json.loads(s.reasons) if s.reasons else []
+                reasons = loads(s.reasons) if s.reasons else []
                 formatted_sig = {
+                    'id': s.id,
                     'symbol': s.symbol,
                     'decision': s.decision,
                     'combined_score': s.combined_score,
@@ -99,30 +383,17 @@ def load_latest_data():
 
         # 2. News
         db_news = session.query(NewsItem).order_by(NewsItem.published_date.desc()).limit(50).all()
-        data.latest_news = []
-        for n in db_news:
-            data.latest_news.append({
-                'id': n.id,
-                'source': n.source,
-                'title': n.title,
-                'summary': n.summary,
-                'link': n.link,
-                'published': n.published_date.isoformat() if n.published_date else "",
-                'category': n.category,
-                'sentiment': {
-                    'score': n.sentiment_score,
-                    'label': n.sentiment_label or ('positive' if n.sentiment_score > 0 else 'negative' if n.sentiment_score < 0 else 'neutral')
-                },
-                'matched_symbol': json.loads(n.related_symbols)[0] if n.related_symbols and len(json.loads(n.related_symbols)) > 0 else None
-            })
+        data.latest_news = [serialize_news(n) for n in db_news]
 
         # 3. Technical
-        db_tech = session.query(TechnicalResult).order_by(TechnicalResult.timestamp.desc()).limit(100).all()
+        latest_tech_ids = latest_ids(session, TechnicalResult, symbols)
+        db_tech = session.query(TechnicalResult).filter(TechnicalResult.id.in_(latest_tech_ids)) \
+            .order_by(TechnicalResult.timestamp.desc()).all()
         
         data.technical_data = {}
         for t in db_tech:
             if t.symbol not in data.technical_data:
-                details = json.loads(t.details) if t.details else {}
+                details = loads(t.details) if t.details else {}
                 data.technical_data[t.symbol] = details
                 
                 matching_signal = next((s for s in data.current_signals if s['symbol'] == t.symbol), None)
@@ -154,12 +425,72 @@ def load_latest_data():
                     'pnl': (p.current_price - p.average_price) / p.average_price * 100 if p.average_price else 0
                 })
         data.portfolio_summary['total_equity'] = equity
+        
+        # 5. Özet (snapshot değiştiğinde bir kez hesaplanır)
+        data.summary = compute_summary(data.current_signals, data.latest_news)
         print(f"✓ DB Data yüklendi: {len(data.current_signals)} sinyal, Portfolio: ${equity:.2f}")
     finally:
         session.close()
 
 
 # Routes
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    # Profil modu açıksa isteklerin sample_rate kadarı profillenir
+    if profiler.mode != 'off' and request.url_rule is not None:
+        block = profiler.profile_block(f"{request.method} {request.url_rule.rule}")
+        block.__enter__()
+        g.profile_block = block
+
+
+@app.after_request
+def record_request_latency(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        prom.observe_request(request.method, route, response.status_code, time.perf_counter() - start)
+    return response
+
+
+@app.teardown_request
+def finish_request_profile(exc):
+    block = g.pop('profile_block', None)
+    if block is not None:
+        block.__exit__(None, None, None)
+
+
+@app.route('/metrics')
+@offload
+def metrics():
+    """Prometheus text exposition format"""
+    body, content_type = prom.render_metrics()
+    return Response(body, content_type=content_type)
+
+
+@app.route('/api/admin/profiling', methods=['GET', 'POST'])
+def admin_profiling():
+    """
+    Profil modunu görüntüle/değiştir.
+    POST {"mode": "off"|"cpu"|"memory", "sample_rate": 0.05}
+    X-Admin-Token başlığı METHEFOR_ADMIN_TOKEN ile eşleşmelidir; token tanımlı değilse
+    endpoint kapalıdır (her istek 403).
+    """
+    token = request.headers.get('X-Admin-Token') or ''
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        return jsonify({'success': False, 'error': 'Yetkisiz'}), 403
+    
+    if request.method == 'POST':
+        req_data = request.get_json(silent=True) or {}
+        try:
+            status = profiler.configure(req_data.get('mode'), req_data.get('sample_rate'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        return jsonify({'success': True, 'profiling': status})
+    
+    return jsonify({'success': True, 'profiling': profiler.status()})
+
+
 @app.route('/')
 def index():
     """Ana dashboard sayfası"""
@@ -201,6 +532,27 @@ def get_news():
     })
 
 
+@app.route('/api/history/news')
+@offload
+def get_news_history():
+    """Haber geçmişi (cursor sayfalı, from/to filtreli)"""
+    return paginated_response(NewsItem, NewsItem.published_date, serialize_news, 'news', symbol_filter=False)
+
+
+@app.route('/api/history/signals')
+@offload
+def get_signal_history():
+    """Sinyal geçmişi (cursor sayfalı, from/to ve symbol filtreli)"""
+    return paginated_response(Signal, Signal.timestamp, serialize_signal, 'signals')
+
+
+@app.route('/api/history/trades')
+@offload
+def get_trade_history():
+    """İşlem geçmişi (cursor sayfalı, from/to ve symbol filtreli)"""
+    return paginated_response(TradeExecution, TradeExecution.timestamp, serialize_trade, 'trades')
+
+
 @app.route('/api/news/<symbol>')
 def get_symbol_news(symbol):
     """Belirli bir sembolün haberlerini döndür"""
@@ -233,38 +585,10 @@ def get_technical(symbol):
 
 @app.route('/api/summary')
 def get_summary():
-    """Dashboard özet istatistikleri"""
-    
-    strong_buy = sum(1 for s in data.current_signals if s['decision'] == 'STRONG BUY')
-    buy = sum(1 for s in data.current_signals if s['decision'] == 'BUY')
-    hold = sum(1 for s in data.current_signals if s['decision'] == 'HOLD')
-    sell = sum(1 for s in data.current_signals if s['decision'] == 'SELL')
-    strong_sell = sum(1 for s in data.current_signals if s['decision'] == 'STRONG SELL')
-    
-    top_signals = sorted(data.current_signals, key=lambda x: x['combined_score'], reverse=True)[:5]
-    
-    positive_news = sum(1 for n in data.latest_news if n.get('sentiment', {}).get('label') == 'positive')
-    negative_news = sum(1 for n in data.latest_news if n.get('sentiment', {}).get('label') == 'negative')
-    
+    """Dashboard özet istatistikleri (load_latest_data'da önceden hesaplanır)"""
     return jsonify({
         'success': True,
-        'summary': {
-            'total_signals': len(data.current_signals),
-            'signal_distribution': {
-                'strong_buy': strong_buy,
-                'buy': buy,
-                'hold': hold,
-                'sell': sell,
-                'strong_sell': strong_sell
-            },
-            'news_stats': {
-                'total': len(data.latest_news),
-                'positive': positive_news,
-                'negative': negative_news,
-                'neutral': len(data.latest_news) - positive_news - negative_news
-            },
-            'top_signals': top_signals
-        },
+        'summary': data.summary,
         'timestamp': datetime.now().isoformat()
     })
 
@@ -290,11 +614,11 @@ def execute_trade():
     if not symbol or not side or quantity <= 0 or price <= 0:
         return jsonify({'success': False, 'error': 'Eksik veya geçersiz veri.'}), 400
 
-    success, message = data.paper_trader.execute_manual_trade(symbol, side, quantity, price)
+    success, message = run_blocking(data.paper_trader.execute_manual_trade, symbol, side, quantity, price)
     
     if success:
         # Portföyü hemen güncelle ve client'lara yayınla
-        load_latest_data()
+        run_blocking(load_latest_data)
         socketio.emit('data_update', {
             'portfolio': data.portfolio_summary,
             'timestamp': datetime.now().isoformat()
@@ -305,24 +629,210 @@ def execute_trade():
         return jsonify({'success': False, 'error': message}), 400
 
 @app.route('/api/portfolio/history')
+@offload
 def get_portfolio_history():
-    """Portföy değer geçmişini döndür"""
+    """
+    Portföy değer geçmişini döndür.
+    En yeni snapshot'lardan geriye doğru sayfalanır; her sayfa grafik için eskiden yeniye sıralıdır.
+    Daha eski sayfa için next_cursor kullanılır.
+    """
+    try:
+        page_args = parse_page_args(max_limit=1000, default_limit=100)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
     session = get_session(db_engine)
     try:
-        # Son 30 snapshot'ı getir
-        history = session.query(PortfolioSnapshot).order_by(PortfolioSnapshot.timestamp.asc()).limit(100).all()
+        history, next_cursor = keyset_page(
+            session.query(PortfolioSnapshot), PortfolioSnapshot.timestamp, PortfolioSnapshot.id, **page_args
+        )
         result = []
-        for h in history:
+        for h in reversed(history):
             result.append({
                 'equity': h.total_equity,
                 'cash': h.cash,
                 'holdings': h.holdings_value,
                 'time': h.timestamp.isoformat()
             })
-        return jsonify({'success': True, 'history': result})
+        return jsonify({'success': True, 'history': result, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     finally:
         session.close()
 
+def parse_chart_args(default_points=500):
+    """Grafik endpoint'leri için from/to/max_points parametrelerini oku"""
+    start = request.args.get('from')
+    end = request.args.get('to')
+    max_points = request.args.get('max_points', default_points, type=int)
+    return (
+        datetime.fromisoformat(start) if start else None,
+        datetime.fromisoformat(end) if end else None,
+        max(3, min(max_points, MAX_CHART_POINTS))
+    )
+
+
+@app.route('/api/ohlcv/<symbol>')
+@offload
+def get_ohlcv(symbol):
+    """
+    Yerel önbellekten OHLCV serisi (kolon dizileri).
+    style=candle: mumlar interval'e göre birleştirilir, max_points'i aşarsa gruplanır.
+    style=line: kapanış fiyatı LTTB ile max_points'e indirgenir.
+    """
+    symbol_upper = symbol.upper()
+    interval = request.args.get('interval', '1d')
+    style = request.args.get('style', 'candle')
+    try:
+        start, end, max_points = parse_chart_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    # Takvim aralıkları günlük barlardan türetilir, diğerleri doğrudan saklanan aralıktan okunur
+    source_interval = '1d' if interval in CHART_BUCKETS else interval
+    
+    session = get_session(db_engine)
+    try:
+        query = session.query(
+            PriceBar.timestamp, PriceBar.open, PriceBar.high, PriceBar.low, PriceBar.close, PriceBar.volume
+        ).filter(PriceBar.symbol == symbol_upper, PriceBar.interval == source_interval)
+        if start:
+            query = query.filter(PriceBar.timestamp >= start)
+        if end:
+            query = query.filter(PriceBar.timestamp < end)
+        candles = [tuple(r) for r in query.order_by(PriceBar.timestamp.asc()).all()]
+    finally:
+        session.close()
+    
+    if not candles:
+        return jsonify({'success': False, 'error': f'OHLCV data not found for {symbol_upper}'}), 404
+    
+    raw_count = len(candles)
+    if interval in CHART_BUCKETS and interval != source_interval:
+        candles = bucket_ohlc(candles, CHART_BUCKETS[interval])
+    
+    if style == 'line':
+        xs = [epoch_seconds(c[0]) for c in candles]
+        ys = [c[4] for c in candles]
+        idx = lttb_indices(xs, ys, max_points)
+        series = {'t': [xs[i] for i in idx], 'c': [ys[i] for i in idx]}
+    else:
+        candles = aggregate_ohlc(candles, max_points)
+        series = to_columns(
+            [(epoch_seconds(c[0]),) + tuple(c[1:]) for c in candles],
+            ('t', 'o', 'h', 'l', 'c', 'v')
+        )
+    
+    return jsonify({
+        'success': True,
+        'symbol': symbol_upper,
+        'interval': interval,
+        'style': style,
+        'raw_count': raw_count,
+        'count': len(series['t']),
+        'series': series
+    })
+
+
+@app.route('/api/portfolio/equity')
+@offload
+def get_equity_curve():
+    """Portföy equity eğrisi (LTTB ile max_points'e indirgenmiş kolon dizileri)"""
+    try:
+        start, end, max_points = parse_chart_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    session = get_session(db_engine)
+    try:
+        query = session.query(
+            PortfolioSnapshot.timestamp, PortfolioSnapshot.total_equity,
+            PortfolioSnapshot.cash, PortfolioSnapshot.holdings_value
+        ).filter(PortfolioSnapshot.timestamp.isnot(None))
+        if start:
+            query = query.filter(PortfolioSnapshot.timestamp >= start)
+        if end:
+            query = query.filter(PortfolioSnapshot.timestamp < end)
+        rows = query.order_by(PortfolioSnapshot.timestamp.asc(), PortfolioSnapshot.id.asc()).all()
+    finally:
+        session.close()
+    
+    xs = [epoch_seconds(r[0]) for r in rows]
+    idx = lttb_indices(xs, [r[1] for r in rows], max_points)
+    series = to_columns(
+        [(xs[i], rows[i][1], rows[i][2], rows[i][3]) for i in idx],
+        ('t', 'equity', 'cash', 'holdings')
+    )
+    
+    return jsonify({
+        'success': True,
+        'raw_count': len(rows),
+        'count': len(idx),
+        'series': series
+    })
+
+
+
+@app.route('/api/metrics/cycles')
+@offload
+def get_cycle_metrics():
+    """Son N engine döngüsünün aşama metrikleri (?limit=N, en yeni önce)"""
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    
+    session = get_session(db_engine)
+    try:
+        totals = session.query(CycleMetric).filter(CycleMetric.stage == 'cycle') \
+            .order_by(CycleMetric.timestamp.desc(), CycleMetric.id.desc()).limit(limit).all()
+        cycle_ids = [t.cycle_id for t in totals]
+        stages = session.query(CycleMetric).filter(CycleMetric.cycle_id.in_(cycle_ids)) \
+            .order_by(CycleMetric.duration_ms.desc()).all() if cycle_ids else []
+        details = session.query(CycleMetricDetail).filter(CycleMetricDetail.cycle_id.in_(cycle_ids)) \
+            .order_by(CycleMetricDetail.duration_ms.desc()).all() if cycle_ids else []
+    finally:
+        session.close()
+    
+    by_cycle = {cid: [] for cid in cycle_ids}
+    for row in stages:
+        if row.stage != 'cycle':
+            by_cycle[row.cycle_id].append({
+                'stage': row.stage,
+                'calls': row.calls,
+                'duration_ms': row.duration_ms,
+                'items': row.items,
+                'errors': row.errors,
+                'queue_wait_ms': row.queue_wait_ms
+            })
+    
+    # Sembol bazında alt kırılımlar; hata toplamına katılmaz (aşama toplamında zaten sayılı)
+    details_by_cycle = {cid: [] for cid in cycle_ids}
+    for row in details:
+        details_by_cycle[row.cycle_id].append({
+            'stage': row.stage,
+            'detail': row.detail,
+            'calls': row.calls,
+            'duration_ms': row.duration_ms,
+            'items': row.items,
+            'errors': row.errors,
+            'queue_wait_ms': row.queue_wait_ms
+        })
+    
+    cycles = [{
+        'cycle_id': t.cycle_id,
+        'timestamp': t.timestamp.isoformat() if t.timestamp else None,
+        'duration_ms': t.duration_ms,
+        'errors': sum(st['errors'] for st in by_cycle[t.cycle_id]),
+        'stages': by_cycle[t.cycle_id],
+        'details': details_by_cycle[t.cycle_id]
+    } for t in totals]
+    
+    return jsonify({'success': True, 'count': len(cycles), 'cycles': cycles})
+
+
+@app.route('/api/metrics/startup')
+def get_startup_metrics():
+    """Dashboard açılış aşamaları ve ilk kullanımda yüklenen lazy modüller"""
+    return jsonify({'success': True, 'startup': startup_report.summary()})
+
 def record_portfolio_snapshot():
     """Mevcut portföy durumunu geçmişe kaydet"""
     session = get_session(db_engine)
@@ -358,20 +868,28 @@ def handle_settings():
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
-    """AI Chatbot ile konuş"""
+    """AI Chatbot ile konuş (her kullanıcının ayrı, sınırlı geçmişli oturumu vardır)"""
     data_req = request.json
     user_message = data_req.get('message', '')
     
     if not user_message:
         return jsonify({'error': 'Mesaj boş olamaz'}), 400
+    
+    # Oturum kimliği: istekteki session_id, yoksa çerez, o da yoksa yeni kimlik
+    chat_id = str(data_req.get('session_id') or request.cookies.get(CHAT_COOKIE) or uuid.uuid4().hex)[:64]
         
-    response = data.chatbot.send_message(user_message)
+    # Gemini çağrısı sınırlı thread havuzunda; REST/socket istekleri beklemez
+    response = run_blocking(data.chatbot.send_message, user_message, chat_id)
     
-    return jsonify({
+    resp = jsonify({
         'success': True,
         'response': response,
+        'session_id': chat_id,
         'timestamp': datetime.now().isoformat()
     })
+    if request.cookies.get(CHAT_COOKIE) != chat_id:
+        resp.set_cookie(CHAT_COOKIE, chat_id, max_age=30 * 24 * 3600, httponly=True, samesite='Lax')
+    return resp
 
 
 # WebSocket events
@@ -379,6 +897,7 @@ def chat():
 def handle_connect():
     """Client bağlandığında"""
     print('✓ Client connected - Methefor Finansal Özgürlük')
+    prom.SOCKETIO_CONNECTIONS.inc()
     emit('status', {'message': 'Connected to Methefor Financial Freedom'})
     
     emit('initial_data', {
@@ -393,12 +912,16 @@ def handle_connect():
 def handle_disconnect():
     """Client ayrıldığında"""
     print('✗ Client disconnected')
+    prom.SOCKETIO_CONNECTIONS.dec()
+    # Yarım kalan sohbet akışlarını durdur (Gemini parçaları artık okunmaz)
+    for cancelled in chat_streams.pop(request.sid, {}).values():
+        cancelled.set()
 
 
 @socketio.on('request_update')
 def handle_update_request():
     """Client güncelleme istediğinde"""
-    load_latest_data()
+    run_blocking(load_latest_data)
     
     emit('data_update', {
         'signals': data.current_signals[:10],
@@ -407,62 +930,65 @@ def handle_update_request():
     })
 
 
+def stream_chat(sid, request_id, message, chat_id, cancelled):
+    """
+    Yanıt parçalarını üretildikçe chat_chunk olarak gönder.
+    Her parça bloklayan iş havuzunda beklenir; iptal edilirse akış kapatılır ve havuz thread'i serbest kalır.
+    """
+    stream = data.chatbot.stream_message(message, chat_id)
+    try:
+        while not cancelled.is_set():
+            chunk = run_blocking(next, stream, None)
+            if chunk is None:
+                break
+            socketio.emit('chat_chunk', {'request_id': request_id, 'text': chunk}, to=sid)
+        socketio.emit('chat_done', {'request_id': request_id, 'cancelled': cancelled.is_set()}, to=sid)
+    finally:
+        stream.close()
+        chat_streams.get(sid, {}).pop(request_id, None)
+
+
+@socketio.on('chat_message')
+def handle_chat_message(payload):
+    """Akışlı sohbet: {message, request_id?, session_id?} -> chat_chunk* + chat_done"""
+    payload = payload or {}
+    message = str(payload.get('message', '')).strip()
+    request_id = str(payload.get('request_id') or uuid.uuid4().hex)
+    if not message:
+        emit('chat_error', {'request_id': request_id, 'error': 'Mesaj boş olamaz'})
+        return
+    
+    # /api/chat ile aynı oturum: session_id, yoksa bağlantıdaki çerez
+    chat_id = str(payload.get('session_id') or request.cookies.get(CHAT_COOKIE) or request.sid)[:64]
+    cancelled = threading.Event()
+    chat_streams.setdefault(request.sid, {})[request_id] = cancelled
+    socketio.start_background_task(stream_chat, request.sid, request_id, message, chat_id, cancelled)
+    return {'request_id': request_id}
+
+
+@socketio.on('chat_cancel')
+def handle_chat_cancel(payload):
+    """İstemci yanıtı beklemekten vazgeçti"""
+    request_id = str((payload or {}).get('request_id', ''))
+    cancelled = chat_streams.get(request.sid, {}).get(request_id)
+    if cancelled is not None:
+        cancelled.set()
+
+
 # ==========================================
 # WATCHLIST API ENDPOINTS (Existing Logic)
 # ==========================================
 
 @app.route('/api/watchlist', methods=['GET'])
 def get_watchlist():
-    """Watchlist'i getir"""
+    """Watchlist'i getir (önbellekten, dosya yalnızca değiştiğinde okunur)"""
     try:
-        with open(WATCHLIST_FILE, 'r', encoding='utf-8') as f:
-            watchlist = json.load(f)
-        
-        all_symbols = []
-        
-        for category, symbols in watchlist.get('stocks', {}).items():
-            for symbol in symbols:
-                all_symbols.append({
-                    'symbol': symbol,
-                    'category': f'US_{category}',
-                    'type': 'stock',
-                    'market': 'US'
-                })
-        
-        for symbol in watchlist.get('turkish_stocks', []):
-            all_symbols.append({
-                'symbol': symbol,
-                'category': 'Turkish',
-                'type': 'stock',
-                'market': 'TR'
-            })
-        
-        for symbol in watchlist.get('commodities', []):
-            all_symbols.append({
-                'symbol': symbol,
-                'category': 'Commodities',
-                'type': 'commodity',
-                'market': 'GLOBAL'
-            })
-        
-        for symbol in watchlist.get('crypto', []):
-            all_symbols.append({
-                'symbol': symbol,
-                'category': 'Crypto',
-                'type': 'crypto',
-                'market': 'CRYPTO'
-            })
-        
+        all_symbols = watchlist_store.get_entries()
         return jsonify({
             'success': True,
             'watchlist': all_symbols,
             'total': len(all_symbols),
-            'categories': {
-                'US': len([s for s in all_symbols if s['market'] == 'US']),
-                'TR': len([s for s in all_symbols if s['market'] == 'TR']),
-                'Commodities': len([s for s in all_symbols if s['type'] == 'commodity']),
-                'Crypto': len([s for s in all_symbols if s['type'] == 'crypto'])
-            }
+            'categories': watchlist_store.get_categories()
         })
     
     except Exception as e:
@@ -473,64 +999,22 @@ def get_watchlist():
 def add_to_watchlist():
     """Watchlist'e sembol ekle"""
     try:
-        data = request.get_json()
-        symbol = data.get('symbol', '').upper().strip()
-        category = data.get('category', 'custom')
+        req_data = request.get_json()
+        symbol = req_data.get('symbol', '').upper().strip()
+        category = req_data.get('category', 'custom')
         
         if not symbol:
             return jsonify({'success': False, 'error': 'Sembol boş olamaz'}), 400
         
-        # Read from file
-        if os.path.exists(WATCHLIST_FILE):
-             with open(WATCHLIST_FILE, 'r', encoding='utf-8') as f:
-                watchlist = json.load(f)
-        else:
-            watchlist = {'stocks': {'custom': []}}
-
-        all_current = []
-        for cat_symbols in watchlist.get('stocks', {}).values():
-            all_current.extend(cat_symbols)
-        all_current.extend(watchlist.get('turkish_stocks', []))
-        all_current.extend(watchlist.get('commodities', []))
-        all_current.extend(watchlist.get('crypto', []))
-        
-        if symbol in all_current:
-            return jsonify({'success': False, 'error': f'{symbol} zaten watchlist\'te'}), 400
-        
-        if category == 'crypto' or symbol.endswith('-USD'):
-            if 'crypto' not in watchlist:
-                watchlist['crypto'] = []
-            watchlist['crypto'].append(symbol)
-            added_category = 'Crypto'
-        
-        elif category == 'turkish' or symbol.endswith('.IS'):
-            if 'turkish_stocks' not in watchlist:
-                watchlist['turkish_stocks'] = []
-            watchlist['turkish_stocks'].append(symbol)
-            added_category = 'Turkish'
-        
-        elif category in ['SLV', 'GLD', 'GC=F', 'SI=F']:
-            if 'commodities' not in watchlist:
-                watchlist['commodities'] = []
-            watchlist['commodities'].append(symbol)
-            added_category = 'Commodities'
-        
-        else:
-            if 'stocks' not in watchlist:
-                watchlist['stocks'] = {}
-            if 'custom' not in watchlist['stocks']:
-                watchlist['stocks']['custom'] = []
-            watchlist['stocks']['custom'].append(symbol)
-            added_category = 'US_custom'
-        
-        with open(WATCHLIST_FILE, 'w', encoding='utf-8') as f:
-            json.dump(watchlist, f, indent=2, ensure_ascii=False)
+        added, result = watchlist_store.add_symbol(symbol, category, commodity_symbols=COMMODITY_SYMBOLS)
+        if not added:
+            return jsonify({'success': False, 'error': result}), 400
         
         return jsonify({
             'success': True,
             'message': f'{symbol} başarıyla eklendi',
             'symbol': symbol,
-            'category': added_category
+            'category': result
         })
     
     except Exception as e:
@@ -541,47 +1025,16 @@ def add_to_watchlist():
 def remove_from_watchlist():
     """Watchlist'ten sembol sil"""
     try:
-        data = request.get_json()
-        symbol = data.get('symbol', '').upper().strip()
+        req_data = request.get_json()
+        symbol = req_data.get('symbol', '').upper().strip()
         
         if not symbol:
             return jsonify({'success': False, 'error': 'Sembol boş olamaz'}), 400
         
-        with open(WATCHLIST_FILE, 'r', encoding='utf-8') as f:
-            watchlist = json.load(f)
-        
-        removed = False
-        removed_from = ''
-        
-        if 'stocks' in watchlist:
-            for category, symbols in watchlist['stocks'].items():
-                if symbol in symbols:
-                    watchlist['stocks'][category].remove(symbol)
-                    removed = True
-                    removed_from = f'US_{category}'
-                    break
-        
-        if not removed and 'turkish_stocks' in watchlist and symbol in watchlist['turkish_stocks']:
-            watchlist['turkish_stocks'].remove(symbol)
-            removed = True
-            removed_from = 'Turkish'
-        
-        if not removed and 'commodities' in watchlist and symbol in watchlist['commodities']:
-            watchlist['commodities'].remove(symbol)
-            removed = True
-            removed_from = 'Commodities'
-        
-        if not removed and 'crypto' in watchlist and symbol in watchlist['crypto']:
-            watchlist['crypto'].remove(symbol)
-            removed = True
-            removed_from = 'Crypto'
-        
+        removed, removed_from = watchlist_store.remove_symbol(symbol)
         if not removed:
             return jsonify({'success': False, 'error': f'{symbol} watchlist\'te bulunamadı'}), 404
         
-        with open(WATCHLIST_FILE, 'w', encoding='utf-8') as f:
-            json.dump(watchlist, f, indent=2, ensure_ascii=False)
-        
         return jsonify({
             'success': True,
             'message': f'{symbol} başarıyla silindi',
@@ -596,8 +1049,8 @@ def remove_from_watchlist():
 def background_update_task():
     """Arka planda veri güncelleme (her 30 saniye)"""
     while True:
-        time.sleep(30)
-        load_latest_data()
+        socketio.sleep(30)
+        run_blocking(load_latest_data)
         
         socketio.emit('data_update', {
             'signals': data.current_signals[:10],
@@ -607,6 +1060,46 @@ def background_update_task():
         }, namespace='/')
 
 
+def load_new_explanations():
+    """
+    Engine'in açıklama worker'ı ai_explanation'ı sinyal kaydından sonra doldurur.
+    Panelde gösterilen son sinyal satırlarından açıklaması değişenleri bul ve belleğe işle.
+    """
+    shown_ids = [s['id'] for s in data.current_signals if s.get('id') and not s.get('ai_explanation')]
+    if not shown_ids:
+        return []
+    session = get_session(db_engine)
+    try:
+        # Yalnızca panelde açıklaması henüz boş olan satırlar sorgulanır (primary key ile)
+        rows = session.query(Signal.id, Signal.symbol, Signal.ai_explanation) \
+            .filter(Signal.id.in_(shown_ids), Signal.ai_explanation.isnot(None)).all()
+    finally:
+        session.close()
+    
+    current = {s['symbol']: s for s in data.current_signals}
+    updates = []
+    for row_id, symbol, explanation in rows:
+        sig = current.get(symbol)
+        # Panelde henüz olmayan yeni satırlar bir sonraki tam yenilemede gelir
+        if sig is not None and sig.get('id') == row_id and sig.get('ai_explanation') != explanation:
+            sig['ai_explanation'] = explanation
+            updates.append({'id': row_id, 'symbol': symbol, 'ai_explanation': explanation})
+    return updates
+
+
+def explanation_update_task():
+    """Arka planda dolan AI açıklamalarını tam yenilemeyi beklemeden yayınla"""
+    while True:
+        socketio.sleep(EXPLANATION_POLL_SECONDS)
+        try:
+            updates = run_blocking(load_new_explanations)
+        except Exception as e:
+            print(f"⚠️ Açıklama güncelleme hatası: {e}")
+            continue
+        if updates:
+            socketio.emit('signal_explanations', {'updates': updates}, namespace='/')
+
+
 def main():
     """Dashboard'u başlat"""
     
@@ -614,20 +1107,21 @@ def main():
     print("💰 METHEFOR FİNANSAL ÖZGÜRLÜK - WEB DASHBOARD (DB CONNECTED)")
     print("="*60)
     
+    print(f"\n⚙️ Sunucu modu: {ASYNC_MODE}")
+    print(f"⏱️ Açılış: {startup_report.total_ms:.0f} ms (GET /api/metrics/startup)")
     print("\n📊 İlk veri yükleniyor...")
     load_latest_data()
     
-    update_thread = threading.Thread(target=background_update_task, daemon=True)
-    update_thread.start()
+    socketio.start_background_task(background_update_task)
+    socketio.start_background_task(explanation_update_task)
     
     # Her 30 dakikada bir snapshot al (Daha sık takip için 30 dk idealdur)
     def snapshot_loop():
         while True:
-            record_portfolio_snapshot()
-            time.sleep(1800) # 30 dakika
+            run_blocking(record_portfolio_snapshot)
+            socketio.sleep(1800) # 30 dakika
             
-    snapshot_thread = threading.Thread(target=snapshot_loop, daemon=True)
-    snapshot_thread.start()
+    socketio.start_background_task(snapshot_loop)
     
     print("\n✓ Dashboard hazır!")
     print("\n📱 Tarayıcıda aç:")
@@ -635,7 +1129,11 @@ def main():
     print("\n⏹️ Durdurmak için: Ctrl+C")
     print("="*60 + "\n")
     
-    socketio.run(app, host='0.0.0.0', port=5000, debug=False, allow_unsafe_werkzeug=True)
+    socketio.run(app, host='0.0.0.0', port=5000, debug=False, **server_run_options())
+
+
+startup_report.mark('routes')
+startup_report.finish()
 
 
 if __name__ == '__main__':
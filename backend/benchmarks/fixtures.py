@@ -0,0 +1,109 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Benchmark Fixture'ları
+Ağ erişimi olmadan tekrarlanabilir girdiler:
+- Haberler: backend/data/news_*.json kayıtlarından (gerekirse çoğaltılarak)
+- OHLCV: sabit seed'li sentetik geometrik rastgele yürüyüş
+"""
+
+import copy
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BACKEND_DIR / 'data'
+CONFIG_DIR = BACKEND_DIR / 'config'
+
+DEFAULT_SEED = 42
+BAR_END = datetime(2026, 1, 5)
+
+_news_cache = None
+
+
+def recorded_news() -> List[Dict]:
+    """data/news_*.json kayıtlarındaki tekil haberler (link'e göre, dosya sırasıyla)"""
+    global _news_cache
+    if _news_cache is None:
+        seen = set()
+        items = []
+        for path in sorted(DATA_DIR.glob('news_*.json')):
+            with open(path, 'r', encoding='utf-8') as f:
+                for item in json.load(f):
+                    link = item.get('link')
+                    if link in seen:
+                        continue
+                    seen.add(link)
+                    item['title'] = item.get('title') or ''
+                    item['summary'] = item.get('summary') or ''
+                    item.pop('sentiment', None)
+                    items.append(item)
+        if not items:
+            raise RuntimeError(f"{DATA_DIR} altında haber kaydı bulunamadı")
+        _news_cache = items
+    return _news_cache
+
+
+def news_articles(count: int) -> List[Dict]:
+    """
+    count adet haber. Kayıtlar yetmezse kopyalanır; kopyaların link'i
+    benzersiz olacak şekilde değiştirilir (DB tekrar kontrolü gerçekçi kalsın).
+    """
+    base = recorded_news()
+    articles = []
+    for i in range(count):
+        item = copy.deepcopy(base[i % len(base)])
+        copy_no = i // len(base)
+        if copy_no:
+            item['link'] = f"{item.get('link')}#bench-{copy_no}"
+            item['id'] = f"{item.get('id')}-{copy_no}"
+        articles.append(item)
+    return articles
+
+
+def synthetic_ohlcv(symbol: str, bars: int = 300, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    """Sembol başına deterministik günlük OHLCV (yfinance history() ile aynı kolonlar)"""
+    rng = np.random.default_rng([seed, sum(ord(c) for c in symbol)])
+    returns = rng.normal(0.0005, 0.02, bars)
+    close = 100 * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[close[0]], close[:-1]]) * (1 + rng.normal(0, 0.003, bars))
+    spread = np.abs(rng.normal(0, 0.01, bars)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.lognormal(15, 0.5, bars).round()
+
+    index = pd.date_range(end=BAR_END, periods=bars, freq='D', tz='America/New_York')
+    return pd.DataFrame({
+        'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume
+    }, index=index)
+
+
+def symbol_universe(count: int) -> List[str]:
+    return [f"SYN{i:04d}" for i in range(count)]
+
+
+def ohlcv_universe(count: int, bars: int = 300, seed: int = DEFAULT_SEED) -> Dict[str, pd.DataFrame]:
+    return {symbol: synthetic_ohlcv(symbol, bars, seed) for symbol in symbol_universe(count)}
+
+
+def signals_from_technical(technical: Dict[str, Dict]) -> List[Dict]:
+    """Teknik sonuçlardan engine formatında sinyaller (save_to_db / load_latest_data girdisi)"""
+    signals = []
+    for symbol, tech in technical.items():
+        score = tech['overall_score']
+        signals.append({
+            'symbol': symbol,
+            'decision': tech['technical_signals']['decision'],
+            'combined_score': score,
+            'confidence': score,
+            'sentiment_score': 0.0,
+            'technical_score': score,
+            'reasons': tech['technical_signals']['signals'],
+            'ai_explanation': None,
+            'timestamp': BAR_END + timedelta(hours=16)
+        })
+    signals.sort(key=lambda s: s['combined_score'], reverse=True)
+    return signals
@@ -0,0 +1,398 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Benchmark Suite
+Sıcak yolları kayıtlı/sentetik fixture'lar üzerinde farklı ölçeklerde ölçer ve
+karşılaştırılabilir bir JSON raporu yazar.
+
+Kullanım:
+    python benchmarks/run_benchmarks.py                       # tüm ölçekler
+    python benchmarks/run_benchmarks.py --quick               # küçük ölçekler (CI)
+    python benchmarks/run_benchmarks.py --only technical sentiment
+    python benchmarks/run_benchmarks.py --output bench.json --compare baseline.json --threshold 0.2
+
+--compare verilirse medyan süresi baseline'a göre threshold oranından fazla artan
+ölçümler listelenir ve çıkış kodu 2 olur.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fixtures
+
+REPORT_VERSION = 1
+
+
+class Benchmark:
+    """
+    Tek bir ölçüm tanımı. setup(scale) zamanlanmaz ve ya run() ya da
+    (prepare, run) döndürür; ikinci durumda her tekrardan önce prepare() çağrılır
+    (zamanlanmaz) ve sonucu run(state)'e verilir.
+    """
+
+    def __init__(self, name, unit, scales, quick_scales, setup, repeat=None):
+        self.name = name
+        self.unit = unit
+        self.scales = scales
+        self.quick_scales = quick_scales
+        self.setup = setup
+        self.repeat = repeat
+
+
+BENCHMARKS = []
+
+
+def benchmark(name, unit, scales, quick_scales=None, repeat=None):
+    """Benchmark'ı kaydeden dekoratör; dekore edilen fonksiyon setup'tır"""
+    def decorator(setup):
+        BENCHMARKS.append(Benchmark(name, unit, scales, quick_scales or scales[:1], setup, repeat))
+        return setup
+    return decorator
+
+
+# ==========================================
+# TANIMLAR
+# ==========================================
+
+@benchmark('technical.analyze_dataframe', 'symbols', [10, 100, 1000], [10, 100])
+def bench_analyze_dataframe(scale):
+    from src.technical.analyzer import TechnicalAnalyzer
+    analyzer = TechnicalAnalyzer()
+    bars = fixtures.ohlcv_universe(scale)
+
+    def run():
+        for symbol, df in bars.items():
+            result = analyzer.analyze_dataframe(symbol, df)
+            if 'error' in result:
+                raise RuntimeError(f"{symbol}: {result['error']}")
+    return run
+
+
+@benchmark('patterns.check_patterns', 'symbols', [10, 100, 1000], [10, 100])
+def bench_check_patterns(scale):
+    from src.technical.patterns import PatternRecognizer
+    recognizer = PatternRecognizer()
+    bars = fixtures.ohlcv_universe(scale)
+
+    def run():
+        for df in bars.values():
+            recognizer.check_patterns(df)
+    return run
+
+
+@benchmark('backtest.run_backtest', 'symbols', [1, 10], [1], repeat=1)
+def bench_run_backtest(scale):
+    from src.backtesting.engine import BacktestEngine
+    engine = BacktestEngine()
+    bars = fixtures.ohlcv_universe(scale, bars=250)
+    # yfinance yerine fixture verisi
+    engine.load_historical_data = lambda symbol, period, interval: bars[symbol]
+
+    def run():
+        for symbol in bars:
+            engine.run_backtest(symbol, window_size=100)
+    return run
+
+
+@benchmark('sentiment.analyze_news_batch', 'articles', [1000, 100000], [1000])
+def bench_analyze_news_batch(scale):
+    from src.sentiment.analyzer import SentimentAnalyzer
+    analyzer = SentimentAnalyzer(config_path=str(fixtures.CONFIG_DIR / 'news_sources.json'))
+    articles = fixtures.news_articles(scale)
+
+    def run():
+        analyzer.analyze_news_batch(articles)
+    return run
+
+
+@benchmark('rss.filter_relevant_news', 'articles', [1000, 100000], [1000])
+def bench_filter_relevant_news(scale):
+    from src.config_store import get_watchlist_store
+    from src.news.rss_aggregator import RSSNewsAggregator
+    aggregator = RSSNewsAggregator(
+        config_path=str(fixtures.CONFIG_DIR / 'news_sources.json'),
+        watchlist_store=get_watchlist_store(fixtures.CONFIG_DIR / 'watchlist.json')
+    )
+    articles = fixtures.news_articles(scale)
+
+    def run():
+        aggregator.filter_relevant_news(articles)
+    return run
+
+
+def _technical_results(bars):
+    from src.technical.analyzer import TechnicalAnalyzer
+    analyzer = TechnicalAnalyzer()
+    return {symbol: analyzer.analyze_dataframe(symbol, df) for symbol, df in bars.items()}
+
+
+def _bench_engine(db_path, bars):
+    """Yalnızca save_to_db'nin ihtiyaç duyduğu alanlarla engine (modül/API başlatmadan)"""
+    from methefor_engine import MetheforFinancialFreedom
+    from src.database import init_db
+    from src.monitoring.cycle_metrics import NullMetrics
+    from src.technical.analyzer import TechnicalAnalyzer
+
+    engine = MetheforFinancialFreedom.__new__(MetheforFinancialFreedom)
+    engine.db_engine = init_db(db_path)
+    engine.metrics = NullMetrics()
+    engine.technical_analyzer = TechnicalAnalyzer()
+    engine.technical_analyzer.last_history = dict(bars)
+    return engine
+
+
+@benchmark('engine.save_to_db', 'symbols', [10, 100, 1000], [10, 100])
+def bench_save_to_db(scale):
+    from methefor_engine import MetheforFinancialFreedom  # noqa: F401 (eksikse ölçüm atlanır)
+    bars = fixtures.ohlcv_universe(scale)
+    technical = _technical_results(bars)
+    signals = fixtures.signals_from_technical(technical)
+    news = fixtures.news_articles(1000)
+    tmp = tempfile.mkdtemp(prefix='methefor-bench-')
+    runs = [0]
+
+    def prepare():
+        # Her tekrar boş bir DB'ye yazar (aynı link'ler atlanmasın)
+        runs[0] += 1
+        return _bench_engine(os.path.join(tmp, f'save-{runs[0]}.db'), bars)
+
+    def run(engine):
+        engine.save_to_db(news, technical, signals)
+    return prepare, run
+
+
+@benchmark('app.load_latest_data', 'symbols', [10, 100, 1000], [10, 100])
+def bench_load_latest_data(scale):
+    bars = fixtures.ohlcv_universe(scale)
+    technical = _technical_results(bars)
+    signals = fixtures.signals_from_technical(technical)
+    db_path = os.path.join(tempfile.mkdtemp(prefix='methefor-bench-'), 'dashboard.db')
+    engine = _bench_engine(db_path, bars)
+    # Birkaç döngülük geçmiş
+    for cycle in range(3):
+        engine.technical_analyzer.last_history = dict(bars)
+        engine.save_to_db(fixtures.news_articles(200 * (cycle + 1)), technical, signals)
+
+    # Dashboard modülü ortam değişkenindeki DB ile yüklenir (gerçek methefor.db'ye dokunulmaz)
+    os.environ['METHEFOR_DB_PATH'] = db_path
+    import app as dashboard
+    from src.database import init_db
+    dashboard.db_engine = init_db(db_path)
+
+    def run():
+        dashboard.load_latest_data()
+    return run
+
+
+# Yerel LLM gecikmesi (ms): gerçekçi ama kısa tutulur, ölçüm ağ/kota gerektirmez
+BENCH_LLM_LATENCY_MS = (50, 150)
+
+
+def _local_llm():
+    # Sonradan oluşturulan AI bileşenleri de yerel arka ucu seçsin
+    os.environ['METHEFOR_LLM_BACKEND'] = 'local'
+    from src.ai.llm_backend import LocalBackend
+    return LocalBackend(latency_ms=BENCH_LLM_LATENCY_MS, chunk_ms=5, seed=fixtures.DEFAULT_SEED)
+
+
+@benchmark('ai.explain_signals_batch', 'signals', [10, 100], [10], repeat=1)
+def bench_explain_signals_batch(scale):
+    import asyncio
+    from src.ai.analyst import AIAnalyst
+    from src.ai.multi_agent import get_multi_agent_system
+    signals = fixtures.signals_from_technical(_technical_results(fixtures.ohlcv_universe(scale)))
+    news = fixtures.news_articles(3)
+
+    backend = _local_llm()
+    analyst = AIAnalyst()
+    analyst.backend = backend
+    agents = get_multi_agent_system(analyst.provider)
+    agents.backend = backend
+    analyst.enabled = agents.enabled = True
+
+    def run():
+        asyncio.run(analyst.explain_signals_batch_async([(signal, news) for signal in signals]))
+    return run
+
+
+@benchmark('app.chat', 'users', [10, 50], [10], repeat=1)
+def bench_chat(scale):
+    from concurrent.futures import ThreadPoolExecutor
+    backend = _local_llm()
+    import app as dashboard
+    dashboard.data.chatbot.backend = backend
+    client = dashboard.app.test_client()
+    runs = [0]
+
+    def ask(user):
+        for turn in range(3):
+            client.post('/api/chat', json={'message': f'AAPL için görüşün? ({turn})',
+                                           'session_id': f'bench-{runs[0]}-{user}'})
+
+    def run():
+        # Her kullanıcı 3 tur sohbet eder; kullanıcılar eşzamanlı
+        runs[0] += 1
+        with ThreadPoolExecutor(max_workers=scale) as pool:
+            list(pool.map(ask, range(scale)))
+    return run
+
+
+# ==========================================
+# ÇALIŞTIRMA & RAPOR
+# ==========================================
+
+def measure(bench, scale, repeat):
+    try:
+        setup = bench.setup(scale)
+    except ImportError as e:
+        return {'skipped': f"bağımlılık eksik: {e}"}
+
+    if isinstance(setup, tuple):
+        prepare, run = setup
+    else:
+        prepare, run = None, (lambda state: setup())
+
+    def once():
+        state = prepare() if prepare else None
+        gc.collect()
+        start = time.perf_counter()
+        run(state)
+        return time.perf_counter() - start
+
+    once()  # ısınma (import/önbellek etkisini dışarıda bırak)
+    timings = [once() for _ in range(bench.repeat or repeat)]
+
+    median = statistics.median(timings)
+    return {
+        'benchmark': bench.name,
+        'scale': scale,
+        'unit': bench.unit,
+        'repeat': len(timings),
+        'min_s': min(timings),
+        'median_s': median,
+        'mean_s': statistics.fmean(timings),
+        'max_s': max(timings),
+        'per_item_us': median / scale * 1e6
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _package_versions():
+    versions = {}
+    for name in ('pandas', 'numpy', 'sqlalchemy', 'orjson'):
+        try:
+            versions[name] = __import__(name).__version__
+        except Exception:
+            versions[name] = None
+    return versions
+
+
+def run_suite(only=None, quick=False, repeat=3):
+    results = {}
+    for bench in BENCHMARKS:
+        if only and not any(bench.name.startswith(prefix) for prefix in only):
+            continue
+        for scale in (bench.quick_scales if quick else bench.scales):
+            key = f"{bench.name}[{scale}]"
+            print(f"▶ {key} ...", flush=True)
+            try:
+                result = measure(bench, scale, repeat)
+            except Exception as e:
+                result = {'error': f"{type(e).__name__}: {e}"}
+            results[key] = result
+            if 'median_s' in result:
+                print(f"   median {result['median_s'] * 1000:10.2f} ms | "
+                      f"{result['per_item_us']:10.1f} µs/{bench.unit[:-1]}")
+            else:
+                print(f"   {result.get('skipped') or result.get('error')}")
+
+    return {
+        'version': REPORT_VERSION,
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'packages': _package_versions(),
+            'seed': fixtures.DEFAULT_SEED,
+            'quick': quick,
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def compare(report, baseline, threshold):
+    """Baseline'a göre yavaşlayan ölçümleri döndür"""
+    regressions = []
+    print(f"\n{'ölçüm':45s} {'baseline':>12s} {'şimdi':>12s} {'oran':>8s}")
+    for key, result in report['results'].items():
+        base = baseline.get('results', {}).get(key, {})
+        if 'median_s' not in result or 'median_s' not in base:
+            continue
+        ratio = result['median_s'] / base['median_s'] if base['median_s'] else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append({'benchmark': key, 'baseline_s': base['median_s'],
+                                'current_s': result['median_s'], 'ratio': ratio})
+            flag = '  ⚠️ REGRESYON'
+        print(f"{key:45s} {base['median_s'] * 1000:10.2f}ms {result['median_s'] * 1000:10.2f}ms {ratio:7.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Methefor benchmark suite')
+    parser.add_argument('--quick', action='store_true', help='Yalnızca küçük ölçekler')
+    parser.add_argument('--only', nargs='*', help='Ad önekine göre benchmark seç (ör: technical sentiment)')
+    parser.add_argument('--repeat', type=int, default=3, help='Ölçek başına tekrar (varsayılan 3)')
+    parser.add_argument('--output', default=None, help='JSON rapor yolu (varsayılan benchmarks/results/<zaman>.json)')
+    parser.add_argument('--compare', default=None, help='Karşılaştırılacak baseline rapor')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Regresyon eşiği (0.2 = %%20 yavaşlama)')
+    args = parser.parse_args()
+
+    # Modüllerin INFO logları ölçümü gölgelemesin
+    logging.disable(logging.INFO)
+
+    report = run_suite(only=args.only, quick=args.quick, repeat=args.repeat)
+
+    output = Path(args.output) if args.output else \
+        Path(__file__).resolve().parent / 'results' / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        report['regressions'] = compare(report, baseline, args.threshold)
+        report['baseline'] = {'path': args.compare, 'meta': baseline.get('meta'), 'threshold': args.threshold}
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✓ Rapor: {output}")
+
+    if report.get('regressions'):
+        print(f"✗ {len(report['regressions'])} ölçümde regresyon")
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
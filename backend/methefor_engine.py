@@ -6,11 +6,13 @@ TAM ENTEGRE SİSTEM
 + Parallel Processing
 """
 
+from __future__ import annotations
+
 import sys
 import os
 import json
+import hashlib
 import asyncio
-import aiohttp
 from pathlib import Path
 from dotenv import load_dotenv
 load_dotenv()
@@ -23,16 +25,34 @@ from concurrent.futures import ThreadPoolExecutor
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
+# Açılış süresi raporu (ilk engine kurulduğunda loglanır)
+from src.monitoring.startup import StartupReport
+startup_report = StartupReport('engine')
+
 # Import modüller
 from src.news.finnhub_api import FinnhubNewsAPI
 from src.news.rss_aggregator import RSSNewsAggregator
-from src.sentiment.analyzer import SentimentAnalyzer
+from src.sentiment.analyzer import SentimentAnalyzer, RunningSentiment
 from src.technical.analyzer import TechnicalAnalyzer
 from src.notifications.telegram_bot import TelegramBot
 from src.discovery.discovery_engine import DiscoveryEngine
+from src.discovery.discovery_cache import DiscoveryCache
 from src.ai.analyst import AIAnalyst
+from src.ai.llm_cache import LLMCache
+from src.ai.explanation_worker import ExplanationWorker
 from src.trading.paper import PaperTrader
-from src.database import init_db, get_session, NewsItem, TechnicalResult, Signal, Base, PortfolioItem
+from src.serialization import to_json
+from src.config_store import get_watchlist_store
+from src.market_hours import MarketScheduler
+from src.monitoring.cycle_metrics import CycleMetrics, NullMetrics
+from src.monitoring.profiling import get_profiler
+from src.providers.replay import get_data_provider
+from src.pipeline import END, queue_items, put_threadsafe, batch_consumer, run_stages
+from src.database import init_db, get_session, upsert_price_bars, NewsItem, TechnicalResult, Signal, Base, PortfolioItem
+from src.lazy_import import lazy_import
+
+aiohttp = lazy_import('aiohttp')
+startup_report.mark('imports')
 
 # Logging setup
 log_dir = project_root / 'logs'
@@ -49,19 +69,18 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class NumpyEncoder(json.JSONEncoder):
-    """NumPy types encoder for JSON"""
-    def default(self, obj):
-        import numpy as np
-        if isinstance(obj, np.integer):
-            return int(obj)
-        if isinstance(obj, np.floating):
-            return float(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        if isinstance(obj, np.bool_):
-            return bool(obj)
-        return super(NumpyEncoder, self).default(obj)
+class CycleState:
+    """Bir döngü boyunca pipeline aşamalarının paylaştığı sonuçlar"""
+    
+    def __init__(self):
+        self.sentiment = RunningSentiment()
+        self.analyzed_news = []
+        self.technical = {}      # sembol -> teknik sonuç
+        self.bar_keys = {}       # sembol -> (son bar zamanı, kapanış, config sürümü)
+        self.signals = []
+        self.scored_news = {}    # sembol -> skorlamada kullanılan haber sayısı
+        self.pending = set()     # teknik girdisi değişmemiş, henüz yazılmamış semboller
+        self.unchanged = set()   # parmak izi önceki döngüyle aynı olan semboller
 
 
 class MetheforFinancialFreedom:
@@ -74,31 +93,98 @@ class MetheforFinancialFreedom:
         
         config_dir = project_root / 'config'
         
-        # Config yükle
-        self.watchlist = self._load_config(config_dir / 'watchlist.json')
+        # Config yükle (watchlist dashboard ile aynı store'dan okunur, değiştiğinde otomatik yenilenir)
+        self.watchlist_store = get_watchlist_store(config_dir / 'watchlist.json')
         self.trading_rules = self._load_config(config_dir / 'trading_rules.json')
+        startup_report.mark('config')
         
         # Database Init
         logger.info("Veritabanı başlatılıyor...")
         self.db_engine = init_db('methefor.db')
+        startup_report.mark('database')
         
         # Modülleri başlat
         logger.info("\nModüller yükleniyor...")
         
-        self.finnhub_api = FinnhubNewsAPI(config_path=str(config_dir / 'api_keys.json'))
+        # Dış kaynak çağrıları için live/record/replay sağlayıcısı (METHEFOR_DATA_MODE)
+        self.data_provider = get_data_provider()
+        
+        self.finnhub_api = FinnhubNewsAPI(config_path=str(config_dir / 'api_keys.json'),
+                                          provider=self.data_provider)
         self.rss_aggregator = RSSNewsAggregator(
             config_path=str(config_dir / 'news_sources.json'),
-            watchlist_path=str(config_dir / 'watchlist.json')
+            watchlist_store=self.watchlist_store,
+            provider=self.data_provider
         )
         self.sentiment_analyzer = SentimentAnalyzer(config_path=str(config_dir / 'news_sources.json'))
-        self.technical_analyzer = TechnicalAnalyzer()
+        self.technical_analyzer = TechnicalAnalyzer(provider=self.data_provider)
         self.telegram_bot = TelegramBot(config_path=str(config_dir / 'api_keys.json'))
-        self.discovery_engine = DiscoveryEngine(config=self.watchlist.get('discovery', {}))
-        self.ai_analyst = AIAnalyst()
+        self.discovery_engine = DiscoveryEngine(config=self.watchlist.get('discovery', {}),
+                                                provider=self.data_provider, config_dir=config_dir)
+        # Keşifler interval_hours boyunca yeniden kullanılır; yenileme döngüyü bekletmez.
+        # record/replay'de döngüler aynı sembollerle çalışsın diye tarama her döngüde senkron yapılır.
+        self.discovery_cache = None
+        if self.data_provider.mode == 'live':
+            self.discovery_cache = DiscoveryCache(
+                lambda: get_session(self.db_engine), self.scan_discoveries,
+                retry_minutes=self.watchlist.get('auto_discovery', {}).get('retry_minutes', 30))
+        self.llm_cache = self._build_llm_cache()
+        self._cache_reported = {}
+        self.ai_analyst = AIAnalyst(provider=self.data_provider, cache=self.llm_cache)
+        self.explanation_worker = ExplanationWorker(
+            self.ai_analyst, lambda: get_session(self.db_engine),
+            workers=self.explanation_config['workers'],
+            queue_size=self.explanation_config['queue_size'],
+            batch_size=self.explanation_config['batch_size']
+        )
         self.paper_trader = PaperTrader(lambda: get_session(self.db_engine))
         
+        # Piyasa saatlerine göre sembol zamanlaması (kapalı piyasalardaki semboller atlanır)
+        self.market_scheduler = MarketScheduler(self.trading_rules.get('scheduling', {}))
+        
+        # Artımlı döngü: sembol bazlı girdi parmak izi (son bar zamanı + kapanış, sentiment durumu,
+        # config sürümü). Parmak izi değişmeyen semboller yeniden hesaplanmaz ve yazılmaz.
+        self.config_version = hashlib.sha1(
+            json.dumps(self.trading_rules, sort_keys=True).encode('utf-8')
+        ).hexdigest()[:12]
+        self.symbol_state = {}
+        
+        # Döngüler arası açık tutulan HTTP oturumu (daemon modunda bağlantılar sıcak kalır)
+        self._http_session = None
+        
+        # Aktif döngünün aşama metrikleri (döngü dışında ölçüm yapılmaz)
+        self.metrics = NullMetrics()
+        self.last_metrics = None
+        
+        # Opt-in profil modu (METHEFOR_PROFILE veya dashboard admin endpoint'i)
+        self.profiler = get_profiler(config_dir / 'profiling.json', project_root / 'logs' / 'profiles')
+        
+        startup_report.mark('modules')
+        startup_report.finish()
         logger.info("[OK] Tüm modüller yüklendi! (Paper Trading Aktif)\n")
     
+    async def get_http_session(self) -> aiohttp.ClientSession:
+        """Paylaşılan aiohttp oturumu (ilk kullanımda oluşturulur)"""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession()
+        return self._http_session
+    
+    async def close(self):
+        """Açık kaynakları kapat (kuyruktaki AI açıklamalarının bitmesi beklenir)"""
+        await self.explanation_worker.drain(self.explanation_config['drain_timeout_seconds'])
+        await self.explanation_worker.stop()
+        if self.discovery_cache is not None:
+            # Tek seferlik çalıştırmada başlamış tarama sonraki çalıştırma için kaydedilsin
+            await asyncio.get_running_loop().run_in_executor(None, self.discovery_cache.wait)
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
+    
+    @property
+    def watchlist(self) -> dict:
+        """Güncel watchlist (dosya değiştiyse yeniden yüklenir)"""
+        return self.watchlist_store.get()
+
     def _load_config(self, path: Path) -> dict:
         """Config dosyasını yükle"""
         try:
@@ -108,104 +194,168 @@ class MetheforFinancialFreedom:
             logger.error(f"Config yükleme hatası ({path}): {e}")
             return {}
     
+    def scan_discoveries(self) -> list:
+        """Keşif taraması + filtre (watchlist > discovery.filters); sıralı sembol listesi"""
+        logger.info("\n[DISCOVERY] Yeni fırsatlar aranıyor...")
+        discoveries = self.discovery_engine.discover_opportunities()
+        if not discoveries:
+            return []
+        filters = self.watchlist.get('discovery', {}).get('filters', {})
+        return self.discovery_engine.filter_discoveries(
+            discoveries[:15],
+            min_volume=filters.get('min_volume', 1000000),
+            min_price=filters.get('min_price', 5.0),
+            max_price=filters.get('max_price', 1000.0)
+        )
+    
     def get_all_symbols(self, include_discoveries: bool = True) -> list:
         """Watchlist + Discovery sembolleri"""
-        symbols = []
-        
-        # Watchlist'ten sembolleri topla
-        for category, stock_list in self.watchlist.get('stocks', {}).items():
-            symbols.extend(stock_list)
-        
-        # Crypto ekle
-        symbols.extend(self.watchlist.get('crypto', []))
+        # Watchlist sembolleri (stocks + crypto, store'da önceden düzleştirilmiş)
+        symbols = list(self.watchlist_store.get_engine_symbols())
         
         # Auto-discovery
-        if include_discoveries and self.watchlist.get('auto_discovery', {}).get('enabled', False):
-            try:
-                # Discovery is sync for now, keep it simple
-                logger.info("\n[DISCOVERY] Yeni fırsatlar aranıyor...")
-                discoveries = self.discovery_engine.discover_opportunities()
-                
-                if discoveries:
-                    filtered = self.discovery_engine.filter_discoveries(
-                        discoveries[:15],
-                        min_volume=self.watchlist.get('discovery', {}).get('filters', {}).get('min_volume', 1000000)
-                    )
-                    max_new = self.watchlist.get('auto_discovery', {}).get('max_new_symbols', 5)
+        auto_discovery = self.watchlist.get('auto_discovery', {})
+        if include_discoveries and auto_discovery.get('enabled', False):
+            with self.metrics.stage('discovery') as stage:
+                try:
+                    if self.discovery_cache is None:
+                        filtered = self.scan_discoveries()
+                    else:
+                        was_refreshing = self.discovery_cache.refreshing
+                        filtered = self.discovery_cache.get(auto_discovery.get('interval_hours', 6))
+                        if self.discovery_cache.refreshing and not was_refreshing:
+                            self.metrics.record('discovery.refresh', items=1)
+                    max_new = auto_discovery.get('max_new_symbols', 5)
                     symbols.extend(filtered[:max_new])
+                    stage.add_items(len(filtered[:max_new]))
                     logger.info(f"[OK] {len(filtered[:max_new])} keşfedilen sembol eklendi")
-            except Exception as e:
-                logger.error(f"[ERROR] Discovery hatası: {e}")
+                except Exception as e:
+                    stage.add_error()
+                    logger.error(f"[ERROR] Discovery hatası: {e}")
         
-        return list(set(symbols))
+        # Sıralı liste: replay modunda döngüler aynı sırayla ve aynı anahtarlarla çalışsın
+        return sorted(set(symbols))
 
-    async def collect_news_async(self) -> list:
-        """Async ve paralel haber toplama"""
-        logger.info("\n" + "="*70)
-        logger.info("HABER TOPLAMA BAŞLATILIYOR (ASYNC)")
-        logger.info("="*70)
-        
-        all_news = []
-        
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            
-            # 1. Finnhub Market News
-            tasks.append(self.finnhub_api.get_market_news_async(session))
-            tasks.append(self.finnhub_api.get_market_news_async(session, category='crypto'))
-            
-            # 2. Priority Symbols News
-            priority_symbols = self.watchlist.get('priorities', {}).get('high', [])[:5]
-            for symbol in priority_symbols:
-                tasks.append(self.finnhub_api.get_company_news_async(session, symbol))
+    # ---- Akış pipeline'ı ----
+    # Haber kaynakları ─> news_queue ─> [eşleştirme + sentiment] ─┐
+    # Teknik analiz    ─> tech_queue ─> [sinyal skoru] ───────────┴─> persist_queue ─> [toplu DB yazımı]
+    # Kuyruklar sınırlıdır: tüketici yetişemezse üretici bekler (backpressure).
 
-            # Run all finnhub tasks
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for res in results:
-                if isinstance(res, list):
-                    all_news.extend(res)
-                elif isinstance(res, Exception):
-                    logger.error(f"News fetch error: {res}")
-        
-        # 3. RSS Feeds (CPU bound/Blocking IO wrapper)
-        # RSS runs in thread pool because feedparser is blocking
-        loop = asyncio.get_event_loop()
-        try:
-            logger.info("RSS feed'ler taranıyor...")
-            rss_news = await loop.run_in_executor(None, self.rss_aggregator.fetch_all_feeds)
-            relevant_rss = await loop.run_in_executor(None, self.rss_aggregator.filter_relevant_news, rss_news)
-            all_news.extend(relevant_rss)
-        except Exception as e:
-            logger.error(f"RSS error: {e}")
+    @property
+    def pipeline_config(self) -> dict:
+        """trading_rules.json > pipeline (kuyruk boyutu, toplu yazım boyutu/süresi)"""
+        config = self.trading_rules.get('pipeline', {})
+        return {
+            'queue_size': config.get('queue_size', 32),
+            'persist_batch_size': config.get('persist_batch_size', 100),
+            'persist_interval_seconds': config.get('persist_interval_seconds', 2.0)
+        }
+
+    @property
+    def explanation_config(self) -> dict:
+        """trading_rules.json > explanations (açıklanacak sinyal sayısı, worker/kuyruk/parti boyutu)"""
+        config = self.trading_rules.get('explanations', {})
+        return {
+            'top_n': config.get('top_n', 3),
+            'batch_size': config.get('batch_size', 10),
+            'workers': config.get('workers', 2),
+            'queue_size': config.get('queue_size', 50),
+            'drain_timeout_seconds': config.get('drain_timeout_seconds', 120)
+        }
 
-        logger.info(f"\n[OK] TOPLAM {len(all_news)} HABER TOPLANDI")
-        return all_news
+    def _build_llm_cache(self):
+        """trading_rules.json > llm_cache (ttl_hours, max_entries, score_step)"""
+        config = self.trading_rules.get('llm_cache', {})
+        if not config.get('enabled', True):
+            return None
+        if self.data_provider.mode != 'live':
+            # record'da önbellek isabeti kaydı eksik bırakır, replay'de ölçümü bozar
+            logger.info("[AI] LLM önbelleği live dışı veri modunda devre dışı")
+            return None
+        return LLMCache(
+            lambda: get_session(self.db_engine),
+            ttl_seconds=config.get('ttl_hours', 6) * 3600,
+            max_entries=config.get('max_entries', 500),
+            score_step=config.get('score_step', 5)
+        )
 
-    async def analyze_sentiment_async(self, news_items: list) -> list:
-        """Sentiment analizi (CPU bound - ThreadPool)"""
+    async def produce_news(self, news_queue: asyncio.Queue):
+        """Haber kaynaklarını paralel çek; her kaynağın haberleri geldiği anda kuyruğa koy"""
         logger.info("\n" + "="*70)
-        logger.info("SENTIMENT ANALİZİ")
+        logger.info("HABER TOPLAMA BAŞLATILIYOR (AKIŞ)")
         logger.info("="*70)
         
-        loop = asyncio.get_event_loop()
-        try:
-            # CPU intensive task, run in executor
-            analyzed_news = await loop.run_in_executor(None, self.sentiment_analyzer.analyze_news_batch, news_items)
-            logger.info(f"[OK] {len(analyzed_news)} haber analiz edildi")
-            return analyzed_news
-        except Exception as e:
-            logger.error(f"Sentiment error: {e}")
-            return []
+        session = await self.get_http_session()
+        loop = asyncio.get_running_loop()
+        
+        async def finnhub(stage_name, coro):
+            """
+            Tek bir Finnhub isteğini kendi aşaması altında ölç ve sonucunu ilet.
+            İstekler raise_errors=True ile yapılır: hata yalnızca kendi aşamasına yazılır
+            (eşzamanlı isteklerin paylaşılan sayacından fark almak hataları karıştırır).
+            """
+            try:
+                with self.metrics.stage(stage_name) as stage:
+                    res = await coro
+                    stage.add_items(len(res) if res else 0)
+            except Exception as e:
+                logger.error(f"News fetch error: {e}")
+                return
+            if res:
+                await news_queue.put(('finnhub', res))
+        
+        async def rss():
+            # feedparser bloklayıcı olduğu için thread'de çalışır; her feed bitince kuyruğa yazılır
+            try:
+                logger.info("RSS feed'ler taranıyor...")
+                await loop.run_in_executor(
+                    None, lambda: self.rss_aggregator.fetch_all_feeds(
+                        self.metrics, on_feed=lambda items: put_threadsafe(news_queue, ('rss', items), loop)
+                    )
+                )
+            except Exception as e:
+                logger.error(f"RSS error: {e}")
+        
+        tasks = [
+            finnhub('news.finnhub.general', self.finnhub_api.get_market_news_async(session, raise_errors=True)),
+            finnhub('news.finnhub.crypto', self.finnhub_api.get_market_news_async(session, category='crypto',
+                                                                                  raise_errors=True)),
+            rss()
+        ]
+        priority_symbols = self.watchlist.get('priorities', {}).get('high', [])[:5]
+        for symbol in priority_symbols:
+            tasks.append(finnhub('news.finnhub.company', self.finnhub_api.get_company_news_async(session, symbol,
+                                                                                              raise_errors=True)))
+        
+        await asyncio.gather(*tasks)
+
+    async def sentiment_stage(self, news_queue: asyncio.Queue, persist_queue: asyncio.Queue, state: CycleState):
+        """Gelen haberleri watchlist ile eşleştir, sentiment'ini hesapla ve kayıt kuyruğuna aktar"""
+        async for source, items in queue_items(news_queue):
+            try:
+                if source == 'rss':
+                    items = await self.metrics.run_in_executor(
+                        'news.rss.filter', self.rss_aggregator.filter_relevant_news, items
+                    )
+                    if not items:
+                        continue
+                items = await self.metrics.run_in_executor(
+                    'sentiment', self.sentiment_analyzer.analyze_news_batch, items
+                )
+            except Exception as e:
+                logger.error(f"Sentiment error: {e}")
+                continue
+            
+            state.sentiment.add(items)
+            state.analyzed_news.extend(items)
+            for item in items:
+                await persist_queue.put(('news', item))
 
-    async def analyze_technical_async(self, symbols: list) -> dict:
-        """Teknik analiz paralel (yfinance blocking olduğu için ThreadPool)"""
+    async def produce_technical(self, symbols: list, tech_queue: asyncio.Queue):
+        """Teknik analiz paralel (yfinance blocking olduğu için ThreadPool); her sonuç hazır olunca kuyruğa"""
         logger.info("\n" + "="*70)
         logger.info("TEKNİK ANALİZ (PARALEL)")
         logger.info("="*70)
-
-        technical_analysis = {}
-        loop = asyncio.get_event_loop()
         
         # Max limit
         symbols = symbols[:20] 
@@ -213,88 +363,219 @@ class MetheforFinancialFreedom:
         
         async def analyze_single(symbol):
             try:
-                # Run sync analyze_symbol in thread
-                return await loop.run_in_executor(None, self.technical_analyzer.analyze_symbol, symbol)
+                # Ağ (yfinance) ve hesaplama ayrı aşamalar olarak, toplam ve sembol bazında ölçülür
+                hist = await self.metrics.run_in_executor(
+                    'technical.fetch', self.technical_analyzer.fetch_history, symbol, count=len, detail=symbol
+                )
+                if hist.empty:
+                    logger.warning(f"No historical data for {symbol}")
+                    return
+                bar_key = self._bar_key(hist)
+                state = self.symbol_state.get(symbol)
+                if state is not None and state['bar_key'] == bar_key:
+                    # Yeni bar yok: önceki teknik sonuç geçerli, fiyat barları zaten kayıtlı
+                    self.technical_analyzer.last_history.pop(symbol, None)
+                    self.metrics.record('technical.skipped', items=1)
+                    await tech_queue.put((state['technical'], bar_key, False))
+                    return
+                result = await self.metrics.run_in_executor(
+                    'technical.compute', self.technical_analyzer.analyze_dataframe, symbol, hist,
+                    count=lambda r: 0 if 'error' in r else 1,
+                    is_error=lambda r: 'error' in r,
+                    detail=symbol
+                )
             except Exception as e:
                 logger.error(f"{symbol} analysis failed: {e}")
-                return None
-
-        # Create tasks
-        tasks = [analyze_single(s) for s in symbols]
-        results = await asyncio.gather(*tasks)
-        
-        for res in results:
-            if res and 'error' not in res:
-                technical_analysis[res['symbol']] = res
-                logger.info(f"[OK] {res['symbol']}: {res['overall_score']:.1f}")
+                return
+            if result and 'error' not in result:
+                await tech_queue.put((result, bar_key, True))
         
-        return technical_analysis
+        await asyncio.gather(*(analyze_single(s) for s in symbols))
+
+    async def signal_stage(self, tech_queue: asyncio.Queue, persist_queue: asyncio.Queue, state: CycleState):
+        """
+        Her teknik sonuç geldiğinde sembolün sinyalini o ana kadarki haber duygusuyla üret.
+        Sonradan haberi gelen semboller finalize_signals'da yeniden skorlanır. Teknik girdisi
+        (son bar) değişmemiş sembollerin sinyali, sentiment'in de aynı kalıp kalmadığı
+        döngü sonunda belli olana kadar yazılmaz.
+        """
+        async for tech, bar_key, tech_changed in queue_items(tech_queue):
+            symbol = tech['symbol']
+            state.technical[symbol] = tech
+            state.bar_keys[symbol] = bar_key
+            logger.info(f"[OK] {symbol}: {tech['overall_score']:.1f}" + ("" if tech_changed else " (değişmedi)"))
+            
+            with self.metrics.stage('signals') as stage:
+                signal = self._score_signal(symbol, tech, state.sentiment.get(symbol))
+                if signal:
+                    stage.add_items()
+            
+            if signal:
+                state.scored_news[symbol] = state.sentiment.news_count(symbol)
+                state.signals.append(signal)
+            if not tech_changed:
+                state.pending.add(symbol)
+                continue
+            await persist_queue.put(('technical', (symbol, tech)))
+            if signal:
+                await persist_queue.put(('signal', signal))
+
+    async def _flush_records(self, batch: list):
+        """Kayıt kuyruğundan gelen toplu öğeleri tek transaction'da yaz"""
+        news = [record for kind, record in batch if kind == 'news']
+        technical = dict(record for kind, record in batch if kind == 'technical')
+        signals = [record for kind, record in batch if kind == 'signal']
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.save_to_db, news, technical, signals)
 
-    def generate_signals(self, analyzed_news: list, technical_analysis: dict) -> list:
-        """Sinyal üretimi (Memory-bound, hızlı, sync kalabilir)"""
-        # (Bu kod değişmedi, sadece çağırma şekli değişti)
-        logger.info("\nSINYAL ÜRETİLİYOR...")
+    def _fingerprint(self, symbol: str, state: CycleState) -> tuple:
+        """Sembolün girdi parmak izi: (son bar, kapanış, config sürümü) + sentiment durumu"""
+        sentiment = state.sentiment.get(symbol)
+        return state.bar_keys[symbol] + (sentiment['overall_sentiment'], sentiment['avg_confidence'],
+                                         sentiment['news_count'])
+
+    def _bar_key(self, hist) -> tuple:
+        return (hist.index[-1].isoformat(), float(hist['Close'].iloc[-1]), self.config_version)
+
+    async def finalize_signals(self, state: CycleState) -> list:
+        """
+        Tüm kaynaklar bittikten sonra sinyalleri tamamla ve değişen sinyalleri döndür:
+        - parmak izi önceki döngüyle aynı olan semboller olduğu gibi bırakılır (hesap/AI/DB yok)
+        - skorlandıktan sonra yeni haberi gelen semboller yeniden skorlanır
+        - bekleyen (teknik girdisi aynı, sentiment'i değişmiş) sinyaller yazılır, değişen satırlar güncellenir
+        - ilk top_n sinyal AI açıklaması için arka plan worker'ına verilir
+        """
+        signals, unchanged = [], state.unchanged
+        for sig in state.signals:
+            symbol = sig['symbol']
+            previous = self.symbol_state.get(symbol)
+            if symbol in state.pending and previous is not None and \
+                    previous['fingerprint'] == self._fingerprint(symbol, state):
+                # Aynı girdiler -> aynı sinyal; önceki (kayıtlı, açıklamalı) sinyal kullanılır
+                signals.append(previous['signal'])
+                unchanged.add(symbol)
+            else:
+                signals.append(sig)
+        if unchanged:
+            self.metrics.record('signals.unchanged', items=len(unchanged))
+            logger.info(f"[INCREMENTAL] {len(unchanged)}/{len(signals)} sembolün girdileri değişmedi, atlandı")
+        
+        changed = {}  # sembol -> güncellenecek (zaten kayıtlı) sinyal
+        inserts = []  # ilk kez yazılacak bekleyen sinyaller
+        with self.metrics.stage('signals.rescore') as stage:
+            for sig in signals:
+                symbol = sig['symbol']
+                if symbol in unchanged:
+                    continue
+                if symbol in state.pending:
+                    inserts.append(sig)
+                if state.sentiment.news_count(symbol) == state.scored_news.get(symbol):
+                    continue
+                updated = self._score_signal(symbol, state.technical[symbol], state.sentiment.get(symbol))
+                if updated:
+                    for key in ('decision', 'combined_score', 'confidence', 'sentiment_score'):
+                        sig[key] = updated[key]
+                    if symbol not in state.pending:
+                        changed[symbol] = sig
+                    stage.add_items()
+        
+        signals.sort(key=lambda x: x['combined_score'], reverse=True)
         
-        sentiment_report = self.sentiment_analyzer.generate_sentiment_report(analyzed_news)
-        signals = []
+        # DB yazımları executor'da: event loop'u (ve açıklama worker'larını) bloklamaz
+        loop = asyncio.get_running_loop()
+        if inserts:
+            await loop.run_in_executor(None, self.save_to_db, [], {}, inserts)
+        if changed:
+            await loop.run_in_executor(None, self.update_signals, list(changed.values()))
+        
+        # Açıklamalar arka planda üretilir; sinyaller beklemeden kaydedildi ve işleme hazır
+        self.queue_explanations(signals, state)
+        
+        # Bir sonraki döngünün karşılaştıracağı parmak izleri
+        for sig in signals:
+            symbol = sig['symbol']
+            self.symbol_state[symbol] = {
+                'bar_key': state.bar_keys[symbol],
+                'fingerprint': self._fingerprint(symbol, state),
+                'technical': state.technical[symbol],
+                'signal': sig
+            }
         
+        return signals
+
+    def queue_explanations(self, signals: list, state: CycleState):
+        """İlk top_n sinyali (açıklaması olmayanları) arka plan açıklama worker'ına ver"""
+        top_n = self.explanation_config['top_n']
+        queued = 0
+        for sig in signals[:top_n]:
+            if sig.get('ai_explanation'):
+                continue
+            # Find related news (simple filter)
+            related_news = [n for n in state.analyzed_news if sig['symbol'] in str(n)]
+            if self.explanation_worker.submit(sig, related_news):
+                queued += 1
+        self.metrics.record('ai.explain.queued', items=queued)
+        if queued:
+            logger.info(f"[AI] {queued} sinyal açıklama kuyruğuna alındı "
+                        f"(bekleyen: {self.explanation_worker.pending})")
+        
+        # Açıklamalar döngüden bağımsız bittiği için önbellek sayıları önceki rapordan bu yana farktır
+        if self.llm_cache is not None:
+            stats = self.llm_cache.summary()
+            hits = stats['hits'] - self._cache_reported.get('hits', 0)
+            misses = stats['misses'] - self._cache_reported.get('misses', 0)
+            self._cache_reported = stats
+            if hits or misses:
+                self.metrics.record('ai.cache.hit', items=hits)
+                self.metrics.record('ai.cache.miss', items=misses)
+                logger.info(f"[AI] Önbellek: {hits} isabet, {misses} kaçırma "
+                            f"(toplam isabet oranı: {stats['hit_rate']})")
+
+    def _score_signal(self, symbol: str, tech_data: dict, symbol_sentiment: dict) -> dict:
+        """Haber duygusu ve teknik skoru birleştirip tek sembolün sinyalini üret"""
         weights = self.trading_rules.get('signal_generation', {}).get('weights', {})
         news_weight = weights.get('news_sentiment', 40) / 100
         tech_weight = weights.get('technical_analysis', 60) / 100
         
-        for symbol, tech_data in technical_analysis.items():
-            try:
-                symbol_sentiment = sentiment_report['symbols'].get(symbol, {})
-                sentiment_score = symbol_sentiment.get('overall_sentiment', 0)
-                sentiment_confidence = symbol_sentiment.get('avg_confidence', 0)
-                
-                tech_score = tech_data.get('overall_score', 50)
-                
-                # Skor hesapla
-                sentiment_scaled = (sentiment_score + 1) * 50
-                combined_score = (sentiment_scaled * news_weight) + (tech_score * tech_weight)
-                overall_confidence = (sentiment_confidence + tech_score) / 2
-                
-                # Karar
-                if combined_score >= 75: decision = 'STRONG BUY'
-                elif combined_score >= 60: decision = 'BUY'
-                elif combined_score >= 40: decision = 'HOLD'
-                elif combined_score >= 25: decision = 'SELL'
-                else: decision = 'STRONG SELL'
-                
-                signal = {
-                    'symbol': symbol,
-                    'decision': decision,
-                    'combined_score': combined_score,
-                    'confidence': overall_confidence,
-                    'sentiment_score': sentiment_score,
-                    'technical_score': tech_score,
-                    'reasons': tech_data['technical_signals']['signals'],
-                    'timestamp': datetime.now()
-                }
-                signals.append(signal)
-            except Exception as e:
-                logger.error(f"Signal setup error {symbol}: {e}")
-        
-        signals.sort(key=lambda x: x['combined_score'], reverse=True)
-        
-        logger.info("[AI] Top 3 sinyal için açıklama üretiliyor...")
-        for sig in signals[:3]:
-            try:
-                # Find related news (simple filter)
-                related_news = [n for n in analyzed_news if sig['symbol'] in str(n)]
-                explanation = self.ai_analyst.explain_signal(sig['symbol'], sig, related_news)
-                sig['ai_explanation'] = explanation
-                logger.info(f"[AI] {sig['symbol']} yorumlandı.")
-            except Exception as e:
-                logger.error(f"[AI] Error {sig['symbol']}: {e}")
-                sig['ai_explanation'] = None
-                
-        return signals
+        try:
+            sentiment_score = symbol_sentiment.get('overall_sentiment', 0)
+            sentiment_confidence = symbol_sentiment.get('avg_confidence', 0)
+            
+            tech_score = tech_data.get('overall_score', 50)
+            
+            # Skor hesapla
+            sentiment_scaled = (sentiment_score + 1) * 50
+            combined_score = (sentiment_scaled * news_weight) + (tech_score * tech_weight)
+            overall_confidence = (sentiment_confidence + tech_score) / 2
+            
+            # Karar
+            if combined_score >= 75: decision = 'STRONG BUY'
+            elif combined_score >= 60: decision = 'BUY'
+            elif combined_score >= 40: decision = 'HOLD'
+            elif combined_score >= 25: decision = 'SELL'
+            else: decision = 'STRONG SELL'
+            
+            return {
+                'symbol': symbol,
+                'decision': decision,
+                'combined_score': combined_score,
+                'confidence': overall_confidence,
+                'sentiment_score': sentiment_score,
+                'technical_score': tech_score,
+                'reasons': tech_data['technical_signals']['signals'],
+                'timestamp': datetime.now()
+            }
+        except Exception as e:
+            logger.error(f"Signal setup error {symbol}: {e}")
+            return None
 
     def save_to_db(self, news: list, technical: dict, signals: list):
         """Sonuçları veritabanına kaydet"""
         logger.info("\nVeritabanına kaydediliyor...")
+        with self.metrics.stage('db.write') as stage:
+            self._write_db(news, technical, signals, stage)
+
+    def _write_db(self, news: list, technical: dict, signals: list, stage):
         session = get_session(self.db_engine)
         try:
             # 1. Save News
@@ -311,10 +592,11 @@ class MetheforFinancialFreedom:
                     link=link,
                     published_date=datetime.now(), # Basitlik için
                     category=n.get('category'),
-                    related_symbols=json.dumps(n.get('related_symbols', []), cls=NumpyEncoder),
+                    related_symbols=to_json(n.get('related_symbols', [])),
                     sentiment_score=n.get('sentiment', {}).get('score', 0) if 'sentiment' in n else 0
                 )
                 session.add(item)
+                stage.add_items()
             
             # 2. Save Technical
             for sym, data in technical.items():
@@ -325,11 +607,12 @@ class MetheforFinancialFreedom:
                     macd_signal=data['macd']['signal'],
                     trend=data['moving_averages']['trend'],
                     overall_score=data['overall_score'],
-                    details=json.dumps(data, cls=NumpyEncoder)
+                    details=to_json(data)
                 )
                 session.add(tech)
             
             # 3. Save Signals
+            signal_rows = []
             for sig in signals:
                 s = Signal(
                     symbol=sig['symbol'],
@@ -338,61 +621,136 @@ class MetheforFinancialFreedom:
                     confidence=sig['confidence'],
                     news_sentiment_score=sig['sentiment_score'],
                     technical_score=sig['technical_score'],
-                    reasons=json.dumps(sig['reasons'], cls=NumpyEncoder),
+                    reasons=to_json(sig['reasons']),
                     ai_explanation=sig.get('ai_explanation')
                 )
                 session.add(s)
+                signal_rows.append(s)
+            
+            # 4. Price Bars (grafik önbelleği)
+            for sym in technical:
+                history = self.technical_analyzer.last_history.pop(sym, None)
+                if history is not None:
+                    upsert_price_bars(session, sym, '1d', history)
             
+            # Satır id'leri sonradan güncelleme (yeniden skor, AI açıklaması) için sinyale işlenir
+            session.flush()
+            signal_ids = [row.id for row in signal_rows]
             session.commit()
+            for sig, signal_id in zip(signals, signal_ids):
+                sig['db_id'] = signal_id
+            stage.add_items(len(technical) + len(signals))
             logger.info("[OK] Veritabanı kaydı başarılı.")
 
         except Exception as e:
             session.rollback()
+            stage.add_error()
             logger.error(f"DB Kayıt hatası: {e}")
         finally:
             session.close()
 
+    def update_signals(self, signals: list):
+        """Kaydedilmiş sinyal satırlarını (db_id) güncel skorla güncelle (ai_explanation'ı worker yazar)"""
+        mappings = [{
+            'id': sig['db_id'],
+            'decision': sig['decision'],
+            'combined_score': sig['combined_score'],
+            'confidence': sig['confidence'],
+            'news_sentiment_score': sig['sentiment_score']
+        } for sig in signals if sig.get('db_id')]
+        if not mappings:
+            return
+        
+        with self.metrics.stage('db.update') as stage:
+            session = get_session(self.db_engine)
+            try:
+                session.bulk_update_mappings(Signal, mappings)
+                session.commit()
+                stage.add_items(len(mappings))
+            except Exception as e:
+                session.rollback()
+                stage.add_error()
+                logger.error(f"Sinyal güncelleme hatası: {e}")
+            finally:
+                session.close()
+
     async def run_full_cycle_async(self):
-        """Asenkron Tam Döngü"""
+        """Asenkron Tam Döngü (aşama metrikleri cycle_metrics tablosuna yazılır)"""
+        self.metrics = CycleMetrics()
+        try:
+            with self.profiler.cycle_session(self.metrics), self.metrics.stage('cycle'):
+                await self._run_cycle_stages()
+        finally:
+            self.metrics.log_summary()
+            if self.data_provider.mode != 'live':
+                logger.info(f"[PROVIDER] {self.data_provider.mode}: {self.data_provider.stats}")
+            self.metrics.save(lambda: get_session(self.db_engine))
+            self.last_metrics = self.metrics
+            self.metrics = NullMetrics()
+
+    async def _run_cycle_stages(self):
         start_time = time.time()
         logger.info("\n" + "[ASYNC]"*35)
         logger.info("METHEFOR v2.1 (ASYNC) - BAŞLIYOR")
         logger.info("[ASYNC]"*35)
         
-        # 1. Sembolleri belirle
-        symbols = self.get_all_symbols()
-        
-        # 2. Parallel Execution (News & Technical)
-        logger.info("\n>>> PARALEL İŞLEMLER BAŞLIYOR...")
+        # 1. Sembolleri belirle (yalnızca periyodu dolmuş ve piyasası açık kalmış olanlar)
+        # Replay modunda kayıtlar piyasa saatinden bağımsızdır; tüm semboller işlenir
+        if self.data_provider.is_replay:
+            symbols = self.get_all_symbols()
+        else:
+            symbols = self.market_scheduler.due_symbols(self.get_all_symbols())
         
-        # Haber ve Teknik analizi aynı anda başlat
-        news_task = asyncio.create_task(self.collect_news_async())
-        tech_task = asyncio.create_task(self.analyze_technical_async(symbols))
+        # 2. Akış pipeline'ı: haberler ve teknik sonuçlar geldikçe işlenir, kayıtlar toplu yazılır
+        logger.info("\n>>> AKIŞ PIPELINE'I BAŞLIYOR...")
+        config = self.pipeline_config
+        news_queue = asyncio.Queue(maxsize=config['queue_size'])
+        tech_queue = asyncio.Queue(maxsize=config['queue_size'])
+        persist_queue = asyncio.Queue(maxsize=config['queue_size'])
         
-        # Bekle
-        news_results = await news_task
-        technical_results = await tech_task
+        state = CycleState()
         
-        # 3. Sentiment Analysis (News sonuçlarına bağlı)
-        analyzed_news = await self.analyze_sentiment_async(news_results)
+        async def closing(coro, queue):
+            """Üretici bitince (hata olsa da) kuyruğu kapat"""
+            try:
+                await coro
+            finally:
+                await queue.put(END)
+        
+        async def processors():
+            await asyncio.gather(
+                self.sentiment_stage(news_queue, persist_queue, state),
+                self.signal_stage(tech_queue, persist_queue, state)
+            )
+        
+        await run_stages(
+            closing(self.produce_news(news_queue), news_queue),
+            closing(self.produce_technical(symbols, tech_queue), tech_queue),
+            closing(processors(), persist_queue),
+            batch_consumer(persist_queue, self._flush_records,
+                           config['persist_batch_size'], config['persist_interval_seconds'])
+        )
+        self.market_scheduler.mark_done(state.technical.keys())
+        logger.info(f"\n[OK] TOPLAM {len(state.analyzed_news)} HABER, {len(state.technical)} TEKNİK SONUÇ İŞLENDİ")
         
-        # 4. Sinyal Üretimi
-        signals = self.generate_signals(analyzed_news, technical_results)
+        # 3. Sinyalleri tamamla (değişmeyenleri atla, geç gelen haberlerle yeniden skor, AI açıklama kuyruğu)
+        signals = await self.finalize_signals(state)
         
-        # 5. Telegram
+        # 4. Telegram
         # (This is sync still, run in executor if needed, but it's IO bound so fast enough usually)
         if hasattr(self, 'telegram_bot'):
             # self.telegram_bot.send_alerts... (Implement wrapper if needed)
             pass 
         
-        # 6. Sonuçları Kaydet
-        self.save_to_db(analyzed_news, technical_results, signals)
-        
-        # 7. Paper Trading (Sanal İşlem)
+        # 5. Paper Trading (Sanal İşlem)
         logger.info("🤖 Paper Trading işlemleri kontrol ediliyor...")
-        self.paper_trader.execute_strategy(signals)
+        # Girdisi değişmeyen sinyaller önceki döngülerde zaten işlendi
+        changed_signals = [s for s in signals if s['symbol'] not in state.unchanged]
+        with self.metrics.stage('paper_trading') as stage:
+            stage.add_items(len(changed_signals))
+            self.paper_trader.execute_strategy(changed_signals)
         
-        # 8. Raporla
+        # 6. Raporla
         self.print_summary(signals)
         
         elapsed = time.time() - start_time
@@ -407,7 +765,10 @@ class MetheforFinancialFreedom:
 
 async def main_async():
     engine = MetheforFinancialFreedom()
-    await engine.run_full_cycle_async()
+    try:
+        await engine.run_full_cycle_async()
+    finally:
+        await engine.close()
 
 def main():
     if os.name == 'nt':
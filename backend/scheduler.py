@@ -1,79 +1,168 @@
 """
-METHEFOR FİNANSAL ÖZGÜRLÜK - OTOMATİK ZAMANLAYICI
-Bu script, methefor_engine.py'yi belirli aralıklarla çalıştırır.
+METHEFOR FİNANSAL ÖZGÜRLÜK - OTOMATİK ZAMANLAYICI (DAEMON)
+MetheforFinancialFreedom motorunu bir kez kurar ve run_full_cycle_async'i
+kendi asyncio döngüsünde belirli aralıklarla çalıştırır.
+Modüller, HTTP oturumları ve bellek içi önbellekler döngüler arasında sıcak kalır.
+Her döngüde yalnızca periyodu dolmuş ve piyasası son analizden beri açık kalmış
+semboller analiz edilir (trading_rules.json > scheduling). --interval en küçük
+market periyoduna eşit veya daha kısa tutulmalıdır.
+
+Kullanım:
+    python scheduler.py                 # Her 15 dakikada bir
+    python scheduler.py --interval 5    # Her 5 dakikada bir
+    python scheduler.py --once          # Tek döngü çalıştır ve çık
+    python scheduler.py --once --data-mode record   # Canlı yanıtları data/replay altına kaydet
+    python scheduler.py --once --data-mode replay --replay-latency 20-80
+                                        # Ağsız, kayıtlardan deterministik döngü
 """
 
-import schedule
-import time
-import subprocess
+import argparse
+import asyncio
+import os
+import signal
 import sys
+import time
 import logging
 from datetime import datetime
 
 # Windows console encoding fix
 sys.stdout.reconfigure(encoding='utf-8')
 
-# Logging kurulumu
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - SCOUT - %(message)s',
-    handlers=[
-        logging.FileHandler("logs/scheduler.log"),
-        logging.StreamHandler()
-    ]
-)
-
-logger = logging.getLogger(__name__)
-
-def run_job():
-    """Motoru çalıştır"""
-    print("\n" + "="*50)
-    logger.info("🕒 ZAMANLANMIŞ GÖREV BAŞLATILIYOR...")
-    print("="*50)
-    
-    start_time = datetime.now()
-    
-    try:
-        # Python interpreter path'ini kullanarak çalıştır
-        # Bu, aynı environment'ı kullanmasını garanti eder
-        result = subprocess.run(
-            [sys.executable, "methefor_engine.py"],
-            capture_output=False, # Çıktıyı canlı görmek için False yapabiliriz veya loglamak için True
-            text=True,
-            check=False # Hata durumunda scriptin durmaması için
-        )
-        
-        duration = datetime.now() - start_time
+from methefor_engine import MetheforFinancialFreedom
+
+# Logging kurulumu (engine kök logger'ı kurar, scheduler kendi dosyasını ekler)
+logger = logging.getLogger("scheduler")
+_handler = logging.FileHandler("logs/scheduler.log", encoding='utf-8')
+_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - SCOUT - %(message)s'))
+logger.addHandler(_handler)
+
+DEFAULT_INTERVAL_MINUTES = 15
+
+
+class EngineDaemon:
+    """Kalıcı motor servisi: tek engine örneği, çakışma korumalı periyodik döngüler"""
+
+    def __init__(self, interval_minutes: float = DEFAULT_INTERVAL_MINUTES):
+        self.interval = interval_minutes * 60
+        self.engine = None
+        self._cycle_task = None
+        self._stop_event = None
+        self.cycles_run = 0
+        self.cycles_skipped = 0
+
+    async def _run_cycle(self):
+        """Tek döngü; hatalar daemon'u durdurmaz"""
+        print("\n" + "="*50)
+        logger.info("🕒 ZAMANLANMIŞ GÖREV BAŞLATILIYOR...")
+        print("="*50)
         
-        if result.returncode == 0:
-            logger.info(f"✅ Görev başarıyla tamamlandı. Süre: {duration}")
-        else:
-            logger.error(f"❌ Görev hatalı tamamlandı. Return Code: {result.returncode}")
-            
-    except Exception as e:
-        logger.error(f"❌ Kritik Hata: {e}")
+        start_time = datetime.now()
+        try:
+            await self.engine.run_full_cycle_async()
+            self.cycles_run += 1
+            logger.info(f"✅ Görev başarıyla tamamlandı. Süre: {datetime.now() - start_time}")
+        except asyncio.CancelledError:
+            logger.warning("⏹️ Döngü iptal edildi.")
+            raise
+        except Exception as e:
+            logger.exception(f"❌ Döngü hatası: {e}")
+
+    def trigger(self) -> bool:
+        """Yeni döngü başlat. Önceki döngü hâlâ sürüyorsa atla (çakışma koruması)."""
+        if self._cycle_task and not self._cycle_task.done():
+            self.cycles_skipped += 1
+            logger.warning("⏭️ Önceki döngü hâlâ çalışıyor, bu periyot atlandı.")
+            return False
+        self._cycle_task = asyncio.create_task(self._run_cycle())
+        return True
+
+    def stop(self):
+        if self._stop_event:
+            self._stop_event.set()
+
+    def _check_cadence(self):
+        """--interval en kısa market periyodundan uzunsa o periyot hiç tutturulamaz"""
+        min_cadence = self.engine.market_scheduler.min_cadence_minutes()
+        if self.interval / 60 > min_cadence:
+            logger.warning(f"⚠️ Periyot ({self.interval / 60:g} dk) en kısa market periyodundan "
+                           f"({min_cadence:g} dk) uzun; bu periyottaki semboller geç analiz edilecek. "
+                           f"--interval {min_cadence:g} veya daha kısa önerilir.")
+
+    async def run_forever(self):
+        self._stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: KeyboardInterrupt ile durur
+
+        self.engine = MetheforFinancialFreedom()
+        self._check_cadence()
+        logger.info("🔄 İlk çalışma başlatılıyor...")
+        try:
+            while not self._stop_event.is_set():
+                tick = time.monotonic()
+                self.trigger()
+                
+                # Bir sonraki periyoda kadar bekle (döngü süresi beklemeden düşülür)
+                timeout = max(0.0, self.interval - (time.monotonic() - tick))
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            logger.info("🛑 Scheduler durduruluyor...")
+            if self._cycle_task and not self._cycle_task.done():
+                self._cycle_task.cancel()
+                try:
+                    await self._cycle_task
+                except asyncio.CancelledError:
+                    pass
+            await self.engine.close()
+            logger.info(f"Toplam döngü: {self.cycles_run}, atlanan: {self.cycles_skipped}")
+
+    async def run_once(self):
+        self.engine = MetheforFinancialFreedom()
+        try:
+            await self._run_cycle()
+        finally:
+            await self.engine.close()
+
 
 def main():
-    logger.info("🚀 METHEFOR SCHEDULER BAŞLATILDI")
-    logger.info("⏱️  Periyot: Her 15 dakikada bir")
-    
-    # İsterseniz burayı değiştirebilirsiniz (örn: schedule.every(1).hours)
-    schedule.every(15).minutes.do(run_job)
-    
-    # İlk çalışmayı hemen yap
-    logger.info("🔄 İlk çalışma başlatılıyor...")
-    run_job()
+    parser = argparse.ArgumentParser(description="METHEFOR engine daemon")
+    parser.add_argument('--interval', type=float,
+                        default=float(os.getenv('METHEFOR_CYCLE_MINUTES', DEFAULT_INTERVAL_MINUTES)),
+                        help="Döngü aralığı (dakika)")
+    parser.add_argument('--once', action='store_true', help="Tek döngü çalıştır ve çık")
+    parser.add_argument('--data-mode', choices=['live', 'record', 'replay'],
+                        help="Dış veri modu (METHEFOR_DATA_MODE)")
+    parser.add_argument('--replay-dir', help="Kayıt dizini (METHEFOR_REPLAY_DIR)")
+    parser.add_argument('--replay-latency',
+                        help="Replay yapay gecikmesi ms, örn. '20-80,gemini=800' (METHEFOR_REPLAY_LATENCY_MS)")
+    args = parser.parse_args()
+
+    # Sağlayıcı engine kurulurken ortamdan okunur
+    if args.data_mode:
+        os.environ['METHEFOR_DATA_MODE'] = args.data_mode
+    if args.replay_dir:
+        os.environ['METHEFOR_REPLAY_DIR'] = args.replay_dir
+    if args.replay_latency:
+        os.environ['METHEFOR_REPLAY_LATENCY_MS'] = args.replay_latency
+
+    if os.name == 'nt':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    daemon = EngineDaemon(interval_minutes=args.interval)
+    logger.info("🚀 METHEFOR SCHEDULER BAŞLATILDI (daemon)")
+    logger.info(f"⏱️  Periyot: Her {args.interval:g} dakikada bir")
     
-    while True:
-        try:
-            schedule.run_pending()
-            time.sleep(1)
-        except KeyboardInterrupt:
-            logger.info("🛑 Scheduler kullanıcı tarafından durduruldu.")
-            break
-        except Exception as e:
-            logger.error(f"Scheduler Loop Hatası: {e}")
-            time.sleep(60) # Hata olursa 1 dk bekle devam et
+    try:
+        asyncio.run(daemon.run_once() if args.once else daemon.run_forever())
+    except KeyboardInterrupt:
+        logger.info("🛑 Scheduler kullanıcı tarafından durduruldu.")
+
 
 if __name__ == "__main__":
     main()
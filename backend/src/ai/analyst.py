@@ -2,58 +2,146 @@
 import os
 import logging
 import json
-import google.generativeai as genai
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
+
+from src.providers.replay import get_data_provider
+from src.ai.llm_backend import get_llm_backend
 
 logger = logging.getLogger(__name__)
 
 class AIAnalyst:
     """
     Yapay Zeka Finansal Analist
-    Google Gemini API kullanarak sinyalleri yorumlar.
+    Google Gemini API (veya METHEFOR_LLM_BACKEND=local ile yerel model) kullanarak sinyalleri yorumlar.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, provider=None, cache=None):
         self.api_key = api_key or os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-        self.enabled = False
+        self.provider = provider or get_data_provider()
+        # Girdileri aynı kalan sinyallerin açıklaması tekrar üretilmez (src/ai/llm_cache.py)
+        self.cache = cache
+        self.backend = get_llm_backend(self.api_key)
         
-        if self.api_key:
-            try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel('gemini-2.5-flash')
-                self.enabled = True
-                logger.info("[OK] AI Analyst (Gemini) aktifleştirildi.")
-            except Exception as e:
-                logger.error(f"AI Connection Error: {e}")
-        else:
+        # Replay modunda yanıtlar diskten gelir, API key/model gerekmez.
+        # Gemini istemcisi (ve google.generativeai import'u) ilk açıklamada kurulur.
+        self.enabled = self.provider.is_replay or self.backend.available
+        if not self.enabled:
             logger.warning("AI Analyst: API Key bulunamadı (GEMINI_API_KEY). AI özellikleri devre dışı.")
 
-    def explain_signal(self, symbol: str, signal_data: Dict, news_context: list = []) -> str:
+    async def explain_signal_async(self, symbol: str, signal_data: Dict, news_context: list = []) -> str:
         """
         Sinyal için Çoklu Ajan Sistemi üzerinden kapsamlı bir açıklama üretir.
+        Engine gibi çalışan bir event loop içinden kullanılır.
+        Önbellek varsa aynı girdiler için kayıtlı açıklama döner; şablon açıklamalar önbelleğe yazılmaz.
         """
         if not self.enabled:
             return self._fallback_explanation(symbol, signal_data)
-            
-        try:
-            from src.ai.multi_agent import multi_agent_system
-            import asyncio
-
-            # Async metodu senkronize olarak çalıştır (dashboard uyumluluğu için)
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # Eğer event loop zaten çalışıyorsa (dashboard gibi), yeni bir görev oluşturamayız
-                # Bu yüzden basitleştirilmiş bir sentez yapıyoruz
-                return self._sync_explain(symbol, signal_data, news_context)
+
+        key, cached = await self._cache_lookup(symbol, signal_data, news_context)
+        if cached:
+            return cached
+        return await self._explain_uncached(symbol, signal_data, news_context, key)
+
+    async def explain_signals_batch_async(self, requests: List[Tuple[Dict, list]]) -> Dict[str, str]:
+        """
+        Birden çok sinyali tek Gemini çağrısıyla açıkla: [(sinyal, haberler), ...] -> {sembol: açıklama}.
+        Önbellekte olanlar çağrıya girmez; yanıtta çözülemeyen semboller tek tek açıklanır.
+        """
+        if not self.enabled:
+            return {sig['symbol']: self._fallback_explanation(sig['symbol'], sig) for sig, _ in requests}
+
+        import asyncio
+        loop = asyncio.get_running_loop()
+        results, keys, missing = {}, {}, []
+        for sig, news in requests:
+            keys[sig['symbol']], cached = await self._cache_lookup(sig['symbol'], sig, news)
+            if cached:
+                results[sig['symbol']] = cached
             else:
-                analysis = loop.run_until_complete(
-                    multi_agent_system.get_comprehensive_analysis(symbol, signal_data, news_context)
+                missing.append((sig, news))
+
+        if len(missing) > 1:
+            try:
+                from src.ai.multi_agent import get_multi_agent_system
+                batch = await get_multi_agent_system(self.provider).get_batch_analysis(
+                    [self._batch_item(sig, news) for sig, news in missing]
                 )
-                return analysis
-            
+            except Exception as e:
+                logger.error(f"AI Batch Generation Error: {e}")
+                batch = {}
+            for sig, _ in missing:
+                symbol = sig['symbol']
+                if symbol in batch:
+                    results[symbol] = batch[symbol]
+                    if keys[symbol] is not None:
+                        await loop.run_in_executor(None, self.cache.put, keys[symbol], batch[symbol],
+                                                   'explanation', symbol)
+            if len(batch) < len(missing):
+                logger.warning(f"[AI] Toplu yanıtta {len(missing) - len(batch)}/{len(missing)} sembol "
+                               f"çözülemedi, tek tek açıklanacak")
+
+        # Toplu yanıtta olmayanlar (veya tek sinyal) tek tek, eşzamanlı açıklanır
+        rest = [(sig, news) for sig, news in missing if sig['symbol'] not in results]
+        explanations = await asyncio.gather(*[
+            self._explain_uncached(sig['symbol'], sig, news, keys[sig['symbol']]) for sig, news in rest
+        ])
+        for (sig, _), explanation in zip(rest, explanations):
+            results[sig['symbol']] = explanation
+        return results
+
+    async def _cache_lookup(self, symbol: str, signal_data: Dict, news_context: list):
+        """(anahtar, kayıtlı açıklama) döndür; önbellek yoksa (None, None)"""
+        if self.cache is None:
+            return None, None
+        import asyncio
+        key = self.cache.explanation_key(symbol, signal_data, news_context)
+        cached = await asyncio.get_running_loop().run_in_executor(None, self.cache.get, key)
+        return key, cached
+
+    async def _explain_uncached(self, symbol: str, signal_data: Dict, news_context: list,
+                                key: Optional[str]) -> str:
+        """Çoklu ajan analizi; başarılıysa önbelleğe yazılır, değilse şablon açıklama döner"""
+        import asyncio
+        try:
+            from src.ai.multi_agent import get_multi_agent_system
+            analysis = await get_multi_agent_system(self.provider).get_comprehensive_analysis(
+                symbol, signal_data, news_context
+            )
         except Exception as e:
             logger.error(f"AI Generation Error for {symbol}: {e}")
-            return self._sync_explain(symbol, signal_data, news_context)
+            analysis = None
+        if not analysis:
+            return self._fallback_explanation(symbol, signal_data)
+        if key is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.cache.put, key, analysis,
+                                                             'explanation', symbol)
+        return analysis
+
+    @staticmethod
+    def _batch_item(signal_data: Dict, news_context: list) -> Dict:
+        """Toplu prompt'a giren sinyal özeti"""
+        return {
+            'symbol': signal_data['symbol'],
+            'decision': signal_data.get('decision', 'HOLD'),
+            'score': round(signal_data.get('combined_score') or 0, 1),
+            'reasons': signal_data.get('reasons', []),
+            'headlines': [n.get('title') for n in (news_context or [])[:3]]
+        }
+
+    def explain_signal(self, symbol: str, signal_data: Dict, news_context: list = []) -> str:
+        """
+        explain_signal_async'in senkron hali (event loop dışındaki çağıranlar için).
+        """
+        if not self.enabled:
+            return self._fallback_explanation(symbol, signal_data)
+
+        import asyncio
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.explain_signal_async(symbol, signal_data, news_context))
+        # Çalışan bir loop'u bloklamadan bekleyemeyiz (dashboard gibi); basitleştirilmiş sentez
+        return self._sync_explain(symbol, signal_data, news_context)
 
     def _sync_explain(self, symbol: str, signal_data: Dict, news_context: list = []) -> str:
         """Senkronize basitleştirilmiş analiz"""
@@ -63,8 +151,12 @@ class AIAnalyst:
             news_text = "\n".join([f"- {n.get('title')}" for n in news_context[:2]]) if news_context else ""
             
             prompt = f"Baş Analist olarak {symbol} için {decision} kararını özetle. Teknik: {tech_signals}. Haberler: {news_text}. 2 cümle."
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            if not self.backend.external:
+                return self.backend.generate(prompt)
+            return self.provider.fetch(
+                'gemini.generate', prompt,
+                lambda: self.backend.generate(prompt)
+            )
         except:
             return self._fallback_explanation(symbol, signal_data)
 
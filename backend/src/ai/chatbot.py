@@ -1,30 +1,77 @@
-import google.generativeai as genai
 import os
 import json
 import logging
-from typing import List, Dict
-from pathlib import Path
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Dict, Optional
+from src.ai.llm_backend import get_llm_backend
 
 logger = logging.getLogger(__name__)
 
-class AIChatbot:
+DISABLED_MESSAGE = "⚠️ AI Asistanı aktif değil (API Anahtarı eksik)."
+
+SYSTEM_PROMPT = "Sen Methefor Finansal Özgürlük asistanısın. Kullanıcıya borsa, finans ve sistemin durumu hakkında yardımcı ol. Kısa ve öz cevaplar ver."
+
+# Sistem durumu bağlamı bu süre (saniye) boyunca yeniden üretilmez
+DEFAULT_CONTEXT_TTL = 30.0
+# Oturum başına modele gönderilen en fazla soru-cevap turu (eskiler kırpılır)
+DEFAULT_MAX_TURNS = 10
+# Boşta kalan oturumlar bu süreden sonra silinir; toplam oturum sayısı sınırlıdır
+SESSION_IDLE_SECONDS = 3600
+MAX_SESSIONS = 500
+
+
+class ChatSession:
+    """Tek kullanıcının sohbet geçmişi (bağlam eklenmemiş yalın mesajlar)"""
+
     def __init__(self):
+        self.history: List[Dict] = []   # [{'role': 'user'|'model', 'parts': [metin]}]
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def trim(self, max_turns: int):
+        # Her tur bir kullanıcı + bir model mesajıdır
+        excess = len(self.history) - max_turns * 2
+        if excess > 0:
+            del self.history[:excess]
+
+
+class AIChatbot:
+    def __init__(self, context_provider: Optional[Callable[[], str]] = None):
         self.api_key = self._load_api_key()
-        self.model = None
-        self.chat_session = None
-        self.history = []
+        # Sistem talimatı modele verilir; ayrı bir 'hazırlık' mesajı gönderilmez
+        self.backend = get_llm_backend(self.api_key, system_instruction=SYSTEM_PROMPT)
+        # Sistem durumu metnini üreten fonksiyon (dashboard'un bellekteki snapshot'ı)
+        self.context_provider = context_provider
+        self.context_ttl = float(os.getenv('METHEFOR_CHAT_CONTEXT_TTL', DEFAULT_CONTEXT_TTL))
+        self.max_turns = int(os.getenv('METHEFOR_CHAT_MAX_TURNS', DEFAULT_MAX_TURNS))
+        self._context = None  # (metin, üretildiği an)
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
         
-        if self.api_key:
-            try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel('gemini-2.5-flash')
-                self.start_new_session()
-                logger.info("AIChatbot initialized successfully")
-            except Exception as e:
-                logger.error(f"AIChatbot initialization failed: {e}")
-        else:
+        # Model ilk mesajda kurulur (açılışta Gemini'ye istek atılmaz)
+        if not self.enabled:
             logger.warning("AIChatbot disabled: API Key not found")
 
+    @property
+    def enabled(self) -> bool:
+        return self.backend.available
+
+    def _get_session(self, user_id: str) -> ChatSession:
+        """Kullanıcının oturumunu döndür; boşta kalanları ve sınırı aşanları temizle"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.pop(user_id, None) or ChatSession()
+            session.last_used = now
+            self._sessions[user_id] = session  # en sona (en yeni) taşı
+            while self._sessions:
+                oldest_id, oldest = next(iter(self._sessions.items()))
+                if len(self._sessions) <= MAX_SESSIONS and now - oldest.last_used < SESSION_IDLE_SECONDS:
+                    break
+                del self._sessions[oldest_id]
+            return session
+
     def _load_api_key(self):
         """Load API key from config or env"""
         try:
@@ -47,60 +94,95 @@ class AIChatbot:
             logger.error(f"Error loading API key: {e}")
         return None
 
-    def start_new_session(self):
-        """Start a fresh chat session"""
-        if self.model:
-            self.chat_session = self.model.start_chat(history=[])
-            initial_prompt = "Sen Methefor Finansal Özgürlük asistanısın. Kullanıcıya borsa, finans ve sistemin durumu hakkında yardımcı ol. Kısa ve öz cevaplar ver."
-            self.chat_session.send_message(initial_prompt)
-            self.history = []
+    def start_new_session(self, user_id: Optional[str] = None):
+        """Kullanıcının sohbetini sıfırla (user_id yoksa tüm oturumlar)"""
+        with self._lock:
+            if user_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(user_id, None)
 
     def _get_system_context(self) -> str:
-        """Veritabanından güncel durumu çek ve metin olarak döndür"""
+        """Güncel sistem durumu metni (context_ttl süresince önbellekten)"""
+        if self.context_provider is None:
+            return ""
+        cached = self._context
+        if cached is not None and time.monotonic() - cached[1] < self.context_ttl:
+            return cached[0]
         try:
-            from src.database import init_db, get_session, PortfolioItem, Signal
-            project_root = Path(__file__).parent.parent.parent
-            engine = init_db(str(project_root / "methefor.db"))
-            session = get_session(engine)
-            
-            # Portföy özeti
-            portfolio = session.query(PortfolioItem).all()
-            p_text = "Portföy: " + ", ".join([f"{p.symbol} ({p.quantity} adet)" for p in portfolio if p.quantity > 0])
-            
-            # Son sinyaller
-            signals = session.query(Signal).order_by(Signal.timestamp.desc()).limit(5).all()
-            s_text = "Son Sinyaller: " + ", ".join([f"{s.symbol} ({s.decision})" for s in signals])
-            
-            session.close()
-            return f"\n[SİSTEM DURUMU]\n{p_text}\n{s_text}\n"
+            text = self.context_provider() or ""
         except Exception as e:
             logger.error(f"Context error: {e}")
-            return ""
+            text = cached[0] if cached else ""
+        self._context = (text, time.monotonic())
+        return text
 
-    def send_message(self, message: str) -> str:
+    def _with_context(self, message: str) -> str:
+        # Güncel bağlam yalnızca bu mesaja eklenir; geçmişte yalın soru saklanır,
+        # böylece istek boyutu sohbet uzadıkça büyümez
+        return f"{self._get_system_context()}\nKullanıcı Sorusu: {message}"
+
+    @staticmethod
+    def _error_message(e: Exception) -> str:
+        error_msg = str(e)
+        logger.error(f"Chat error: {error_msg}")
+        if "quota" in error_msg.lower():
+            return "❌ API kota sınırına ulaşıldı. Lütfen bir süre bekleyin."
+        if "finish_reason" in error_msg.lower():
+            return "❌ AI yanıtı güvenlik filtresine takıldı. Lütfen farklı bir soru sorun."
+        return f"❌ AI hatası: {error_msg[:100]}..."
+
+    def send_message(self, message: str, user_id: str = 'default') -> str:
         """Send message to AI with context and get response"""
-        if not self.model or not self.chat_session:
-            return "⚠️ AI Asistanı aktif değil (API Anahtarı eksik)."
+        if not self.enabled:
+            return DISABLED_MESSAGE
         
         try:
-            # Her mesajda güncel bağlamı ekle
-            context = self._get_system_context()
-            full_message = f"{context}\nKullanıcı Sorusu: {message}"
+            session = self._get_session(user_id)
             
-            response = self.chat_session.send_message(full_message)
-            return response.text
+            with session.lock:
+                contents = session.history + [{'role': 'user', 'parts': [self._with_context(message)]}]
+                answer = self.backend.generate(contents)
+                session.history.append({'role': 'user', 'parts': [message]})
+                session.history.append({'role': 'model', 'parts': [answer]})
+                session.trim(self.max_turns)
+            return answer
         except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Chat error: {error_msg}")
-            if "quota" in error_msg.lower():
-                return "❌ API kota sınırına ulaşıldı. Lütfen bir süre bekleyin."
-            if "finish_reason" in error_msg.lower():
-                return "❌ AI yanıtı güvenlik filtresine takıldı. Lütfen farklı bir soru sorun."
-            return f"❌ AI hatası: {error_msg[:100]}..."
-
-    def get_history(self) -> List[Dict]:
-        """Return chat history (simplified for frontend)"""
-        # Gemini history object is complex, we might maintain our own simple list or parse theirs
-        # For simplicity, let's rely on what we store or just return empty if not needed
-        # The frontend usually appends messages locally.
-        return []
+            return self._error_message(e)
+
+    def stream_message(self, message: str, user_id: str = 'default') -> Iterator[str]:
+        """
+        send_message'ın akış hali: yanıt parçalarını üretildikçe döndürür.
+        Tüketici erken bırakırsa (close) model akışı okunmaz ve tur geçmişe yazılmaz.
+        """
+        if not self.enabled:
+            yield DISABLED_MESSAGE
+            return
+        
+        parts = []
+        try:
+            session = self._get_session(user_id)
+            with session.lock:
+                contents = session.history + [{'role': 'user', 'parts': [self._with_context(message)]}]
+            
+            for text in self.backend.stream(contents):
+                parts.append(text)
+                yield text
+        except Exception as e:
+            yield self._error_message(e)
+            return
+        
+        with session.lock:
+            session.history.append({'role': 'user', 'parts': [message]})
+            session.history.append({'role': 'model', 'parts': [''.join(parts)]})
+            session.trim(self.max_turns)
+
+    def get_history(self, user_id: str = 'default') -> List[Dict]:
+        """Kullanıcının (kırpılmış) sohbet geçmişi, frontend formatında"""
+        with self._lock:
+            session = self._sessions.get(user_id)
+        if session is None:
+            return []
+        with session.lock:
+            return [{'role': 'user' if item['role'] == 'user' else 'ai', 'content': item['parts'][0]}
+                    for item in session.history]
@@ -0,0 +1,160 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Arka Plan AI Açıklama Worker'ı
+Sinyaller kaydedildikten sonra açıklama istekleri sınırlı bir asyncio kuyruğuna konur;
+worker görevleri açıklamaları üretip ilgili signals satırının ai_explanation kolonunu
+doldurur. Böylece DB yazımı ve paper trading harici LLM çağrısını beklemez.
+
+- submit(): sinyali (db_id ile) kuyruğa koy; kuyruk doluysa istek düşürülür
+- aynı sembol için yenisi kuyruğa girerse eskisi atlanır (superseded)
+- batch_size > 1 ise worker kuyruktaki bekleyen istekleri tek toplu Gemini çağrısıyla açıklar
+- drain(): kuyruktaki işlerin bitmesini bekle (tek seferlik çalıştırma kapanırken)
+- Dashboard, açıklaması dolan satırları fark edip Socket.IO ile yayınlar
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.database import Signal
+
+logger = logging.getLogger(__name__)
+
+
+class ExplanationWorker:
+    """Sinyal açıklamalarını arka planda üreten kuyruk + worker görevleri"""
+
+    def __init__(self, analyst, session_factory: Callable, workers: int = 2, queue_size: int = 50,
+                 batch_size: int = 1):
+        self.analyst = analyst
+        self.session_factory = session_factory
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop = None
+        self._latest: Dict[str, int] = {}  # sembol -> kuyruktaki en yeni sinyalin db_id'si
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'explained': 0, 'failed': 0, 'dropped': 0, 'superseded': 0, 'batches': 0}
+
+    def _count(self, stat: str, n: int = 1):
+        with self._lock:
+            self.stats[stat] += n
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """Çalışan event loop'ta worker görevlerini başlat (zaten çalışıyorsa bir şey yapmaz)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        if self._queue is not None and self._queue.qsize():
+            logger.warning(f"[AI] Önceki event loop'tan kalan {self._queue.qsize()} açıklama isteği bırakıldı")
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._latest.clear()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, signal: Dict, news_context: list) -> bool:
+        """Kaydedilmiş (db_id'li) sinyali açıklama kuyruğuna koy"""
+        if not signal.get('db_id'):
+            return False
+        self.start()
+        if self._latest.get(signal['symbol']) == signal['db_id']:
+            return False  # zaten kuyrukta
+        try:
+            self._queue.put_nowait((signal, news_context))
+        except asyncio.QueueFull:
+            self._count('dropped')
+            logger.warning(f"[AI] Açıklama kuyruğu dolu, {signal['symbol']} atlandı")
+            return False
+        self._latest[signal['symbol']] = signal['db_id']
+        self._count('submitted')
+        return True
+
+    async def _worker(self):
+        while True:
+            # Bir isteği bekle, o an kuyrukta birikmiş olanları da aynı partiye al
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                await self._explain(batch)
+            finally:
+                for signal, _ in batch:
+                    if self._latest.get(signal['symbol']) == signal['db_id']:
+                        del self._latest[signal['symbol']]
+                    self._queue.task_done()
+
+    async def _explain(self, batch: list):
+        active = []
+        for signal, news_context in batch:
+            if self._latest.get(signal['symbol']) != signal['db_id']:
+                # Aynı sembolün daha yeni sinyali kuyrukta; eskisini açıklamaya gerek yok
+                self._count('superseded')
+            else:
+                active.append((signal, news_context))
+        if not active:
+            return
+
+        symbols = ', '.join(signal['symbol'] for signal, _ in active)
+        started = time.perf_counter()
+        try:
+            if len(active) == 1:
+                signal, news_context = active[0]
+                explanations = {signal['symbol']: await self.analyst.explain_signal_async(
+                    signal['symbol'], signal, news_context)}
+            else:
+                self._count('batches')
+                explanations = await self.analyst.explain_signals_batch_async(active)
+            rows = []
+            for signal, _ in active:
+                signal['ai_explanation'] = explanations.get(signal['symbol'])
+                rows.append((signal['db_id'], signal['ai_explanation']))
+            await asyncio.get_running_loop().run_in_executor(None, self._save, rows)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._count('failed', len(active))
+            logger.error(f"[AI] Error {symbols}: {e}")
+            return
+        self._count('explained', len(active))
+        logger.info(f"[AI] {symbols} yorumlandı ({time.perf_counter() - started:.1f} sn).")
+
+    def _save(self, rows: list):
+        """[(signal_id, açıklama), ...] satırlarının ai_explanation kolonunu tek transaction'da yaz"""
+        session = self.session_factory()
+        try:
+            session.bulk_update_mappings(Signal, [{'id': row_id, 'ai_explanation': explanation}
+                                                  for row_id, explanation in rows])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Kuyruk boşalana kadar bekle; süre dolarsa False"""
+        if self._queue is None or self._loop is not asyncio.get_running_loop():
+            return True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"[AI] {self._queue.qsize()} açıklama isteği tamamlanmadan bırakıldı")
+            return False
+
+    async def stop(self):
+        """Worker görevlerini durdur"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,226 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - LLM Arka Ucu
+AI bileşenleri (analist, çoklu ajan, sohbet) modele bu arayüzden erişir:
+- gemini: google.generativeai (varsayılan; GEMINI_API_KEY gerekir)
+- local:  ağsız, deterministik yerel model; yük testleri ve benchmark'lar için
+          şablon + Markov tarzı metin, ayarlanabilir gecikme dağılımı ve hata enjeksiyonu
+
+Ortam değişkenleri:
+    METHEFOR_LLM_BACKEND=gemini|local
+    METHEFOR_LLM_LOCAL_LATENCY_MS="400-1500"   (sabit veya min-max aralığı; ilk parça süresi)
+    METHEFOR_LLM_LOCAL_CHUNK_MS=30             (akışta parçalar arası gecikme)
+    METHEFOR_LLM_LOCAL_ERROR_RATE=0.0          (0-1 arası; çağrının hata verme olasılığı)
+    METHEFOR_LLM_SEED=0
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Iterator, Optional
+
+from src.lazy_import import lazy_import
+from src.providers.replay import parse_latency
+
+genai = lazy_import('google.generativeai')
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('gemini', 'local')
+GEMINI_MODEL = 'gemini-2.5-flash'
+
+
+class LLMBackendError(RuntimeError):
+    """Model çağrısı başarısız (yerel arka uçta enjekte edilen hatalar dahil)"""
+
+
+class LLMBackend:
+    """
+    Model arayüzü. contents ya düz prompt metni ya da
+    [{'role': 'user'|'model', 'parts': [metin]}] biçiminde sohbet geçmişidir.
+    """
+
+    name = 'base'
+    # Harici servis mi? Yerel arka uç record/replay katmanından geçmez (replay'de de yerel üretir)
+    external = True
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def generate(self, contents, timeout: Optional[float] = None, json_response: bool = False) -> str:
+        raise NotImplementedError
+
+    def stream(self, contents) -> Iterator[str]:
+        """Yanıtı parça parça döndür (varsayılan: tek parça)"""
+        yield self.generate(contents)
+
+
+class GeminiBackend(LLMBackend):
+    """google.generativeai üzerinden Gemini (istemci ilk çağrıda kurulur)"""
+
+    name = 'gemini'
+
+    def __init__(self, api_key: Optional[str], system_instruction: Optional[str] = None,
+                 model_name: str = GEMINI_MODEL):
+        self.api_key = api_key
+        self.system_instruction = system_instruction
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def model(self):
+        if self._model is None and self.api_key:
+            with self._lock:
+                if self._model is None:
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.model_name,
+                                                        system_instruction=self.system_instruction)
+                    logger.info(f"[OK] Gemini istemcisi hazır ({self.model_name})")
+        return self._model
+
+    def generate(self, contents, timeout: Optional[float] = None, json_response: bool = False) -> str:
+        generation_config = {'response_mime_type': 'application/json'} if json_response else None
+        request_options = {'timeout': timeout} if timeout else None
+        response = self.model.generate_content(contents, generation_config=generation_config,
+                                               request_options=request_options)
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            logger.debug(f"Gemini tokens: prompt={usage.prompt_token_count} yanıt={usage.candidates_token_count}")
+        return response.text.strip()
+
+    def stream(self, contents) -> Iterator[str]:
+        for chunk in self.model.generate_content(contents, stream=True):
+            text = chunk.text
+            if text:
+                yield text
+
+
+# Yerel modelin Markov zinciri için küçük finans derlemi
+_CORPUS = """
+teknik göstergeler kısa vadede alıcıların kontrolü elinde tuttuğuna işaret ediyor.
+haber akışı piyasa algısını olumlu yönde destekliyor ancak oynaklık yüksek kalabilir.
+momentum zayıflarken hacim artışı dikkatle izlenmeli ve risk yönetimi ön planda tutulmalı.
+trend yukarı yönlü olsa da aşırı alım bölgesine yaklaşılması temkinli olmayı gerektiriyor.
+makro tarafta faiz beklentileri risk iştahını sınırlıyor ve dalgalanmayı artırıyor.
+destek seviyeleri korunduğu sürece olumlu görünüm geçerliliğini koruyor.
+satış baskısı sürerken kısa vadeli tepki alımları sınırlı kalabilir.
+şirket haberleri yatırımcı ilgisini canlı tutuyor ve fiyatlamayı destekliyor.
+"""
+
+
+def _build_chain(corpus: str):
+    """(cümle başı kelimeleri, kelime -> ardından gelebilecek kelimeler)"""
+    starts, chain = [], {}
+    for sentence in corpus.strip().splitlines():
+        words = sentence.split()
+        starts.append(words[0])
+        for current, following in zip(words, words[1:]):
+            chain.setdefault(current, []).append(following)
+    return starts, chain
+
+
+class LocalBackend(LLMBackend):
+    """
+    Ağsız, deterministik yerel model. Aynı prompt her zaman aynı metni üretir;
+    gecikme ve hatalar ayrı bir (seed'li) üreteçten gelir.
+    JSON istenirse prompt'taki sembol listesinden {sembol: açıklama} döner.
+    """
+
+    name = 'local'
+    external = False
+    _starts, _chain = _build_chain(_CORPUS)
+
+    def __init__(self, latency_ms=(400, 1500), chunk_ms: float = 30, error_rate: float = 0.0,
+                 seed: int = 0, sentences: int = 2):
+        self.latency_ms = latency_ms
+        self.chunk_ms = chunk_ms
+        self.error_rate = error_rate
+        self.sentences = sentences
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'errors': 0}
+
+    def _delay(self) -> float:
+        low, high = self.latency_ms
+        with self._lock:
+            self.stats['calls'] += 1
+            fail = self._rng.random() < self.error_rate
+            delay = self._rng.uniform(low, high) / 1000
+            if fail:
+                self.stats['errors'] += 1
+        if fail:
+            time.sleep(delay / 2)
+            raise LLMBackendError("Yerel LLM: enjekte edilmiş hata (429 quota exceeded)")
+        return delay
+
+    @staticmethod
+    def _prompt_text(contents) -> str:
+        if isinstance(contents, str):
+            return contents
+        return '\n'.join(str(part) for item in contents for part in item.get('parts', []))
+
+    def _text(self, seed_text: str, subject: str) -> str:
+        """seed_text'ten türetilen deterministik Markov metni"""
+        rng = random.Random(hashlib.sha1(seed_text.encode('utf-8')).hexdigest())
+        sentences = []
+        for _ in range(self.sentences):
+            word = rng.choice(self._starts)
+            words = [word]
+            while word in self._chain and len(words) < 18:
+                word = rng.choice(self._chain[word])
+                words.append(word)
+            sentence = ' '.join(words).rstrip('.')
+            sentences.append(sentence[0].upper() + sentence[1:] + '.')
+        return f"{subject}: " + ' '.join(sentences) if subject else ' '.join(sentences)
+
+    def _respond(self, contents, json_response: bool) -> str:
+        prompt = self._prompt_text(contents)
+        if json_response:
+            symbols = re.findall(r'"symbol":\s*"([^"]+)"', prompt)
+            return json.dumps({symbol: self._text(prompt + symbol, symbol) for symbol in symbols},
+                              ensure_ascii=False)
+        return self._text(prompt, '')
+
+    def generate(self, contents, timeout: Optional[float] = None, json_response: bool = False) -> str:
+        delay = self._delay()
+        if timeout and delay > timeout:
+            time.sleep(timeout)
+            raise LLMBackendError(f"Yerel LLM: zaman aşımı ({timeout:g} sn)")
+        time.sleep(delay)
+        return self._respond(contents, json_response)
+
+    def stream(self, contents) -> Iterator[str]:
+        # İlk parça örneklenen gecikmeden sonra, kalanlar chunk_ms aralıkla gelir
+        time.sleep(self._delay())
+        words = self._respond(contents, False).split(' ')
+        for i in range(0, len(words), 3):
+            if i:
+                time.sleep(self.chunk_ms / 1000)
+            yield ' '.join(words[i:i + 3]) + ' '
+
+
+def get_llm_backend(api_key: Optional[str] = None, system_instruction: Optional[str] = None) -> LLMBackend:
+    """METHEFOR_LLM_BACKEND'e göre arka ucu oluştur (her AI bileşeni kendi örneğini tutar)"""
+    name = os.getenv('METHEFOR_LLM_BACKEND', 'gemini').lower()
+    if name not in BACKENDS:
+        logger.warning(f"Geçersiz METHEFOR_LLM_BACKEND={name}, gemini kullanılacak")
+        name = 'gemini'
+    if name == 'local':
+        latency = parse_latency(os.getenv('METHEFOR_LLM_LOCAL_LATENCY_MS', '400-1500')).get('', (400, 1500))
+        return LocalBackend(
+            latency_ms=latency,
+            chunk_ms=float(os.getenv('METHEFOR_LLM_LOCAL_CHUNK_MS', '30')),
+            error_rate=float(os.getenv('METHEFOR_LLM_LOCAL_ERROR_RATE', '0')),
+            seed=int(os.getenv('METHEFOR_LLM_SEED', '0'))
+        )
+    return GeminiBackend(api_key, system_instruction=system_instruction)
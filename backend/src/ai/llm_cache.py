@@ -0,0 +1,132 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - LLM Yanıt Önbelleği
+Üretilen AI açıklamaları, sonucu belirleyen girdilerden türetilen bir anahtarla
+SQLite'ta (llm_cache tablosu) saklanır; yeniden başlatmalarda korunur.
+
+Açıklama anahtarı: sembol, karar, yuvarlanmış skor, sıralı gerekçeler ve
+ilgili haber başlıklarının hash'i. Aynı girdilerle gelen sinyal Gemini'ye gitmez.
+Kayıtlar TTL sonunda geçersiz olur; tablo max_entries'i aşarsa en uzun süredir
+kullanılmayanlar silinir.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from src.database import LLMCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Prompt veya anahtar yapısı değişince artırılır (eski kayıtlar eşleşmez)
+KEY_VERSION = 1
+
+
+class LLMCache:
+    """Kalıcı, TTL ve boyut sınırlı LLM yanıt önbelleği"""
+
+    def __init__(self, session_factory: Callable, ttl_seconds: float = 6 * 3600,
+                 max_entries: int = 500, score_step: float = 5):
+        self.session_factory = session_factory
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_entries = max_entries
+        self.score_step = score_step
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'writes': 0, 'evictions': 0, 'errors': 0}
+
+    def _count(self, stat: str, n: int = 1):
+        with self._lock:
+            self.stats[stat] += n
+
+    def explanation_key(self, symbol: str, signal_data: Dict, news_context: List[Dict]) -> str:
+        """Açıklamayı belirleyen girdilerden anahtar üret"""
+        score = signal_data.get('combined_score') or 0
+        step = self.score_step or 1
+        headlines = sorted({str(n.get('title', '')) for n in news_context or []})
+        parts = {
+            'v': KEY_VERSION,
+            'symbol': symbol,
+            'decision': signal_data.get('decision'),
+            'score': round(score / step) * step,
+            'reasons': sorted(str(r) for r in signal_data.get('reasons', [])),
+            'headlines': hashlib.sha1('\n'.join(headlines).encode('utf-8')).hexdigest()
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Geçerli kayıt varsa yanıtı döndür (kullanım bilgisi güncellenir)"""
+        try:
+            session = self.session_factory()
+            try:
+                entry = session.query(LLMCacheEntry).filter(LLMCacheEntry.key == key).first()
+                now = datetime.utcnow()
+                if entry is not None and entry.created_at < now - self.ttl:
+                    session.delete(entry)
+                    session.commit()
+                    self._count('expired')
+                    entry = None
+                if entry is None:
+                    self._count('misses')
+                    return None
+                entry.hits = (entry.hits or 0) + 1
+                entry.last_used_at = now
+                response = entry.response
+                session.commit()
+            finally:
+                session.close()
+        except Exception as e:
+            # Önbellek hatası açıklamayı engellemesin; kaçırma say
+            logger.error(f"LLM cache okuma hatası: {e}")
+            self._count('errors')
+            self._count('misses')
+            return None
+        self._count('hits')
+        return response
+
+    def put(self, key: str, response: str, kind: str = 'explanation', symbol: Optional[str] = None):
+        """Yanıtı kaydet; süresi dolanları ve sınırı aşan en eski kayıtları temizle"""
+        try:
+            session = self.session_factory()
+            try:
+                now = datetime.utcnow()
+                entry = session.query(LLMCacheEntry).filter(LLMCacheEntry.key == key).first()
+                if entry is None:
+                    entry = LLMCacheEntry(key=key)
+                    session.add(entry)
+                entry.kind = kind
+                entry.symbol = symbol
+                entry.response = response
+                entry.hits = 0
+                entry.created_at = now
+                entry.last_used_at = now
+                session.flush()
+                
+                evicted = session.query(LLMCacheEntry).filter(
+                    LLMCacheEntry.created_at < now - self.ttl
+                ).delete(synchronize_session=False)
+                stale_ids = [row.id for row in session.query(LLMCacheEntry.id)
+                             .order_by(LLMCacheEntry.last_used_at.desc(), LLMCacheEntry.id.desc())
+                             .offset(self.max_entries)]
+                if stale_ids:
+                    evicted += session.query(LLMCacheEntry).filter(
+                        LLMCacheEntry.id.in_(stale_ids)
+                    ).delete(synchronize_session=False)
+                session.commit()
+            finally:
+                session.close()
+        except Exception as e:
+            logger.error(f"LLM cache yazma hatası: {e}")
+            self._count('errors')
+            return
+        self._count('writes')
+        if evicted:
+            self._count('evictions', evicted)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        return stats
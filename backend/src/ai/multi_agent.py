@@ -1,66 +1,115 @@
-import google.generativeai as genai
+import asyncio
+import json
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 
+from src.providers.replay import get_data_provider
+from src.ai.llm_backend import get_llm_backend
+
 logger = logging.getLogger(__name__)
 
+# Tek ajan çağrısı için üst süre (saniye); aşılırsa o görüş atlanır
+DEFAULT_AGENT_TIMEOUT = 20.0
+# Uzman çağrıları eşzamanlı gider; blocking Gemini istemcisi bu havuzda çalışır
+AGENT_WORKERS = 6
+FAILED_OPINION = "Veri işlenemedi."
+# Toplu açıklama çağrısının üst süresi (çok sembollü yanıt daha uzun sürer)
+DEFAULT_BATCH_TIMEOUT = 60.0
+
+
+def parse_batch_response(text: str, symbols: List[str]) -> Dict[str, str]:
+    """
+    Toplu açıklama yanıtını çöz: {"AAPL": "...", ...} veya [{"symbol": "AAPL", "explanation": "..."}].
+    Yalnızca istenen ve boş olmayan açıklamalar döner; JSON geçersizse boş dict.
+    """
+    text = (text or '').strip()
+    if text.startswith('```'):
+        # ```json ... ``` bloğu
+        text = text.split('\n', 1)[1] if '\n' in text else ''
+        text = text.rsplit('```', 1)[0]
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return {}
+    if isinstance(payload, list):
+        payload = {str(item.get('symbol')): item.get('explanation')
+                   for item in payload if isinstance(item, dict)}
+    if not isinstance(payload, dict):
+        return {}
+    wanted = set(symbols)
+    return {symbol: value.strip() for symbol, value in payload.items()
+            if symbol in wanted and isinstance(value, str) and value.strip()}
+
 class MultiAgentSystem:
     """
     Methefor Çoklu Ajan Denetim Sistemi.
     Farklı uzmanlık alanlarına sahip ajanları yönetir ve analizleri sentezler.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, provider=None):
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
-        if not self.api_key:
+        self.provider = provider or get_data_provider()
+        self.backend = get_llm_backend(self.api_key)
+        self.timeout = float(os.getenv('METHEFOR_AGENT_TIMEOUT', DEFAULT_AGENT_TIMEOUT))
+        self.batch_timeout = float(os.getenv('METHEFOR_AGENT_BATCH_TIMEOUT', DEFAULT_BATCH_TIMEOUT))
+        self._executor = ThreadPoolExecutor(max_workers=AGENT_WORKERS, thread_name_prefix='agent')
+        # Model ilk ajan çağrısında kurulur (import sırasında Gemini yapılandırılmaz)
+        self.enabled = self.provider.is_replay or self.backend.available
+        if not self.enabled:
             logger.warning("MultiAgentSystem: API Key bulunamadı.")
-            self.enabled = False
-            return
-            
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-        self.enabled = True
-
-    async def get_comprehensive_analysis(self, symbol: str, tech_data: Dict, news_context: List[Dict]) -> str:
-        """Tüm ajanları çalıştır ve sentezlenmiş rapor al"""
+
+    async def get_comprehensive_analysis(self, symbol: str, tech_data: Dict, news_context: List[Dict]) -> Optional[str]:
+        """
+        Tüm ajanları çalıştır ve sentezlenmiş rapor al.
+        Teknik, temel ve makro uzmanlar eşzamanlı sorulur (tek tur), ardından baş analist
+        sentezler: sinyal başına iki tur gecikme. Analiz üretilemezse None döner.
+        """
         if not self.enabled:
-            return "Analiz yapılamadı: AI devre dışı."
+            return None
 
-        # 1. Uzman Görüşlerini Topla
-        tech_opinion = await self._get_technical_agent_opinion(symbol, tech_data)
-        fundamental_opinion = await self._get_fundamental_agent_opinion(symbol, news_context)
-        macro_opinion = await self._get_macro_agent_opinion(symbol, tech_data, news_context)
+        # 1. Uzman Görüşlerini Topla (eşzamanlı)
+        opinions = await asyncio.gather(
+            self._get_technical_agent_opinion(symbol, tech_data),
+            self._get_fundamental_agent_opinion(symbol, news_context),
+            self._get_macro_agent_opinion(symbol, tech_data, news_context)
+        )
+        if not any(opinions):
+            # Hiç görüş yoksa sentez çağrısı da boşa gider
+            return None
+        tech_opinion, fundamental_opinion, macro_opinion = (o or FAILED_OPINION for o in opinions)
 
         # 2. Baş Analist Sentezi
         return await self._get_chief_analyst_synthesis(symbol, tech_opinion, fundamental_opinion, macro_opinion)
 
-    async def _get_technical_agent_opinion(self, symbol: str, data: Dict) -> str:
+    async def _get_technical_agent_opinion(self, symbol: str, data: Dict) -> Optional[str]:
         prompt = f"""
         Sen bir TEKNİK ANALİZ uzmanısın. {symbol} için şu verileri yorumla:
         RSI: {data.get('rsi', 'N/A')}, Trend: {data.get('trend', 'N/A')}, Karar: {data.get('decision', 'N/A')}.
         Sadece teknik göstergelere odaklanarak 1 cümlelik keskin bir yorum yap.
         """
-        return self._generate(prompt)
+        return await self._generate(prompt)
 
-    async def _get_fundamental_agent_opinion(self, symbol: str, news: List[Dict]) -> str:
+    async def _get_fundamental_agent_opinion(self, symbol: str, news: List[Dict]) -> Optional[str]:
         news_text = "\n".join([f"- {n.get('title')}" for n in news[:3]])
         prompt = f"""
         Sen bir TEMEL ANALİZ ve HABER uzmanısın. {symbol} için şu haberleri yorumla:
         {news_text if news else 'Güncel haber bulunmuyor.'}
         Haber akışının piyasa algısına etkisini 1 cümle ile özetle.
         """
-        return self._generate(prompt)
+        return await self._generate(prompt)
 
-    async def _get_macro_agent_opinion(self, symbol: str, data: Dict, news: List[Dict]) -> str:
+    async def _get_macro_agent_opinion(self, symbol: str, data: Dict, news: List[Dict]) -> Optional[str]:
         prompt = f"""
         Sen bir MAKRO EKONOMİSTSİN. {symbol} ve genel piyasa riski hakkında yorum yap.
         Veriler: Teknik Skor {data.get('score', 50)}, Haber Sayısı: {len(news)}.
         Genel pazar konjonktürü ve risk iştahı açısından 1 cümlelik yorum yap.
         """
-        return self._generate(prompt)
+        return await self._generate(prompt)
 
-    async def _get_chief_analyst_synthesis(self, symbol: str, tech: str, fundamental: str, macro: str) -> str:
+    async def _get_chief_analyst_synthesis(self, symbol: str, tech: str, fundamental: str, macro: str) -> Optional[str]:
         prompt = f"""
         Sen Methefor Finansal Özgürlük sisteminin BAŞ ANALİSTİSİN.
         Aşağıdaki uzman görüşlerini harmanlayarak kullanıcı için 2-3 cümlelik, profesyonel ve etkileyici bir analiz raporu yaz.
@@ -71,14 +120,60 @@ class MultiAgentSystem:
         
         Dil: Türkçe. Yatırım tavsiyesi içermesin. Odak: {symbol}.
         """
-        return self._generate(prompt)
+        return await self._generate(prompt)
+
+    async def get_batch_analysis(self, items: List[Dict]) -> Dict[str, str]:
+        """
+        Birden çok sinyali tek yapılandırılmış çağrıyla açıkla.
+        items: [{'symbol', 'decision', 'score', 'reasons', 'headlines'}]
+        Yalnızca yanıtta geçerli açıklaması bulunan semboller döner (sembol -> açıklama).
+        """
+        if not self.enabled or not items:
+            return {}
+        prompt = f"""
+        Sen Methefor Finansal Özgürlük sisteminin BAŞ ANALİSTİSİN.
+        Aşağıdaki her sinyal için teknik gerekçeleri ve haber başlıklarını harmanlayarak
+        2-3 cümlelik, profesyonel bir analiz raporu yaz.
+        
+        SİNYALLER (JSON):
+        {json.dumps(items, ensure_ascii=False)}
+        
+        Dil: Türkçe. Yatırım tavsiyesi içermesin.
+        Yanıtı yalnızca JSON nesnesi olarak ver: anahtar sembol, değer o sembolün raporu.
+        """
+        text = await self._generate(prompt, timeout=self.batch_timeout, json_response=True)
+        return parse_batch_response(text, [item['symbol'] for item in items]) if text else {}
 
-    def _generate(self, prompt: str) -> str:
+    async def _generate(self, prompt: str, timeout: Optional[float] = None,
+                        json_response: bool = False) -> Optional[str]:
+        """Tek ajan çağrısı; zaman aşımı veya hata durumunda None"""
+        loop = asyncio.get_running_loop()
+        timeout = timeout or self.timeout
+        call = lambda: loop.run_in_executor(self._executor, self._generate_blocking,
+                                            prompt, timeout, json_response)
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            if not self.backend.external:
+                return await asyncio.wait_for(call(), timeout)
+            return await asyncio.wait_for(self.provider.fetch_async('gemini.generate', prompt, call), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Agent Generation Timeout: {timeout:g} sn aşıldı")
         except Exception as e:
             logger.error(f"Agent Generation Error: {e}")
-            return "Veri işlenemedi."
+        return None
+
+    def _generate_blocking(self, prompt: str, timeout: float, json_response: bool = False) -> str:
+        # İstemci tarafı zaman aşımı da verilir; aksi halde iptal edilen çağrı thread'i tutmaya devam eder
+        return self.backend.generate(prompt, timeout=timeout, json_response=json_response)
+
+
+_multi_agent_system = None
+_multi_agent_lock = threading.Lock()
+
 
-multi_agent_system = MultiAgentSystem()
+def get_multi_agent_system(provider=None) -> MultiAgentSystem:
+    """Süreç içi paylaşılan MultiAgentSystem (ilk çağrıda oluşturulur)"""
+    global _multi_agent_system
+    with _multi_agent_lock:
+        if _multi_agent_system is None:
+            _multi_agent_system = MultiAgentSystem(provider=provider)
+        return _multi_agent_system
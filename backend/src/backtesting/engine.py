@@ -1,12 +1,16 @@
 
+from __future__ import annotations
+
 import logging
-import pandas as pd
-import numpy as np
-import yfinance as yf
 from datetime import datetime, timedelta
 from typing import Dict, List
 import sys
 from pathlib import Path
+from src.lazy_import import lazy_import
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+yf = lazy_import('yfinance')
 
 # Add project root to path
 project_root = Path(__file__).parent.parent.parent
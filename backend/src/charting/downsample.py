@@ -0,0 +1,118 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Grafik Veri İndirgeme
+Uzun fiyat / equity serilerini grafik için sunucu tarafında küçültür.
+- Çizgi grafikler: LTTB (Largest-Triangle-Three-Buckets)
+- Mum grafikler: OHLC bucket birleştirme
+"""
+
+import math
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Sequence
+
+
+def epoch_seconds(ts: datetime) -> int:
+    """Veritabanındaki naive UTC datetime'ı epoch saniyeye çevir"""
+    return int(ts.replace(tzinfo=timezone.utc).timestamp())
+
+
+def lttb_indices(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """
+    LTTB ile görsel olarak en önemli noktaların index'lerini seç.
+    İlk ve son nokta her zaman korunur.
+    
+    Args:
+        xs: Artan x değerleri (ör: epoch saniye)
+        ys: y değerleri
+        threshold: Hedef nokta sayısı
+        
+    Returns:
+        Seçilen index listesi (artan sırada)
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    
+    indices = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    
+    for i in range(threshold - 2):
+        # Sonraki bucket'ın ortalaması (üçgenin üçüncü köşesi)
+        next_start = int(math.floor((i + 1) * bucket_size)) + 1
+        next_end = min(int(math.floor((i + 2) * bucket_size)) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+        
+        # Mevcut bucket içinde alanı en büyük noktayı seç
+        start = int(math.floor(i * bucket_size)) + 1
+        end = int(math.floor((i + 1) * bucket_size)) + 1
+        ax, ay = xs[a], ys[a]
+        
+        max_area = -1.0
+        chosen = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                chosen = j
+        
+        indices.append(chosen)
+        a = chosen
+    
+    indices.append(n - 1)
+    return indices
+
+
+def _merge_candles(candles: List[tuple]) -> tuple:
+    """(t, o, h, l, c, v) listesini tek muma birleştir"""
+    return (
+        candles[0][0],
+        candles[0][1],
+        max(c[2] for c in candles),
+        min(c[3] for c in candles),
+        candles[-1][4],
+        sum(c[5] or 0 for c in candles)
+    )
+
+
+def bucket_ohlc(candles: List[tuple], key: Callable[[datetime], object]) -> List[tuple]:
+    """
+    Mumları takvim bucket'larına (gün/hafta/ay) göre birleştir.
+    
+    Args:
+        candles: Zamana göre sıralı (datetime, open, high, low, close, volume) listesi
+        key: datetime -> bucket anahtarı
+    """
+    merged = []
+    group = []
+    group_key = None
+    for candle in candles:
+        k = key(candle[0])
+        if group and k != group_key:
+            merged.append(_merge_candles(group))
+            group = []
+        group_key = k
+        group.append(candle)
+    if group:
+        merged.append(_merge_candles(group))
+    return merged
+
+
+def aggregate_ohlc(candles: List[tuple], max_points: int) -> List[tuple]:
+    """
+    Mum sayısı max_points'i aşıyorsa ardışık mumları eşit gruplara birleştir.
+    Her grup: ilk open, en yüksek high, en düşük low, son close, toplam volume.
+    """
+    n = len(candles)
+    if max_points <= 0 or n <= max_points:
+        return candles
+    group_size = math.ceil(n / max_points)
+    return [_merge_candles(candles[i:i + group_size]) for i in range(0, n, group_size)]
+
+
+def to_columns(rows: List[tuple], names: Sequence[str]) -> Dict[str, list]:
+    """Satır tuple'larını kolon dizilerine çevir (JSON boyutunu küçültür)"""
+    if not rows:
+        return {name: [] for name in names}
+    return {name: list(col) for name, col in zip(names, zip(*rows))}
@@ -0,0 +1,90 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Dashboard Eşzamanlılık Yardımcıları
+Sunucu modu (threading / gevent / eventlet) seçimi ve bloklayan işlerin
+(SQLite, Gemini) sınırlı bir OS thread havuzuna aktarılması.
+
+Sunucu modu METHEFOR_ASYNC_MODE ortam değişkeni ile seçilir:
+- threading: Werkzeug geliştirme sunucusu (varsayılan)
+- gevent:    gevent + WebSocket, cooperative concurrency (production)
+- eventlet:  eventlet + WebSocket
+"""
+
+import os
+from functools import wraps
+
+ASYNC_MODES = ('threading', 'gevent', 'eventlet')
+ASYNC_MODE = os.getenv('METHEFOR_ASYNC_MODE', 'threading').lower()
+if ASYNC_MODE not in ASYNC_MODES:
+    ASYNC_MODE = 'threading'
+
+# Aynı anda çalışabilecek bloklayan iş sayısı (DB sorguları, LLM çağrıları)
+BLOCKING_POOL_SIZE = int(os.getenv('METHEFOR_BLOCKING_POOL_SIZE', '16'))
+
+_pool = None
+
+
+def monkey_patch():
+    """
+    gevent/eventlet modunda standart kütüphaneyi cooperative hale getir.
+    Diğer tüm import'lardan ÖNCE çağrılmalıdır.
+    """
+    if ASYNC_MODE == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    elif ASYNC_MODE == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        if ASYNC_MODE == 'gevent':
+            from gevent import get_hub
+            _pool = get_hub().threadpool
+            _pool.maxsize = BLOCKING_POOL_SIZE
+        elif ASYNC_MODE == 'eventlet':
+            os.environ.setdefault('EVENTLET_THREADPOOL_SIZE', str(BLOCKING_POOL_SIZE))
+            from eventlet import tpool
+            _pool = tpool
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            _pool = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix='blocking')
+    return _pool
+
+
+def run_blocking(fn, *args, **kwargs):
+    """
+    Bloklayan bir fonksiyonu sınırlı OS thread havuzunda çalıştır ve sonucunu döndür.
+    gevent/eventlet modunda çağıran greenlet beklerken diğer istekler ve socket'ler çalışmaya devam eder.
+    """
+    pool = _get_pool()
+    if ASYNC_MODE == 'gevent':
+        return pool.apply(fn, args, kwargs)
+    if ASYNC_MODE == 'eventlet':
+        return pool.execute(fn, *args, **kwargs)
+    return pool.submit(fn, *args, **kwargs).result()
+
+
+def offload(view):
+    """
+    Flask view'unu (request context ile birlikte) bloklayan iş havuzunda çalıştır.
+    DB'ye giden endpoint'ler için kullanılır. threading modunda her istek zaten
+    kendi thread'inde çalıştığı için view olduğu gibi döner.
+    """
+    if ASYNC_MODE == 'threading':
+        return view
+
+    from flask import copy_current_request_context
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return run_blocking(copy_current_request_context(view), *args, **kwargs)
+    return wrapper
+
+
+def server_run_options() -> dict:
+    """socketio.run() için moda özel parametreler"""
+    if ASYNC_MODE == 'threading':
+        return {'allow_unsafe_werkzeug': True}
+    return {}
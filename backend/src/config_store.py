@@ -0,0 +1,262 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Config Store
+JSON config dosyaları (watchlist, settings) için bellek içi önbellek.
+- Dosya yalnızca mtime/boyut değiştiğinde yeniden okunur
+- Yazmalar kilit altında, geçici dosya + rename ile atomik yapılır
+- Aynı dosya için süreç içinde tek bir store paylaşılır (get_*_store)
+"""
+
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class JSONConfigStore:
+    """mtime tabanlı yeniden yükleme ve atomik yazma destekli JSON config"""
+
+    def __init__(self, path, default: Optional[dict] = None):
+        self.path = Path(path)
+        self.default = default if default is not None else {}
+        self._lock = threading.RLock()
+        self._data = None
+        self._stamp = None
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _load(self, stamp):
+        if stamp is None:
+            data = copy.deepcopy(self.default)
+        else:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.error(f"Config yükleme hatası ({self.path}): {e}")
+                data = self._data if self._data is not None else copy.deepcopy(self.default)
+        self._data = data
+        self._stamp = stamp
+        self._rebuild_views(data)
+
+    def _rebuild_views(self, data: dict):
+        """Alt sınıflar türetilmiş görünümleri burada hesaplar (her yeniden yüklemede bir kez)"""
+        pass
+
+    def _refresh(self):
+        stamp = self._file_stamp()
+        if self._data is None or stamp != self._stamp:
+            with self._lock:
+                if self._data is None or stamp != self._stamp:
+                    self._load(stamp)
+
+    def get(self) -> dict:
+        """
+        Güncel config'i döndür. Dönen dict paylaşılır, değiştirilmemelidir;
+        değişiklik için update() kullanın.
+        """
+        self._refresh()
+        return self._data
+
+    @contextmanager
+    def _file_lock(self):
+        """Süreçler arası yazma kilidi (POSIX'te flock, diğerlerinde yalnızca thread kilidi)"""
+        if fcntl is None:
+            yield
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(f"{self.path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_atomic(self, data: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.path.parent), prefix=f".{self.path.name}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def update(self, mutator: Callable[[dict], object]):
+        """
+        Config'i kilit altında güncelle.
+        mutator, güncel verinin kopyasını alır ve yerinde değiştirir. mutator None dışında
+        bir değer döndürürse ve bu değer (False, ...) ise değişiklik yazılmaz.
+        
+        Returns:
+            mutator'ın dönüş değeri
+        """
+        with self._lock, self._file_lock():
+            # Başka bir süreç yazmış olabilir, kilit altında tazele
+            self._load(self._file_stamp())
+            data = copy.deepcopy(self._data)
+            result = mutator(data)
+            if isinstance(result, tuple) and result and result[0] is False:
+                return result
+            self._write_atomic(data)
+            self._load(self._file_stamp())
+            return result
+
+
+class WatchlistStore(JSONConfigStore):
+    """watchlist.json + düzleştirilmiş/indekslenmiş görünümler"""
+
+    def __init__(self, path):
+        super().__init__(path, default={'stocks': {'custom': []}})
+        self.entries: List[Dict] = []
+        self.index: Dict[str, Dict] = {}
+        self.categories: Dict[str, int] = {}
+        self.engine_symbols: List[str] = []
+
+    def _rebuild_views(self, data: dict):
+        entries = []
+        for category, symbols in data.get('stocks', {}).items():
+            for symbol in symbols:
+                entries.append({'symbol': symbol, 'category': f'US_{category}', 'type': 'stock', 'market': 'US'})
+        for symbol in data.get('turkish_stocks', []):
+            entries.append({'symbol': symbol, 'category': 'Turkish', 'type': 'stock', 'market': 'TR'})
+        for symbol in data.get('commodities', []):
+            entries.append({'symbol': symbol, 'category': 'Commodities', 'type': 'commodity', 'market': 'GLOBAL'})
+        for symbol in data.get('crypto', []):
+            entries.append({'symbol': symbol, 'category': 'Crypto', 'type': 'crypto', 'market': 'CRYPTO'})
+
+        categories = {'US': 0, 'TR': 0, 'Commodities': 0, 'Crypto': 0}
+        index = {}
+        for entry in entries:
+            index.setdefault(entry['symbol'], entry)
+            if entry['market'] == 'US':
+                categories['US'] += 1
+            elif entry['market'] == 'TR':
+                categories['TR'] += 1
+            if entry['type'] == 'commodity':
+                categories['Commodities'] += 1
+            elif entry['type'] == 'crypto':
+                categories['Crypto'] += 1
+
+        # Engine'in analiz ettiği semboller: stocks kategorileri + crypto
+        engine_symbols = []
+        for stock_list in data.get('stocks', {}).values():
+            engine_symbols.extend(stock_list)
+        engine_symbols.extend(data.get('crypto', []))
+
+        self.entries = entries
+        self.index = index
+        self.categories = categories
+        self.engine_symbols = list(dict.fromkeys(engine_symbols))
+
+    def get_entries(self) -> List[Dict]:
+        self._refresh()
+        return self.entries
+
+    def get_categories(self) -> Dict[str, int]:
+        self._refresh()
+        return self.categories
+
+    def get_engine_symbols(self) -> List[str]:
+        self._refresh()
+        return self.engine_symbols
+
+    def contains(self, symbol: str) -> bool:
+        self._refresh()
+        return symbol in self.index
+
+    def add_symbol(self, symbol: str, category: str = 'custom', commodity_symbols=()):
+        """
+        Sembolü uygun listeye ekle.
+        
+        Returns:
+            (True, eklenen_kategori) veya (False, hata_mesajı)
+        """
+        def mutate(watchlist):
+            all_current = set()
+            for cat_symbols in watchlist.get('stocks', {}).values():
+                all_current.update(cat_symbols)
+            all_current.update(watchlist.get('turkish_stocks', []))
+            all_current.update(watchlist.get('commodities', []))
+            all_current.update(watchlist.get('crypto', []))
+
+            if symbol in all_current:
+                return False, f'{symbol} zaten watchlist\'te'
+
+            if category == 'crypto' or symbol.endswith('-USD'):
+                watchlist.setdefault('crypto', []).append(symbol)
+                return True, 'Crypto'
+            if category == 'turkish' or symbol.endswith('.IS'):
+                watchlist.setdefault('turkish_stocks', []).append(symbol)
+                return True, 'Turkish'
+            if category in commodity_symbols:
+                watchlist.setdefault('commodities', []).append(symbol)
+                return True, 'Commodities'
+            watchlist.setdefault('stocks', {}).setdefault('custom', []).append(symbol)
+            return True, 'US_custom'
+
+        return self.update(mutate)
+
+    def remove_symbol(self, symbol: str):
+        """
+        Sembolü watchlist'ten sil.
+        
+        Returns:
+            (True, silindiği_kategori) veya (False, None)
+        """
+        def mutate(watchlist):
+            for category, symbols in watchlist.get('stocks', {}).items():
+                if symbol in symbols:
+                    symbols.remove(symbol)
+                    return True, f'US_{category}'
+            for key, label in (('turkish_stocks', 'Turkish'), ('commodities', 'Commodities'), ('crypto', 'Crypto')):
+                if symbol in watchlist.get(key, []):
+                    watchlist[key].remove(symbol)
+                    return True, label
+            return False, None
+
+        return self.update(mutate)
+
+
+_stores: Dict[str, JSONConfigStore] = {}
+_stores_lock = threading.Lock()
+
+
+def _get_store(path, factory):
+    key = str(Path(path).resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = factory(path)
+            _stores[key] = store
+        return store
+
+
+def get_watchlist_store(path) -> WatchlistStore:
+    """Verilen watchlist dosyası için süreç içi paylaşılan store"""
+    return _get_store(path, WatchlistStore)
+
+
+def get_config_store(path, default: Optional[dict] = None) -> JSONConfigStore:
+    """Verilen JSON config dosyası için süreç içi paylaşılan store"""
+    return _get_store(path, lambda p: JSONConfigStore(p, default=default))
@@ -1,7 +1,9 @@
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, JSON, ForeignKey, Index, UniqueConstraint, and_, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 from datetime import datetime
+import base64
 import json
 import os
 from pathlib import Path
@@ -24,6 +26,10 @@ class NewsItem(Base):
     sentiment_label = Column(String(20))
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_news_items_published_id', 'published_date', 'id'),
+    )
+
 class TechnicalResult(Base):
     """Teknik analiz sonucu modeli"""
     __tablename__ = 'technical_results'
@@ -60,6 +66,11 @@ class Signal(Base):
     
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_signals_timestamp_id', 'timestamp', 'id'),
+        Index('ix_signals_symbol_timestamp_id', 'symbol', 'timestamp', 'id'),
+    )
+
 class PortfolioItem(Base):
     __tablename__ = 'portfolio'
     
@@ -84,6 +95,11 @@ class TradeExecution(Base):
     # Sell işlemiyse kâr/zarar durumu
     pnl = Column(Float, nullable=True) 
 
+    __table_args__ = (
+        Index('ix_trades_timestamp_id', 'timestamp', 'id'),
+        Index('ix_trades_symbol_timestamp_id', 'symbol', 'timestamp', 'id'),
+    )
+
 class PortfolioSnapshot(Base):
     """Portföy değerinin tarihsel değişimi"""
     __tablename__ = 'portfolio_snapshots'
@@ -94,12 +110,199 @@ class PortfolioSnapshot(Base):
     holdings_value = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_portfolio_snapshots_timestamp_id', 'timestamp', 'id'),
+    )
+
+class PriceBar(Base):
+    """Yerel OHLCV önbelleği (grafik endpoint'leri için)"""
+    __tablename__ = 'price_bars'
+    
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String(20))
+    interval = Column(String(10))    # 1d, 1h ...
+    timestamp = Column(DateTime)     # Bar açılış zamanı (UTC, naive)
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
+    volume = Column(Float)
+
+    __table_args__ = (
+        UniqueConstraint('symbol', 'interval', 'timestamp', name='uq_price_bars_symbol_interval_ts'),
+    )
+
+class CycleMetric(Base):
+    """Engine döngüsü aşama metrikleri"""
+    __tablename__ = 'cycle_metrics'
+    
+    id = Column(Integer, primary_key=True)
+    cycle_id = Column(String(32), index=True)
+    stage = Column(String(100))      # ör: news.rss.CoinDesk, technical.fetch, db.write
+    calls = Column(Integer, default=1)
+    duration_ms = Column(Float)
+    items = Column(Integer, default=0)
+    errors = Column(Integer, default=0)
+    queue_wait_ms = Column(Float, default=0.0)  # Executor kuyruğunda bekleme
+    started_at = Column(DateTime)
+    timestamp = Column(DateTime, default=datetime.utcnow)  # Döngü başlangıcı
+
+
+class CycleMetricDetail(Base):
+    """Aşama ölçümünün alt kırılımı (ör: technical.fetch için sembol bazında); toplamlar cycle_metrics'te"""
+    __tablename__ = 'cycle_metric_details'
+    
+    id = Column(Integer, primary_key=True)
+    cycle_id = Column(String(32), index=True)
+    stage = Column(String(100))      # ör: technical.fetch
+    detail = Column(String(50))      # ör: NVDA
+    calls = Column(Integer, default=1)
+    duration_ms = Column(Float)
+    items = Column(Integer, default=0)
+    errors = Column(Integer, default=0)
+    queue_wait_ms = Column(Float, default=0.0)
+    timestamp = Column(DateTime, default=datetime.utcnow)  # Döngü başlangıcı
+
+    __table_args__ = (
+        Index('ix_cycle_metrics_timestamp_id', 'timestamp', 'id'),
+    )
+
+class LLMCacheEntry(Base):
+    """Üretilmiş LLM yanıtları (girdi anahtarı bazında önbellek)"""
+    __tablename__ = 'llm_cache'
+    
+    id = Column(Integer, primary_key=True)
+    key = Column(String(64), unique=True)
+    kind = Column(String(30))        # ör: explanation
+    symbol = Column(String(20))
+    response = Column(Text)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_llm_cache_last_used', 'last_used_at'),
+    )
+
+class DiscoveredSymbol(Base):
+    """Son keşif taramasının sonucu (auto_discovery.interval_hours boyunca yeniden kullanılır)"""
+    __tablename__ = 'discovered_symbols'
+    
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String(20))
+    rank = Column(Integer)           # taramadaki sıra (gainers > hacim > trending)
+    discovered_at = Column(DateTime, default=datetime.utcnow)
+
+class DiscoveryScan(Base):
+    """Keşif taramasının zaman bilgisi (tek satır; sonuç boş olsa da tarama zamanı korunur)"""
+    __tablename__ = 'discovery_scans'
+    
+    id = Column(Integer, primary_key=True)
+    scanned_at = Column(DateTime)        # son başarılı tarama
+    last_attempt_at = Column(DateTime)   # son deneme (başarısız olsa da)
+    last_error = Column(Text)
+
 def init_db(db_path: str = "methefor.db"):
     """Veritabanını başlat"""
-    engine = create_engine(f'sqlite:///{db_path}')
+    from src.serialization import to_json, loads
+    engine = create_engine(f'sqlite:///{db_path}', json_serializer=to_json, json_deserializer=loads)
     Base.metadata.create_all(engine)
+    _ensure_indexes(engine)
     return engine
 
+def _ensure_indexes(engine):
+    """
+    create_all mevcut tablolara sonradan eklenen index'leri oluşturmaz.
+    Eski veritabanlarında eksik index'leri tamamla.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """(timestamp, id) çiftini opak bir sayfalama cursor'ına çevir"""
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str):
+    """encode_cursor çıktısını (timestamp, id) çiftine geri çevir. Geçersizse ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        ts, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception:
+        raise ValueError(f"Geçersiz cursor: {cursor}")
+
+def keyset_page(query, ts_column, id_column, cursor: str = None, limit: int = 50,
+                start: datetime = None, end: datetime = None):
+    """
+    (timestamp, id) üzerinden keyset sayfalama (en yeniden eskiye).
+    OFFSET kullanmaz; her sayfa composite index üzerinden doğrudan okunur.
+    
+    Returns:
+        (rows, next_cursor) - next_cursor son sayfada None
+    """
+    query = query.filter(ts_column.isnot(None))
+    if start:
+        query = query.filter(ts_column >= start)
+    if end:
+        query = query.filter(ts_column < end)
+    if cursor:
+        cursor_ts, cursor_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            ts_column < cursor_ts,
+            and_(ts_column == cursor_ts, id_column < cursor_id)
+        ))
+    
+    rows = query.order_by(ts_column.desc(), id_column.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, ts_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
+
+def upsert_price_bars(session, symbol: str, interval: str, df) -> int:
+    """
+    yfinance history DataFrame'ini price_bars tablosuna yaz.
+    Aynı (symbol, interval, timestamp) barı varsa güncellenir (son bar gün içinde değişir).
+    
+    Returns:
+        Yazılan bar sayısı
+    """
+    if df is None or df.empty:
+        return 0
+    
+    index = df.index
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    
+    rows = [
+        {
+            'symbol': symbol,
+            'interval': interval,
+            'timestamp': ts.to_pydatetime(),
+            'open': float(o),
+            'high': float(h),
+            'low': float(l),
+            'close': float(c),
+            'volume': float(v)
+        }
+        for ts, o, h, l, c, v in zip(index, df['Open'], df['High'], df['Low'], df['Close'], df['Volume'])
+    ]
+    
+    # Eski SQLite sürümlerinin 999 parametre sınırına takılmamak için parçala
+    chunk_size = 100
+    for i in range(0, len(rows), chunk_size):
+        stmt = sqlite_insert(PriceBar).values(rows[i:i + chunk_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['symbol', 'interval', 'timestamp'],
+            set_={col: stmt.excluded[col] for col in ('open', 'high', 'low', 'close', 'volume')}
+        )
+        session.execute(stmt)
+    return len(rows)
+
 def get_session(engine):
     """Yeni bir session oluştur"""
     Session = sessionmaker(bind=engine)
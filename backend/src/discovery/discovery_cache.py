@@ -0,0 +1,170 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Keşif Sonucu Önbelleği
+Auto-discovery taraması her döngüde değil, auto_discovery.interval_hours'ta bir yapılır.
+Filtrelenmiş semboller discovered_symbols tablosuna, tarama ve son deneme zamanı
+discovery_scans tablosuna yazılır; ikisi de yeniden başlatmalarda korunur (boş sonuçlu
+tarama da süre dolana kadar geçerlidir). Süre dolunca döngü eski listeyle devam eder;
+yeni tarama arka plan thread'inde çalışır ve bittiğinde liste değiştirilir.
+Başarısız tarama, son denemeden retry_minutes geçmeden tekrarlanmaz.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from src.database import DiscoveredSymbol, DiscoveryScan
+
+logger = logging.getLogger(__name__)
+
+# Kapanışta devam eden taramanın en fazla beklenme süresi (saniye)
+DEFAULT_WAIT_SECONDS = 60
+# Başarısız taramadan sonra yeniden deneme için en az bekleme (dakika)
+DEFAULT_RETRY_MINUTES = 30
+
+
+class DiscoveryCache:
+    """Kalıcı keşif listesi + engellemeyen arka plan yenilemesi"""
+
+    def __init__(self, session_factory: Callable, scan: Callable[[], List[str]],
+                 retry_minutes: float = DEFAULT_RETRY_MINUTES):
+        self.session_factory = session_factory
+        # Tarama fonksiyonu: keşif + filtre, sıralı sembol listesi döndürür
+        self.scan = scan
+        self.retry = timedelta(minutes=retry_minutes)
+        self.symbols: List[str] = []
+        self.discovered_at: Optional[datetime] = None   # son başarılı tarama
+        self.last_attempt: Optional[datetime] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'refreshes': 0, 'errors': 0}
+        # Kayıtlı tarama kurulumda okunur; get() async döngüden çağrıldığında DB'ye gitmez
+        self._load()
+
+    @property
+    def refreshing(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _load(self):
+        """Son kaydedilen taramayı DB'den oku (kurulumda bir kez)"""
+        session = self.session_factory()
+        try:
+            rows = session.query(DiscoveredSymbol).order_by(DiscoveredSymbol.rank).all()
+            self.symbols = [row.symbol for row in rows]
+            scan = session.get(DiscoveryScan, 1)
+            if scan is not None:
+                self.discovered_at = scan.scanned_at
+                self.last_attempt = scan.last_attempt_at
+            else:
+                self.discovered_at = max((row.discovered_at for row in rows), default=None)
+        except Exception as e:
+            logger.error(f"[DISCOVERY] Kayıtlı keşifler okunamadı: {e}")
+        finally:
+            session.close()
+        if self.discovered_at is not None:
+            logger.info(f"[DISCOVERY] {len(self.symbols)} kayıtlı keşif yüklendi ({self.discovered_at:%Y-%m-%d %H:%M} UTC)")
+
+    def is_stale(self, interval_hours: float) -> bool:
+        return (self.discovered_at is None or
+                datetime.utcnow() - self.discovered_at >= timedelta(hours=interval_hours))
+
+    def _can_retry(self) -> bool:
+        """Son deneme başarısızsa retry süresi dolmadan yeni tarama başlatılmaz"""
+        if self.last_attempt is None or (self.discovered_at is not None and
+                                         self.last_attempt <= self.discovered_at):
+            return True
+        return datetime.utcnow() - self.last_attempt >= self.retry
+
+    def get(self, interval_hours: float) -> List[str]:
+        """
+        Geçerli keşif listesini döndür. Süresi dolmuşsa (veya hiç tarama yoksa)
+        arka planda yenileme başlatılır; bu çağrı beklemez, mevcut liste döner.
+        """
+        with self._lock:
+            if self.is_stale(interval_hours):
+                if self._can_retry():
+                    self._start_refresh()
+            else:
+                self.stats['hits'] += 1
+            return list(self.symbols)
+
+    def _start_refresh(self):
+        if self.refreshing:
+            return
+        logger.info("[DISCOVERY] Keşif süresi doldu, arka planda yeniden taranıyor...")
+        self._thread = threading.Thread(target=self.refresh, name='discovery-refresh', daemon=True)
+        self._thread.start()
+
+    def refresh(self) -> List[str]:
+        """Taramayı çalıştır, sonucu kaydet ve bellekteki listeyi değiştir"""
+        attempt = datetime.utcnow()
+        with self._lock:
+            self.last_attempt = attempt
+        try:
+            symbols = list(dict.fromkeys(self.scan()))
+            discovered_at = datetime.utcnow()
+            self._save(symbols, discovered_at, attempt)
+        except Exception as e:
+            with self._lock:
+                self.stats['errors'] += 1
+            logger.error(f"[ERROR] Keşif yenileme hatası: {e} "
+                         f"(en erken {self.retry.total_seconds() / 60:g} dk sonra yeniden denenecek)")
+            self._save_attempt(attempt, str(e))
+            return self.symbols
+        with self._lock:
+            self.symbols = symbols
+            self.discovered_at = discovered_at
+            self.stats['refreshes'] += 1
+        logger.info(f"[OK] Keşif listesi yenilendi: {len(symbols)} sembol")
+        return symbols
+
+    @staticmethod
+    def _scan_row(session) -> DiscoveryScan:
+        scan = session.get(DiscoveryScan, 1)
+        if scan is None:
+            scan = DiscoveryScan(id=1)
+            session.add(scan)
+        return scan
+
+    def _save(self, symbols: List[str], discovered_at: datetime, attempt: datetime):
+        """Önceki taramayı ve zaman bilgisini tek transaction'da yenisiyle değiştir"""
+        session = self.session_factory()
+        try:
+            session.query(DiscoveredSymbol).delete()
+            session.add_all([DiscoveredSymbol(symbol=symbol, rank=rank, discovered_at=discovered_at)
+                             for rank, symbol in enumerate(symbols)])
+            scan = self._scan_row(session)
+            scan.scanned_at = discovered_at
+            scan.last_attempt_at = attempt
+            scan.last_error = None
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _save_attempt(self, attempt: datetime, error: str):
+        """Başarısız denemeyi kaydet (yeniden başlatma sonrası da retry süresine uyulsun)"""
+        session = self.session_factory()
+        try:
+            scan = self._scan_row(session)
+            scan.last_attempt_at = attempt
+            scan.last_error = error[:500]
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"[DISCOVERY] Tarama denemesi kaydedilemedi: {e}")
+        finally:
+            session.close()
+
+    def wait(self, timeout: float = DEFAULT_WAIT_SECONDS) -> bool:
+        """Devam eden yenilemenin bitmesini bekle (tek seferlik çalıştırma kapanırken)"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return True
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("[DISCOVERY] Keşif taraması kapanışta tamamlanmadı")
+            return False
+        return True
@@ -1,24 +1,139 @@
 """
 METHEFOR FİNANSAL ÖZGÜRLÜK - Discovery Engine
 Yeni fırsatları otomatik keşfeder
+
+Tarama evreni config'teki CSV'den gelir (discovery.universe, örn. S&P 500 veya BIST 100;
+'symbol' kolonu Yahoo sembolleri). Fiyatlar yf.download ile batch_size'lık paketler halinde
+tek seferde indirilir; % değişim, hacim oranı ve fiyat/hacim filtreleri tüm evren üzerinde
+vektörel DataFrame işlemleriyle hesaplanır ve filtreleme aynı tablo üzerinden yapılır.
 """
 
-import yfinance as yf
-import requests
-from datetime import datetime, timedelta
+from __future__ import annotations
+
 import logging
-from typing import List, Dict
-import time
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from src.providers.replay import get_data_provider
+from src.lazy_import import lazy_import
+
+pd = lazy_import('pandas')
+yf = lazy_import('yfinance')
+requests = lazy_import('requests')
 
 logger = logging.getLogger(__name__)
 
+CONFIG_DIR = Path(__file__).resolve().parents[2] / 'config'
+# CSV tanımlı değilse veya okunamazsa kullanılan evren
+DEFAULT_UNIVERSE = [
+    'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'TSLA',
+    'AMD', 'PLTR', 'HOOD', 'MSTR', 'COIN', 'RIOT', 'MARA',
+    'SQ', 'PYPL', 'SOFI', 'UPST', 'AFRM', 'SHOP',
+    'SPY', 'QQQ', 'F', 'BAC', 'T', 'INTC', 'SNAP', 'PINS', 'UBER', 'LYFT', 'DKNG'
+]
+# Tek yf.download çağrısındaki sembol sayısı
+DEFAULT_BATCH_SIZE = 100
+# Hacim oranı için gereken en az bar (son gün + önceki günlerin ortalaması)
+MIN_VOLUME_BARS = 5
+
 
 class DiscoveryEngine:
     """Yeni trading fırsatlarını otomatik keşfeden sistem"""
     
-    def __init__(self, config: dict = None):
+    def __init__(self, config: dict = None, provider=None, config_dir: Path = CONFIG_DIR):
         self.config = config or {}
+        self.config_dir = Path(config_dir)
         self.discovered_symbols = []
+        # Son taramanın sembol bazlı tablosu (filter_discoveries tekrar indirmez)
+        self.last_screen: Optional[pd.DataFrame] = None
+        # Yahoo çağrıları kayıt/tekrar sağlayıcısından geçer
+        self.provider = provider or get_data_provider()
+    
+    def load_universe(self) -> List[str]:
+        """Tarama evrenini CSV'den oku ('symbol'/'ticker' kolonu, yoksa ilk kolon)"""
+        path = self.config.get('universe')
+        if not path:
+            return list(DEFAULT_UNIVERSE)
+        path = Path(path)
+        if not path.is_absolute():
+            path = self.config_dir / path
+        try:
+            frame = pd.read_csv(path, dtype=str)
+        except Exception as e:
+            logger.error(f"[ERROR] Evren dosyası okunamadı ({path}): {e}")
+            return list(DEFAULT_UNIVERSE)
+        columns = {c.lower(): c for c in frame.columns}
+        column = columns.get('symbol') or columns.get('ticker') or frame.columns[0]
+        symbols = frame[column].dropna().str.strip().str.upper()
+        return list(dict.fromkeys(symbols[symbols != '']))
+    
+    def _download(self, symbols: List[str], period: str) -> pd.DataFrame:
+        """Sembollerin günlük barlarını tek çağrıda indir; kolonlar (alan, sembol)"""
+        def fetch():
+            data = yf.download(symbols, period=period, interval='1d', group_by='column',
+                               threads=True, progress=False)
+            if not isinstance(data.columns, pd.MultiIndex):
+                data = pd.concat({symbols[0]: data}, axis=1).swaplevel(axis=1)
+            return data[['Open', 'Close', 'Volume']]
+        return self.provider.fetch('yahoo.download', f"{','.join(symbols)}|{period}|1d", fetch)
+    
+    def download_bars(self, symbols: List[str], period: str = '5d') -> pd.DataFrame:
+        """Sembolleri batch_size'lık paketlerle indirip tek geniş tabloda birleştir"""
+        batch_size = int(self.config.get('batch_size', DEFAULT_BATCH_SIZE))
+        frames = []
+        for i in range(0, len(symbols), batch_size):
+            chunk = symbols[i:i + batch_size]
+            try:
+                frames.append(self._download(chunk, period))
+            except Exception as e:
+                logger.error(f"[ERROR] Toplu fiyat indirme hatası ({len(chunk)} sembol): {e}")
+                continue
+            if i + batch_size < len(symbols):
+                self.provider.rate_limit(0.5)
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1).sort_index()
+    
+    @staticmethod
+    def compute_screen(bars: pd.DataFrame) -> pd.DataFrame:
+        """
+        Geniş bar tablosundan sembol bazlı tarama tablosu:
+        price, change_pct (son günün açılışa göre değişimi), volume, avg_volume
+        (son gün hariç ortalama), volume_ratio, bars.
+        """
+        columns = ['price', 'change_pct', 'volume', 'avg_volume', 'volume_ratio', 'bars']
+        if bars.empty:
+            return pd.DataFrame(columns=columns)
+        close = bars['Close'].apply(pd.to_numeric, errors='coerce')
+        valid = close.notna()
+        # Semboller farklı günlerde bitebilir (tatil, kripto): her sembolün kendi son barı alınır
+        last_close = close.ffill().iloc[-1]
+        last_open = bars['Open'].apply(pd.to_numeric, errors='coerce').where(valid).ffill().iloc[-1]
+        volume = bars['Volume'].apply(pd.to_numeric, errors='coerce').where(valid)
+        last_volume = volume.ffill().iloc[-1]
+        counts = valid.sum()
+        avg_volume = (volume.sum() - last_volume) / (counts - 1)
+        avg_volume = avg_volume.where(counts >= MIN_VOLUME_BARS)
+        screen = pd.DataFrame({
+            'price': last_close,
+            'change_pct': (last_close - last_open) / last_open * 100,
+            'volume': last_volume,
+            'avg_volume': avg_volume,
+            'volume_ratio': (last_volume / avg_volume).where(avg_volume > 0, 0.0),
+            'bars': counts
+        }, columns=columns)
+        return screen[screen['bars'] > 0]
+    
+    def screen_universe(self, symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        """Evrenin tamamını indirip tarama tablosunu hesapla (last_screen'e yazılır)"""
+        symbols = symbols or self.load_universe()
+        logger.info(f"[DISCOVERY] {len(symbols)} sembollük evren taranıyor...")
+        self.last_screen = self.compute_screen(self.download_bars(symbols))
+        logger.info(f"[OK] {len(self.last_screen)}/{len(symbols)} sembol için fiyat verisi alındı")
+        return self.last_screen
+    
+    def _screen(self) -> pd.DataFrame:
+        return self.last_screen if self.last_screen is not None else self.screen_universe()
         
     def get_yahoo_trending(self) -> List[str]:
         """Yahoo Finance trending sembolleri al"""
@@ -29,8 +144,10 @@ class DiscoveryEngine:
             url = "https://query1.finance.yahoo.com/v1/finance/trending/US"
             headers = {'User-Agent': 'Mozilla/5.0'}
             
-            response = requests.get(url, headers=headers, timeout=10)
-            data = response.json()
+            data = self.provider.fetch(
+                'yahoo.trending', url,
+                lambda: requests.get(url, headers=headers, timeout=10).json()
+            )
             
             symbols = []
             if 'finance' in data and 'result' in data['finance']:
@@ -46,89 +163,33 @@ class DiscoveryEngine:
             logger.error(f"[ERROR] Yahoo trending hatası: {e}")
             return []
     
-    def get_top_gainers(self, limit: int = 10) -> List[Dict]:
-        """En çok yükselen hisseleri bul"""
+    def get_top_gainers(self, limit: int = 10, min_change_pct: float = 5.0) -> List[Dict]:
+        """En çok yükselen hisseleri bul (son tarama tablosundan)"""
         try:
             logger.info("[DISCOVERY] Top gainers aranıyor...")
-            
-            # Finviz screener alternatifi - yfinance ile major indices
-            major_symbols = [
-                'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'TSLA', 
-                'AMD', 'PLTR', 'HOOD', 'MSTR', 'COIN', 'RIOT', 'MARA',
-                'SQ', 'PYPL', 'SOFI', 'UPST', 'AFRM', 'SHOP'
-            ]
-            
-            gainers = []
-            for symbol in major_symbols:
-                try:
-                    ticker = yf.Ticker(symbol)
-                    hist = ticker.history(period='1d')
-                    
-                    if len(hist) > 0:
-                        change_pct = ((hist['Close'].iloc[-1] - hist['Open'].iloc[0]) / 
-                                     hist['Open'].iloc[0] * 100)
-                        volume = hist['Volume'].iloc[-1]
-                        
-                        if change_pct > 5.0:  # 5%+ artış
-                            gainers.append({
-                                'symbol': symbol,
-                                'change_pct': change_pct,
-                                'volume': volume,
-                                'price': hist['Close'].iloc[-1]
-                            })
-                    
-                    time.sleep(0.2)
-                    
-                except Exception as e:
-                    continue
-            
-            gainers.sort(key=lambda x: x['change_pct'], reverse=True)
+            screen = self._screen()
+            gainers = screen[screen['change_pct'] > min_change_pct].nlargest(limit, 'change_pct')
             logger.info(f"[OK] {len(gainers)} gainer bulundu")
-            return gainers[:limit]
-            
+            return [
+                {'symbol': symbol, 'change_pct': row.change_pct, 'volume': row.volume, 'price': row.price}
+                for symbol, row in gainers.iterrows()
+            ]
         except Exception as e:
             logger.error(f"[ERROR] Top gainers hatası: {e}")
             return []
     
-    def get_high_volume_stocks(self, limit: int = 10) -> List[Dict]:
-        """Yüksek hacimli hisseleri bul"""
+    def get_high_volume_stocks(self, limit: int = 10, min_volume_ratio: float = 2.0) -> List[Dict]:
+        """Yüksek hacimli hisseleri bul (son gün hacmi / önceki günlerin ortalaması)"""
         try:
             logger.info("[DISCOVERY] Yüksek hacimli hisseler aranıyor...")
-            
-            major_symbols = [
-                'SPY', 'QQQ', 'NVDA', 'TSLA', 'AAPL', 'AMD', 'PLTR',
-                'MSTR', 'COIN', 'HOOD', 'SOFI', 'F', 'BAC', 'T',
-                'INTC', 'SNAP', 'PINS', 'UBER', 'LYFT', 'DKNG'
-            ]
-            
-            high_volume = []
-            for symbol in major_symbols:
-                try:
-                    ticker = yf.Ticker(symbol)
-                    hist = ticker.history(period='5d')
-                    
-                    if len(hist) >= 5:
-                        avg_volume = hist['Volume'][:-1].mean()
-                        current_volume = hist['Volume'].iloc[-1]
-                        volume_ratio = current_volume / avg_volume if avg_volume > 0 else 0
-                        
-                        if volume_ratio > 2.0:  # 2x normal hacim
-                            high_volume.append({
-                                'symbol': symbol,
-                                'volume_ratio': volume_ratio,
-                                'current_volume': current_volume,
-                                'avg_volume': avg_volume
-                            })
-                    
-                    time.sleep(0.2)
-                    
-                except Exception as e:
-                    continue
-            
-            high_volume.sort(key=lambda x: x['volume_ratio'], reverse=True)
+            screen = self._screen()
+            high_volume = screen[screen['volume_ratio'] > min_volume_ratio].nlargest(limit, 'volume_ratio')
             logger.info(f"[OK] {len(high_volume)} yüksek hacimli hisse bulundu")
-            return high_volume[:limit]
-            
+            return [
+                {'symbol': symbol, 'volume_ratio': row.volume_ratio,
+                 'current_volume': row.volume, 'avg_volume': row.avg_volume}
+                for symbol, row in high_volume.iterrows()
+            ]
         except Exception as e:
             logger.error(f"[ERROR] High volume hatası: {e}")
             return []
@@ -139,22 +200,23 @@ class DiscoveryEngine:
         logger.info("[DISCOVERY] YENİ FIRSATLAR KEŞFEDİLİYOR")
         logger.info("="*70)
         
-        all_discoveries = set()
-        
-        # 1. Trending symbols
-        trending = self.get_yahoo_trending()
-        all_discoveries.update(trending)
+        # Evren tek seferde taranır; gainers ve hacim listeleri aynı tablodan çıkar
+        self.last_screen = None
+        self.screen_universe()
         
-        # 2. Top gainers
+        # 1. Top gainers
         gainers = self.get_top_gainers(limit=10)
-        all_discoveries.update([g['symbol'] for g in gainers])
         
-        # 3. High volume
+        # 2. High volume
         high_vol = self.get_high_volume_stocks(limit=10)
-        all_discoveries.update([h['symbol'] for h in high_vol])
         
-        # Mevcut watchlist'le karşılaştır
-        discovered = list(all_discoveries)
+        # 3. Trending symbols
+        trending = self.get_yahoo_trending()
+        
+        # Sıra korunur (dict): önce gainers, sonra hacim, sonra trending
+        discovered = list(dict.fromkeys(
+            [g['symbol'] for g in gainers] + [h['symbol'] for h in high_vol] + trending
+        ))
         
         logger.info(f"\n[OK] Toplam {len(discovered)} yeni sembol keşfedildi:")
         for symbol in discovered[:10]:
@@ -167,28 +229,23 @@ class DiscoveryEngine:
                           min_volume: int = 1000000,
                           min_price: float = 5.0,
                           max_price: float = 1000.0) -> List[str]:
-        """Keşfedilen sembolleri filtrele"""
+        """Keşfedilen sembolleri filtrele (tarama tablosu yeniden kullanılır)"""
         logger.info("\n[FILTER] Keşifler filtreleniyor...")
         
-        filtered = []
-        for symbol in symbols:
-            try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period='1d')
-                
-                if len(hist) > 0:
-                    price = hist['Close'].iloc[-1]
-                    volume = hist['Volume'].iloc[-1]
-                    
-                    if (volume >= min_volume and 
-                        min_price <= price <= max_price):
-                        filtered.append(symbol)
-                        logger.info(f"[OK] {symbol}: ${price:.2f}, Vol: {volume:,.0f}")
-                
-                time.sleep(0.2)
-                
-            except Exception as e:
-                continue
+        screen = self.last_screen if self.last_screen is not None else self.compute_screen(pd.DataFrame())
+        # Evren dışından gelenler (örn. trending) tek toplu çağrıyla eklenir
+        missing = [s for s in symbols if s not in screen.index]
+        if missing:
+            extra = self.compute_screen(self.download_bars(missing, period='5d'))
+            screen = pd.concat([screen, extra]) if not screen.empty else extra
+            self.last_screen = screen
+        
+        rows = screen.reindex([s for s in symbols if s in screen.index])
+        mask = (rows['volume'] >= min_volume) & rows['price'].between(min_price, max_price)
+        passed = rows[mask]
+        for symbol, row in passed.iterrows():
+            logger.info(f"[OK] {symbol}: ${row.price:.2f}, Vol: {row.volume:,.0f}")
+        filtered = list(passed.index)
         
         logger.info(f"\n[OK] {len(filtered)}/{len(symbols)} sembol filtrelendi")
         return filtered
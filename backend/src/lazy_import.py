@@ -0,0 +1,62 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Ertelenmiş (Lazy) Import
+Ağır üçüncü parti modüller (pandas, yfinance, google.generativeai, aiohttp...)
+modül seviyesinde vekil nesne olarak tanımlanır ve ilk öznitelik erişiminde yüklenir:
+
+    pd = lazy_import('pandas')
+    ...
+    pd.DataFrame(...)   # pandas burada import edilir
+
+Böylece CLI araçları ve dashboard, kullanmadıkları kütüphanelerin import
+maliyetini ödemez. İlk yükleme süreleri başlangıç raporunda gösterilir.
+"""
+
+import importlib
+import threading
+import time
+import types
+from typing import Dict
+
+_lock = threading.RLock()
+
+# modül adı -> ilk kullanımda import süresi (saniye)
+LOAD_TIMES: Dict[str, float] = {}
+
+
+class LazyModule(types.ModuleType):
+    """İlk öznitelik erişiminde gerçek modülü import eden vekil"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with _lock:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    LOAD_TIMES[self.__name__] = time.perf_counter() - started
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        # Sonraki erişimler normal öznitelik araması ile çözülsün
+        self.__dict__[attr] = value
+        return value
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'yüklendi' if self.__dict__['_lazy_module'] is not None else 'bekliyor'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """name modülü için ertelenmiş vekil döndür (modül zaten yüklüyse de vekil döner)"""
+    return LazyModule(name)
+
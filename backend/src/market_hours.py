@@ -0,0 +1,163 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Piyasa Saatleri & Sembol Zamanlaması
+Varlık sınıfına göre borsa seansları (US, TR, CRYPTO, FUTURES) ve
+yalnızca verisi değişmiş olabilecek sembolleri seçen zamanlayıcı.
+Resmi tatiller config'den (scheduling.markets.<MARKET>.holidays) verilebilir.
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# Her market için: saat dilimi, haftanın günü (0=Pzt) -> [(açılış, kapanış)] ve varsayılan periyot
+MARKET_SESSIONS = {
+    'US': {
+        'timezone': 'America/New_York',
+        'sessions': {d: [(time(9, 30), time(16, 0))] for d in range(5)},
+        'cadence_minutes': 15
+    },
+    'TR': {
+        'timezone': 'Europe/Istanbul',
+        'sessions': {d: [(time(10, 0), time(18, 0))] for d in range(5)},
+        'cadence_minutes': 15
+    },
+    'CRYPTO': {
+        'timezone': 'UTC',
+        'sessions': None,  # 7/24
+        'cadence_minutes': 15
+    },
+    'FUTURES': {
+        # CME Globex: Pazar 18:00 - Cuma 17:00 ET, her gün 17:00-18:00 arası bakım arası
+        'timezone': 'America/New_York',
+        'sessions': {
+            0: [(time(0, 0), time(17, 0)), (time(18, 0), time.max)],
+            1: [(time(0, 0), time(17, 0)), (time(18, 0), time.max)],
+            2: [(time(0, 0), time(17, 0)), (time(18, 0), time.max)],
+            3: [(time(0, 0), time(17, 0)), (time(18, 0), time.max)],
+            4: [(time(0, 0), time(17, 0))],
+            6: [(time(18, 0), time.max)]
+        },
+        'cadence_minutes': 30
+    }
+}
+
+# Periyot kontrolünde tick kaymalarına tolerans (ör: 15 dk periyot için 13.5 dk yeterli)
+CADENCE_TOLERANCE = 0.9
+
+
+def market_for_symbol(symbol: str) -> str:
+    """Sembolün işlem gördüğü market sınıfı"""
+    if symbol.endswith('.IS'):
+        return 'TR'
+    if symbol.endswith('-USD'):
+        return 'CRYPTO'
+    if symbol.endswith('=F'):
+        return 'FUTURES'
+    return 'US'
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class MarketCalendar:
+    """Tek bir market için seans hesaplamaları"""
+
+    def __init__(self, name: str, timezone_name: str, sessions: Optional[Dict], holidays: Iterable[str] = ()):
+        self.name = name
+        self.tz = ZoneInfo(timezone_name)
+        self.sessions = sessions
+        self.holidays = {date.fromisoformat(h) for h in holidays}
+
+    @property
+    def always_open(self) -> bool:
+        return self.sessions is None
+
+    def _day_sessions(self, day: date) -> List[Tuple[datetime, datetime]]:
+        if day in self.holidays:
+            return []
+        windows = []
+        for open_t, close_t in self.sessions.get(day.weekday(), []):
+            start = datetime.combine(day, open_t, tzinfo=self.tz)
+            end = datetime.combine(day, close_t, tzinfo=self.tz) if close_t != time.max \
+                else datetime.combine(day + timedelta(days=1), time(0, 0), tzinfo=self.tz)
+            windows.append((start, end))
+        return windows
+
+    def is_open(self, at: datetime) -> bool:
+        """Verilen (timezone-aware) anda market açık mı?"""
+        if self.always_open:
+            return True
+        local = at.astimezone(self.tz)
+        return any(start <= local < end for start, end in self._day_sessions(local.date()))
+
+    def was_open_between(self, start: datetime, end: datetime) -> bool:
+        """[start, end] aralığında market herhangi bir an açık kaldı mı?"""
+        if self.always_open:
+            return True
+        local_start = start.astimezone(self.tz)
+        local_end = end.astimezone(self.tz)
+        day = local_start.date()
+        while day <= local_end.date():
+            for s_open, s_close in self._day_sessions(day):
+                if s_open < local_end and s_close > local_start:
+                    return True
+            day += timedelta(days=1)
+        return False
+
+
+class MarketScheduler:
+    """
+    Sembolleri market seanslarına ve sınıf bazlı periyotlara göre zamanlar.
+    Bir sembol şu durumlarda atlanır:
+    - Market sınıfının periyodu henüz dolmadıysa
+    - Son analizden bu yana market hiç açık olmadıysa (yeni bar oluşamaz)
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        config = config or {}
+        market_overrides = config.get('markets', {})
+        self.calendars: Dict[str, MarketCalendar] = {}
+        self.cadences: Dict[str, timedelta] = {}
+
+        for name, spec in MARKET_SESSIONS.items():
+            override = market_overrides.get(name, {})
+            self.calendars[name] = MarketCalendar(
+                name, spec['timezone'], spec['sessions'], holidays=override.get('holidays', [])
+            )
+            self.cadences[name] = timedelta(minutes=override.get('cadence_minutes', spec['cadence_minutes']))
+
+        self.last_run: Dict[str, datetime] = {}
+
+    def is_due(self, symbol: str, now: Optional[datetime] = None) -> bool:
+        now = now or _utcnow()
+        last = self.last_run.get(symbol)
+        if last is None:
+            return True
+        market = market_for_symbol(symbol)
+        if now - last < self.cadences[market] * CADENCE_TOLERANCE:
+            return False
+        return self.calendars[market].was_open_between(last, now)
+
+    def due_symbols(self, symbols: Iterable[str], now: Optional[datetime] = None) -> List[str]:
+        """Bu döngüde analiz edilmesi gereken semboller"""
+        now = now or _utcnow()
+        symbols = list(symbols)
+        due = [s for s in symbols if self.is_due(s, now)]
+        skipped = len(symbols) - len(due)
+        if skipped:
+            logger.info(f"[SCHEDULE] {len(due)} sembol analiz edilecek, {skipped} sembol atlandı (periyot/piyasa kapalı)")
+        return due
+
+    def mark_done(self, symbols: Iterable[str], now: Optional[datetime] = None):
+        """Başarıyla analiz edilen sembolleri işaretle"""
+        now = now or _utcnow()
+        for symbol in symbols:
+            self.last_run[symbol] = now
+
+    def min_cadence_minutes(self) -> float:
+        """En kısa market periyodu (dakika); daemon --interval değerini buna göre denetler"""
+        return min(c.total_seconds() for c in self.cadences.values()) / 60
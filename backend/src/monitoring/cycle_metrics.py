@@ -0,0 +1,242 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Döngü Metrikleri
+run_full_cycle_async için aşama bazlı süre, öğe sayısı, hata sayısı ve
+executor kuyruk bekleme süresi ölçümü. Sonuçlar cycle_metrics tablosuna yazılır.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    """Tek bir aşamanın birikimli istatistikleri"""
+
+    __slots__ = ('name', 'calls', 'duration', 'items', 'errors', 'queue_wait', 'started_at')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.duration = 0.0
+        self.items = 0
+        self.errors = 0
+        self.queue_wait = 0.0
+        self.started_at = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'stage': self.name,
+            'calls': self.calls,
+            'duration_ms': round(self.duration * 1000, 2),
+            'items': self.items,
+            'errors': self.errors,
+            'queue_wait_ms': round(self.queue_wait * 1000, 2),
+            'started_at': self.started_at.isoformat() if self.started_at else None
+        }
+
+
+class StageHandle:
+    """stage() bloğu içinde öğe/hata eklemek için kullanılan nesne"""
+
+    __slots__ = ('_metrics', 'name', 'items', 'errors')
+
+    def __init__(self, metrics, name: str):
+        self._metrics = metrics
+        self.name = name
+        self.items = 0
+        self.errors = 0
+
+    def add_items(self, n: int = 1):
+        self.items += n
+
+    def add_error(self, n: int = 1):
+        self.errors += n
+
+
+class CycleMetrics:
+    """Bir engine döngüsünün aşama metrikleri (thread-safe)"""
+
+    def __init__(self, cycle_id: Optional[str] = None):
+        self.cycle_id = cycle_id or uuid.uuid4().hex[:12]
+        self.started_at = datetime.utcnow()
+        self.stages: Dict[str, StageStats] = {}
+        # (aşama, detay) -> alt kırılım; aşama toplamlarına ayrıca eklenmez
+        self.details: Dict[Tuple[str, str], StageStats] = {}
+        self._lock = threading.Lock()
+        self._stage_listeners = []
+
+    def add_stage_listener(self, listener):
+        """
+        Her stage() bloğunun ve run_in_executor çağrısının başında ve sonunda, işi yapan
+        thread içinde çağrılır: listener(name, 'start'|'end'). Profil araçları bu kancayı kullanır.
+        """
+        self._stage_listeners.append(listener)
+
+    def _notify(self, name: str, phase: str):
+        for listener in self._stage_listeners:
+            try:
+                listener(name, phase)
+            except Exception as e:
+                logger.error(f"Stage listener hatası ({name}): {e}")
+
+    def record(self, name: str, duration: float = 0.0, items: int = 0, errors: int = 0,
+               queue_wait: float = 0.0, calls: int = 1, detail: Optional[str] = None):
+        """
+        Bir aşamaya ölçüm ekle (aynı isimli aşamalar birikimli toplanır).
+        detail verilirse ölçüm aşama toplamına değil, (name, detail) alt kırılımına yazılır.
+        """
+        with self._lock:
+            table = self.stages if detail is None else self.details
+            key = name if detail is None else (name, detail)
+            stats = table.get(key)
+            if stats is None:
+                stats = table[key] = StageStats(name)
+                stats.started_at = datetime.utcnow()
+            stats.calls += calls
+            stats.duration += duration
+            stats.items += items
+            stats.errors += errors
+            stats.queue_wait += queue_wait
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Bir kod bloğunu aşama olarak ölç. Blok exception fırlatırsa hata sayılır
+        ve exception yeniden fırlatılır.
+        
+        Kullanım:
+            with metrics.stage('news.rss') as st:
+                items = fetch()
+                st.add_items(len(items))
+        """
+        handle = StageHandle(self, name)
+        self._notify(name, 'start')
+        start = time.perf_counter()
+        try:
+            yield handle
+        except BaseException:
+            handle.errors += 1
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, handle.items, handle.errors)
+            self._notify(name, 'end')
+
+    async def run_in_executor(self, name: str, fn, *args, executor=None, count=None, is_error=None,
+                              detail: Optional[str] = None):
+        """
+        fn'i executor'da çalıştır; kuyruk bekleme süresini (gönderim -> başlama)
+        ve çalışma süresini ayrı ayrı kaydet.
+        
+        Args:
+            count: sonuç -> öğe sayısı (varsayılan: liste ise uzunluğu)
+            is_error: sonuç -> hata mı (ör: {'error': ...} dönen fonksiyonlar için)
+            detail: verilirse ölçüm ayrıca (name, detail) alt kırılımına da yazılır
+                    (ör: technical.fetch / NVDA; yavaş sembol toplam içinde kaybolmaz)
+        """
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            errors = 0
+            result = None
+            self._notify(name, 'start')
+            try:
+                result = fn(*args)
+                return result
+            except Exception:
+                errors = 1
+                raise
+            finally:
+                if result is not None:
+                    if count is not None:
+                        items = count(result)
+                    else:
+                        items = len(result) if isinstance(result, list) else 0
+                    if is_error is not None and is_error(result):
+                        errors += 1
+                else:
+                    items = 0
+                duration = time.perf_counter() - started
+                self.record(name, duration, items, errors, started - submitted)
+                if detail:
+                    self.record(name, duration, items, errors, started - submitted, detail=detail)
+                self._notify(name, 'end')
+
+        return await loop.run_in_executor(executor, timed)
+
+    def total_duration(self) -> float:
+        return (datetime.utcnow() - self.started_at).total_seconds()
+
+    def summary(self) -> List[Dict]:
+        with self._lock:
+            return [stats.to_dict() for stats in self.stages.values()]
+
+    def detail_summary(self) -> List[Dict]:
+        with self._lock:
+            return [dict(stats.to_dict(), detail=detail) for (_, detail), stats in self.details.items()]
+
+    def log_summary(self):
+        """Aşama sürelerini tek tabloda logla"""
+        logger.info("[METRICS] Döngü %s aşama süreleri:", self.cycle_id)
+        for row in sorted(self.summary(), key=lambda r: r['duration_ms'], reverse=True):
+            logger.info(
+                "   %-28s %9.1f ms | çağrı %3d | öğe %5d | hata %2d | kuyruk %8.1f ms",
+                row['stage'], row['duration_ms'], row['calls'], row['items'], row['errors'], row['queue_wait_ms']
+            )
+        for row in sorted(self.detail_summary(), key=lambda r: r['duration_ms'], reverse=True):
+            logger.info(
+                "     %-26s %9.1f ms | çağrı %3d | öğe %5d | hata %2d | kuyruk %8.1f ms",
+                f"{row['stage']}[{row['detail']}]", row['duration_ms'], row['calls'], row['items'],
+                row['errors'], row['queue_wait_ms']
+            )
+
+    def save(self, session_factory):
+        """Metrikleri cycle_metrics tablosuna yaz"""
+        from src.database import CycleMetric, CycleMetricDetail
+        session = session_factory()
+        try:
+            for row in self.summary():
+                session.add(CycleMetric(
+                    cycle_id=self.cycle_id,
+                    stage=row['stage'],
+                    calls=row['calls'],
+                    duration_ms=row['duration_ms'],
+                    items=row['items'],
+                    errors=row['errors'],
+                    queue_wait_ms=row['queue_wait_ms'],
+                    started_at=self.stages[row['stage']].started_at,
+                    timestamp=self.started_at
+                ))
+            for row in self.detail_summary():
+                session.add(CycleMetricDetail(
+                    cycle_id=self.cycle_id,
+                    stage=row['stage'],
+                    detail=row['detail'],
+                    calls=row['calls'],
+                    duration_ms=row['duration_ms'],
+                    items=row['items'],
+                    errors=row['errors'],
+                    queue_wait_ms=row['queue_wait_ms'],
+                    timestamp=self.started_at
+                ))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Metrik kayıt hatası: {e}")
+        finally:
+            session.close()
+
+
+class NullMetrics(CycleMetrics):
+    """Metrik toplanmayan çağrılar için (ör: modüllerin tek başına kullanımı)"""
+
+    def record(self, *args, **kwargs):
+        pass
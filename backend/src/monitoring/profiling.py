@@ -0,0 +1,354 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Çalışma Zamanı Profil Kancaları
+Opt-in profil modu (METHEFOR_PROFILE env veya admin endpoint'i ile açılır):
+- cpu: cProfile; engine döngüleri tamamen, API istekleri sample_rate oranında profillenir.
+  Çıktı logs/profiles/ altına .pstats (snakeviz/gprof2dot ile açılabilir) + özet .txt
+- memory: tracemalloc; aşama başına en çok bellek ayıran satırlar raporlanır
+
+Mod config/profiling.json'da tutulur; dashboard ve engine aynı dosyayı okuduğu için
+admin endpoint'inden yapılan değişiklik çalışan engine'e de bir sonraki döngüde yansır.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.config_store import get_config_store
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'cpu', 'memory')
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 10
+TOP_FUNCTIONS = 40
+MAX_PROFILE_FILES = 200
+
+
+def _default_config() -> Dict:
+    mode = os.getenv('METHEFOR_PROFILE', 'off').lower()
+    try:
+        sample_rate = float(os.getenv('METHEFOR_PROFILE_SAMPLE', '0.05'))
+    except ValueError:
+        sample_rate = 0.05
+    return {'mode': mode if mode in MODES else 'off', 'sample_rate': sample_rate}
+
+
+def _enable_profile() -> Optional[cProfile.Profile]:
+    """
+    Yeni bir cProfile başlat. Python 3.12+ cProfile süreç genelinde tek profiler'a izin
+    verir (ve tüm thread'leri zaten kapsar); o durumda None döner.
+    """
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:
+        return None
+    return prof
+
+
+def _allocation_diff(before, after) -> list:
+    """İki snapshot arasında en çok büyüyen satırlar (tracemalloc'un kendi ayırımları hariç)"""
+    own = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    diff = after.filter_traces(own).compare_to(before.filter_traces(own), 'lineno')
+    return [stat for stat in diff if stat.size_diff > 0][:TOP_ALLOCATIONS]
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_')[:80] or 'profile'
+
+
+class _CycleSession:
+    """Tek engine döngüsü boyunca aşama dinleyicisi olarak çalışan profil oturumu"""
+
+    def __init__(self, profiler, mode: str, cycle_id: str):
+        self.profiler = profiler
+        self.mode = mode
+        self.cycle_id = cycle_id
+        self.main_thread = threading.get_ident()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.profiles: List[cProfile.Profile] = []
+        # memory modu: aşama -> [aktif çağrı sayısı, başlangıç snapshot'ı]
+        self._open: Dict[str, list] = {}
+        self.allocations: Dict[str, list] = {}
+
+    def on_stage(self, name: str, phase: str):
+        if self.mode == 'cpu':
+            self._on_stage_cpu(phase)
+        else:
+            self._on_stage_memory(name, phase)
+
+    def _on_stage_cpu(self, phase: str):
+        # Ana thread döngü boyunca zaten profilleniyor; executor thread'lerinde
+        # en dıştaki aşama süresince ayrı bir profiler çalıştırılır
+        if threading.get_ident() == self.main_thread:
+            return
+        depth = getattr(self._local, 'depth', 0)
+        if phase == 'start':
+            if depth == 0:
+                self._local.prof = _enable_profile()
+            self._local.depth = depth + 1
+        elif depth > 0:
+            self._local.depth = depth - 1
+            if depth == 1 and self._local.prof is not None:
+                self._local.prof.disable()
+                with self._lock:
+                    self.profiles.append(self._local.prof)
+                self._local.prof = None
+
+    def _on_stage_memory(self, name: str, phase: str):
+        # Aynı isimli eşzamanlı çağrılar (ör: 20 sembolün technical.compute'u) tek pencere
+        # olarak ölçülür: ilk başlangıçta ve son bitişte snapshot alınır
+        with self._lock:
+            entry = self._open.setdefault(name, [0, None])
+            if phase == 'start':
+                if entry[0] == 0:
+                    entry[1] = tracemalloc.take_snapshot()
+                entry[0] += 1
+                return
+            if entry[0] == 0:
+                return
+            entry[0] -= 1
+            if entry[0] > 0:
+                return
+            before = entry[1]
+            del self._open[name]
+        top = _allocation_diff(before, tracemalloc.take_snapshot())
+        with self._lock:
+            self.allocations.setdefault(name, []).extend(top)
+
+
+class Profiler:
+    """Profil modunu yöneten ve dump'ları yazan nesne (süreç başına bir tane)"""
+
+    def __init__(self, config_path, profile_dir='logs/profiles'):
+        self.store = get_config_store(config_path, default=_default_config())
+        self.profile_dir = Path(profile_dir)
+        self._local = threading.local()
+        self._trace_lock = threading.Lock()
+        self._trace_users = 0
+
+    # ---- config ----
+
+    @property
+    def mode(self) -> str:
+        mode = self.store.get().get('mode', 'off')
+        return mode if mode in MODES else 'off'
+
+    @property
+    def sample_rate(self) -> float:
+        try:
+            return min(max(float(self.store.get().get('sample_rate', 0.0)), 0.0), 1.0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def configure(self, mode: Optional[str] = None, sample_rate: Optional[float] = None) -> Dict:
+        """Modu/örnekleme oranını değiştir (dosyaya yazılır, diğer süreçler de görür)"""
+        if mode is not None and mode not in MODES:
+            raise ValueError(f"Geçersiz profil modu: {mode} ({', '.join(MODES)})")
+        if sample_rate is not None:
+            sample_rate = float(sample_rate)
+            if not 0.0 <= sample_rate <= 1.0:
+                raise ValueError("sample_rate 0 ile 1 arasında olmalı")
+
+        def mutate(data):
+            if mode is not None:
+                data['mode'] = mode
+            if sample_rate is not None:
+                data['sample_rate'] = sample_rate
+
+        self.store.update(mutate)
+        logger.info(f"[PROFILE] mod={self.mode} sample_rate={self.sample_rate}")
+        return self.status()
+
+    def status(self) -> Dict:
+        return {
+            'mode': self.mode,
+            'sample_rate': self.sample_rate,
+            'profile_dir': str(self.profile_dir),
+            'recent': self.recent_files()
+        }
+
+    def recent_files(self, limit: int = 20) -> List[str]:
+        if not self.profile_dir.exists():
+            return []
+        files = sorted(self.profile_dir.iterdir(), key=lambda p: p.stat().st_mtime, reverse=True)
+        return [p.name for p in files[:limit]]
+
+    # ---- tracemalloc referans sayımı (eşzamanlı oturumlar için) ----
+
+    def _start_tracing(self):
+        with self._trace_lock:
+            if self._trace_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._trace_users += 1
+
+    def _stop_tracing(self):
+        with self._trace_lock:
+            self._trace_users -= 1
+            if self._trace_users == 0 and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    # ---- API istekleri / tekil fonksiyonlar ----
+
+    @contextmanager
+    def profile_block(self, name: str, sampled: bool = True):
+        """
+        Bloğu aktif moda göre profille. sampled=True ise yalnızca sample_rate
+        oranındaki çağrılar profillenir. Aynı thread'de iç içe bloklar atlanır.
+        """
+        mode = self.mode
+        if (mode == 'off' or getattr(self._local, 'active', False)
+                or (sampled and random.random() >= self.sample_rate)):
+            yield
+            return
+
+        self._local.active = True
+        try:
+            if mode == 'cpu':
+                prof = _enable_profile()
+                try:
+                    yield
+                finally:
+                    if prof is not None:
+                        prof.disable()
+                        self._dump_cpu(f'call-{name}', [prof])
+            else:
+                self._start_tracing()
+                before = tracemalloc.take_snapshot()
+                try:
+                    yield
+                finally:
+                    top = _allocation_diff(before, tracemalloc.take_snapshot())
+                    self._stop_tracing()
+                    self._dump_memory(f'call-{name}', {name: top})
+        finally:
+            self._local.active = False
+
+    def profiled(self, name: str, sampled: bool = True):
+        """profile_block'un dekoratör hali"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.profile_block(name, sampled=sampled):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # ---- engine döngüsü ----
+
+    @contextmanager
+    def cycle_session(self, metrics):
+        """
+        Engine döngüsünü profille. cpu modunda ana thread ve executor'daki aşamalar
+        tek .pstats'ta birleşir; memory modunda aşama başına ayırma raporu yazılır.
+        """
+        mode = self.mode
+        if mode == 'off':
+            yield
+            return
+
+        session = _CycleSession(self, mode, metrics.cycle_id)
+        metrics.add_stage_listener(session.on_stage)
+        self._local.active = True
+        logger.info(f"[PROFILE] Döngü {metrics.cycle_id} profilleniyor (mod={mode})")
+        try:
+            if mode == 'cpu':
+                prof = _enable_profile()
+                try:
+                    yield
+                finally:
+                    profiles = ([prof] if prof is not None else []) + session.profiles
+                    if prof is not None:
+                        prof.disable()
+                    if profiles:
+                        self._dump_cpu(f'cycle-{metrics.cycle_id}', profiles)
+            else:
+                self._start_tracing()
+                try:
+                    yield
+                finally:
+                    self._stop_tracing()
+                    self._dump_memory(f'cycle-{metrics.cycle_id}', session.allocations)
+        finally:
+            self._local.active = False
+
+    # ---- çıktı ----
+
+    def _base_path(self, name: str) -> Path:
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        return self.profile_dir / f"{_safe_name(name)}-{stamp}-{os.getpid()}"
+
+    def _dump_cpu(self, name: str, profiles: List[cProfile.Profile]):
+        try:
+            stats = pstats.Stats(profiles[0])
+            for prof in profiles[1:]:
+                stats.add(prof)
+            base = self._base_path(name)
+            stats.dump_stats(f"{base}.pstats")
+
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            Path(f"{base}.txt").write_text(out.getvalue(), encoding='utf-8')
+            logger.info(f"[PROFILE] CPU profili yazıldı: {base}.pstats")
+            self._prune()
+        except Exception as e:
+            logger.error(f"Profil yazma hatası ({name}): {e}")
+
+    def _dump_memory(self, name: str, allocations: Dict[str, list]):
+        try:
+            lines = [f"tracemalloc raporu: {name}", ""]
+            for stage, stats in sorted(allocations.items(),
+                                       key=lambda kv: sum(s.size_diff for s in kv[1]), reverse=True):
+                total_kib = sum(s.size_diff for s in stats) / 1024
+                lines.append(f"[{stage}] en çok ayıran {len(stats)} satır (+{total_kib:.1f} KiB)")
+                for stat in stats:
+                    frame = stat.traceback[0]
+                    lines.append(f"   +{stat.size_diff / 1024:9.1f} KiB  {stat.count_diff:+7d} blok  "
+                                 f"{frame.filename}:{frame.lineno}")
+                lines.append("")
+                if stats:
+                    top = stats[0].traceback[0]
+                    logger.info(f"[PROFILE] {stage}: +{total_kib:.1f} KiB (en çok: {top.filename}:{top.lineno})")
+            path = Path(f"{self._base_path(name)}.memory.txt")
+            path.write_text("\n".join(lines), encoding='utf-8')
+            logger.info(f"[PROFILE] Bellek raporu yazıldı: {path}")
+            self._prune()
+        except Exception as e:
+            logger.error(f"Bellek raporu yazma hatası ({name}): {e}")
+
+    def _prune(self):
+        """En eski dump'ları sil (MAX_PROFILE_FILES üzeri)"""
+        files = sorted(self.profile_dir.iterdir(), key=lambda p: p.stat().st_mtime)
+        for old in files[:-MAX_PROFILE_FILES]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+_profilers: Dict[str, Profiler] = {}
+_profilers_lock = threading.Lock()
+
+
+def get_profiler(config_path, profile_dir='logs/profiles') -> Profiler:
+    """Süreç içi paylaşılan profiler"""
+    key = str(Path(config_path).resolve())
+    with _profilers_lock:
+        profiler = _profilers.get(key)
+        if profiler is None:
+            profiler = _profilers[key] = Profiler(config_path, profile_dir)
+        return profiler
@@ -0,0 +1,168 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Prometheus Metrikleri
+Dashboard için /metrics (text exposition format) kaynağı:
+HTTP gecikmeleri, Socket.IO bağlantı/emit byte sayıları, load_latest_data süresi,
+DB sorgu sayı/süreleri ve son engine döngüsünün aşama istatistikleri.
+"""
+
+import logging
+import time
+from datetime import timezone
+
+from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+                               CONTENT_TYPE_LATEST, GCCollector, PlatformCollector, ProcessCollector)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Varsayılan global registry yerine uygulamaya ait registry (yeniden import'ta çift kayıt olmaz)
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+PlatformCollector(registry=REGISTRY)
+GCCollector(registry=REGISTRY)
+
+HTTP_REQUEST_LATENCY = Histogram(
+    'methefor_http_request_duration_seconds',
+    'HTTP istek süresi (route şablonu bazında)',
+    ['method', 'route', 'status'],
+    registry=REGISTRY
+)
+SOCKETIO_CONNECTIONS = Gauge(
+    'methefor_socketio_connections',
+    'Açık Socket.IO bağlantı sayısı',
+    registry=REGISTRY
+)
+SOCKETIO_EMIT_BYTES = Counter(
+    'methefor_socketio_emit_bytes',
+    'Kodlanmış giden Socket.IO paket byte sayısı (yayınlar bir kez sayılır)',
+    ['event'],
+    registry=REGISTRY
+)
+LOAD_LATEST_DURATION = Histogram(
+    'methefor_load_latest_data_duration_seconds',
+    'load_latest_data süresi',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    registry=REGISTRY
+)
+DB_QUERY_DURATION = Histogram(
+    'methefor_db_query_duration_seconds',
+    'DB sorgu süresi (_count sorgu sayısını verir)',
+    ['operation'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+    registry=REGISTRY
+)
+
+
+def observe_request(method: str, route: str, status: int, duration: float):
+    HTTP_REQUEST_LATENCY.labels(method, route, str(status)).observe(duration)
+
+
+def metered_packet_class(base):
+    """
+    Socket.IO paket sınıfını encode edilen byte'ları sayacak şekilde sar.
+    SocketIO(serializer=...) parametresine verilir.
+    """
+    from socketio import packet as sio_packet
+
+    class MeteredPacket(base):
+        def encode(self):
+            encoded = super().encode()
+            if self.packet_type == sio_packet.EVENT and self.data:
+                label = str(self.data[0])
+            else:
+                label = '_control'
+            parts = encoded if isinstance(encoded, list) else [encoded]
+            SOCKETIO_EMIT_BYTES.labels(label).inc(sum(len(p) for p in parts))
+            return encoded
+
+    MeteredPacket.__name__ = f'Metered{base.__name__}'
+    return MeteredPacket
+
+
+def instrument_engine(engine):
+    """SQLAlchemy engine'deki her sorgunun süresini operasyon tipine göre ölç"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info['query_start'].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else 'UNKNOWN'
+        DB_QUERY_DURATION.labels(operation).observe(time.perf_counter() - start)
+
+    @event.listens_for(engine, 'handle_error')
+    def _error(context):
+        # Hatalı sorgularda after_cursor_execute çağrılmaz; yığını dengede tut
+        stack = context.connection.info.get('query_start') if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+class EngineCycleCollector:
+    """Her scrape'te cycle_metrics tablosundan son döngünün istatistiklerini oku"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    def describe(self):
+        # Boş tanım: register() sırasında registry collect() çağırıp DB'ye gitmesin
+        return []
+
+    def collect(self):
+        from src.database import CycleMetric
+        try:
+            session = self.session_factory()
+            try:
+                last = session.query(CycleMetric).filter(CycleMetric.stage == 'cycle') \
+                    .order_by(CycleMetric.timestamp.desc(), CycleMetric.id.desc()).first()
+                stages = session.query(CycleMetric).filter(CycleMetric.cycle_id == last.cycle_id).all() \
+                    if last else []
+            finally:
+                session.close()
+        except Exception as e:
+            logger.error(f"Cycle metrik okuma hatası: {e}")
+            return
+
+        if last is None:
+            return
+
+        duration = GaugeMetricFamily('methefor_engine_cycle_duration_seconds', 'Son engine döngüsünün süresi')
+        duration.add_metric([], (last.duration_ms or 0) / 1000)
+        yield duration
+
+        started = GaugeMetricFamily('methefor_engine_cycle_timestamp_seconds',
+                                    'Son engine döngüsünün başlangıç zamanı (unix)')
+        started.add_metric([], last.timestamp.replace(tzinfo=timezone.utc).timestamp() if last.timestamp else 0)
+        yield started
+
+        stage_duration = GaugeMetricFamily('methefor_engine_stage_duration_seconds',
+                                           'Son döngüde aşama süresi', labels=['stage'])
+        stage_items = GaugeMetricFamily('methefor_engine_stage_items',
+                                        'Son döngüde aşamanın işlediği öğe sayısı', labels=['stage'])
+        stage_errors = GaugeMetricFamily('methefor_engine_stage_errors',
+                                         'Son döngüde aşama hata sayısı', labels=['stage'])
+        stage_wait = GaugeMetricFamily('methefor_engine_stage_queue_wait_seconds',
+                                       'Son döngüde aşamanın executor kuyruğunda beklediği süre', labels=['stage'])
+        for row in stages:
+            if row.stage == 'cycle':
+                continue
+            stage_duration.add_metric([row.stage], (row.duration_ms or 0) / 1000)
+            stage_items.add_metric([row.stage], row.items or 0)
+            stage_errors.add_metric([row.stage], row.errors or 0)
+            stage_wait.add_metric([row.stage], (row.queue_wait_ms or 0) / 1000)
+        yield stage_duration
+        yield stage_items
+        yield stage_errors
+        yield stage_wait
+
+
+def register_engine_collector(session_factory):
+    REGISTRY.register(EngineCycleCollector(session_factory))
+
+
+def render_metrics():
+    """(body, content_type) döndür"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
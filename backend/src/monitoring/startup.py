@@ -0,0 +1,66 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Başlangıç Süresi Raporu
+Engine, scheduler ve dashboard açılışını aşamalara böler (import, config, db, modüller...)
+ve açılış bittiğinde tek bir rapor loglar: aşama süreleri, yüklenmiş/ertelenmiş ağır
+modüller ve o ana kadar ilk kullanımda yüklenen lazy modüllerin import süreleri.
+
+Import maliyetinin modül bazında dökümü için:
+    python -X importtime app.py 2> importtime.log
+"""
+
+import logging
+import sys
+import time
+from typing import Dict, List, Optional
+
+from src.lazy_import import LOAD_TIMES
+
+logger = logging.getLogger(__name__)
+
+# Açılışta yüklenmemesi beklenen (ilk kullanıma ertelenen) ağır kütüphaneler
+HEAVY_MODULES = ('pandas', 'numpy', 'yfinance', 'google.generativeai', 'feedparser',
+                 'textblob', 'aiohttp', 'requests')
+
+
+class StartupReport:
+    """Açılış aşamalarını ölç; finish() raporu loglar ve özet dict döndürür"""
+
+    def __init__(self, name: str, started: Optional[float] = None):
+        self.name = name
+        self.started = started if started is not None else time.perf_counter()
+        self._last = self.started
+        self.phases: List[Dict] = []
+        self.total_ms: Optional[float] = None
+
+    def mark(self, phase: str):
+        """Önceki işaretten bu yana geçen süreyi phase adıyla kaydet"""
+        now = time.perf_counter()
+        self.phases.append({'phase': phase, 'duration_ms': round((now - self._last) * 1000, 1)})
+        self._last = now
+
+    def finish(self) -> Dict:
+        if self.total_ms is None:
+            self.total_ms = round((time.perf_counter() - self.started) * 1000, 1)
+            self.log()
+        return self.summary()
+
+    def summary(self) -> Dict:
+        return {
+            'name': self.name,
+            'total_ms': self.total_ms,
+            'phases': list(self.phases),
+            'heavy_loaded': [m for m in HEAVY_MODULES if m in sys.modules],
+            'heavy_deferred': [m for m in HEAVY_MODULES if m not in sys.modules],
+            'lazy_loads_ms': {name: round(seconds * 1000, 1) for name, seconds in LOAD_TIMES.items()}
+        }
+
+    def log(self):
+        summary = self.summary()
+        logger.info(f"[STARTUP] {self.name} {summary['total_ms']:.0f} ms içinde hazır")
+        for item in summary['phases']:
+            logger.info(f"   {item['phase']:<20} {item['duration_ms']:>8.1f} ms")
+        if summary['heavy_loaded']:
+            logger.info(f"   açılışta yüklenen ağır modüller: {', '.join(summary['heavy_loaded'])}")
+        if summary['lazy_loads_ms']:
+            loads = ', '.join(f"{name} {ms:.0f} ms" for name, ms in summary['lazy_loads_ms'].items())
+            logger.info(f"   ilk kullanımda yüklenenler: {loads}")
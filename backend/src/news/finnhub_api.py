@@ -3,8 +3,8 @@ MIDAS PRO v6.0 - Finnhub News API Integration
 Real-time market news ve company news
 """
 
-import requests
-import aiohttp
+from __future__ import annotations
+
 import asyncio
 import json
 import time
@@ -12,18 +12,26 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
 
+from src.providers.replay import get_data_provider
+from src.lazy_import import lazy_import
+
+requests = lazy_import('requests')
+aiohttp = lazy_import('aiohttp')
+
 logger = logging.getLogger(__name__)
 
 
 class FinnhubNewsAPI:
     """Finnhub API ile gerçek zamanlı haber toplama"""
     
-    def __init__(self, api_key: str = None, config_path: str = "config/api_keys.json"):
+    def __init__(self, api_key: str = None, config_path: str = "config/api_keys.json", provider=None):
         """
         Args:
             api_key: Finnhub API key
             config_path: API keys config dosyası
+            provider: Kayıt/tekrar veri sağlayıcısı (verilmezse ortamdan)
         """
+        self.provider = provider or get_data_provider()
         if api_key:
             self.api_key = api_key
         else:
@@ -37,29 +45,63 @@ class FinnhubNewsAPI:
                 self.api_key = ''
         
         self.base_url = "https://finnhub.io/api/v1"
-        self.session = requests.Session()
+        self._session = None  # requests.Session ilk senkron istekte oluşturulur
         
-        if not self.api_key or self.api_key == "YOUR_FINNHUB_API_KEY_HERE":
+        if not self.enabled:
             logger.warning("⚠️ Finnhub API key ayarlanmamış!")
             logger.info("📝 API key almak için: https://finnhub.io/register")
         else:
             logger.info("[OK] Finnhub API başlatıldı")
 
-    async def _fetch_async(self, session, url, params):
-        """Async HTTP request helper"""
-        try:
+    @property
+    def enabled(self) -> bool:
+        """Geçerli API key var mı (replay modunda key gerekmez)"""
+        if self.provider.is_replay:
+            return True
+        return bool(self.api_key) and self.api_key != "YOUR_FINNHUB_API_KEY_HERE"
+
+    @staticmethod
+    def _replay_key(url: str, params: Dict) -> str:
+        """Kayıt anahtarı: token hariç URL + parametreler"""
+        return url + '?' + '&'.join(f"{k}={v}" for k, v in sorted(params.items()) if k != 'token')
+
+    def _get_json(self, url: str, params: Dict, replay_key: str = None):
+        """Senkron HTTP request helper (hata durumunda exception fırlatır)"""
+        def request():
+            if self._session is None:
+                self._session = requests.Session()
+            response = self._session.get(url, params=params, timeout=10)
+            response.raise_for_status()
+            return response.json()
+        
+        return self.provider.fetch('finnhub', replay_key or self._replay_key(url, params), request)
+
+    async def _fetch_async(self, session, url, params, replay_key: str = None, raise_errors: bool = False):
+        """
+        Async HTTP request helper. Hata durumunda None döner; raise_errors=True ise
+        exception çağırana iletilir (her çağrı kendi hatasını ölçebilsin diye).
+        """
+        async def request():
             async with session.get(url, params=params, timeout=10) as response:
                 response.raise_for_status()
                 return await response.json()
+        
+        try:
+            return await self.provider.fetch_async(
+                'finnhub', replay_key or self._replay_key(url, params), request
+            )
         except Exception as e:
             logger.error(f"Async request error ({url}): {e}")
+            if raise_errors:
+                raise
             return None
 
-    async def get_market_news_async(self, session: aiohttp.ClientSession, category: str = "general") -> List[Dict]:
+    async def get_market_news_async(self, session: aiohttp.ClientSession, category: str = "general",
+                                    raise_errors: bool = False) -> List[Dict]:
         """
         Asenkron genel piyasa haberlerini getir
         """
-        if not self.api_key or self.api_key == "YOUR_FINNHUB_API_KEY_HERE":
+        if not self.enabled:
             return self._get_mock_news()
         
         url = f"{self.base_url}/news"
@@ -68,7 +110,7 @@ class FinnhubNewsAPI:
             'token': self.api_key
         }
         
-        data = await self._fetch_async(session, url, params)
+        data = await self._fetch_async(session, url, params, raise_errors=raise_errors)
         if not data:
             return []
             
@@ -86,11 +128,12 @@ class FinnhubNewsAPI:
             })
         return formatted_news
 
-    async def get_company_news_async(self, session: aiohttp.ClientSession, symbol: str, days_back: int = 7) -> List[Dict]:
+    async def get_company_news_async(self, session: aiohttp.ClientSession, symbol: str, days_back: int = 7,
+                                     raise_errors: bool = False) -> List[Dict]:
         """
         Asenkron şirket haberlerini getir
         """
-        if not self.api_key:
+        if not self.enabled:
             return []
         
         to_date = datetime.now()
@@ -104,7 +147,10 @@ class FinnhubNewsAPI:
             'token': self.api_key
         }
         
-        data = await self._fetch_async(session, url, params)
+        # Tarih aralığı her gün değiştiği için kayıt anahtarında gün sayısı kullanılır
+        data = await self._fetch_async(session, url, params,
+                                       replay_key=f"{url}?symbol={symbol.upper()}&days_back={days_back}",
+                                       raise_errors=raise_errors)
         if not data:
             return []
             
@@ -151,7 +197,7 @@ class FinnhubNewsAPI:
         Returns:
             Haber listesi
         """
-        if not self.api_key or self.api_key == "YOUR_FINNHUB_API_KEY_HERE":
+        if not self.enabled:
             logger.warning("API key bulunamadı, örnek veri döndürülüyor")
             return self._get_mock_news()
         
@@ -162,10 +208,7 @@ class FinnhubNewsAPI:
                 'token': self.api_key
             }
             
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            news_items = response.json()
+            news_items = self._get_json(url, params)
             
             # Format'a çevir
             formatted_news = []
@@ -204,7 +247,7 @@ class FinnhubNewsAPI:
         Returns:
             Şirkete özel haberler
         """
-        if not self.api_key or self.api_key == "YOUR_FINNHUB_API_KEY_HERE":
+        if not self.enabled:
             return []
         
         try:
@@ -220,10 +263,8 @@ class FinnhubNewsAPI:
                 'token': self.api_key
             }
             
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            news_items = response.json()
+            news_items = self._get_json(url, params,
+                                         replay_key=f"{url}?symbol={symbol.upper()}&days_back={days_back}")
             
             # Format'a çevir
             formatted_news = []
@@ -311,7 +352,7 @@ class FinnhubNewsAPI:
         Returns:
             Fiyat bilgisi
         """
-        if not self.api_key or self.api_key == "YOUR_FINNHUB_API_KEY_HERE":
+        if not self.enabled:
             return {}
         
         try:
@@ -321,10 +362,7 @@ class FinnhubNewsAPI:
                 'token': self.api_key
             }
             
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self._get_json(url, params)
             
             return {
                 'symbol': symbol.upper(),
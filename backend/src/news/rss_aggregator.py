@@ -3,13 +3,18 @@ MIDAS PRO v5.0 - RSS News Aggregator
 Çoklu kaynaklardan haber toplama ve filtreleme
 """
 
-import feedparser
 import json
 import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
 from pathlib import Path
+from src.config_store import get_watchlist_store
+from src.monitoring.cycle_metrics import NullMetrics
+from src.providers.replay import get_data_provider
+from src.lazy_import import lazy_import
+
+feedparser = lazy_import('feedparser')
 
 # Logging ayarları
 import os
@@ -31,19 +36,28 @@ class RSSNewsAggregator:
     """RSS kaynaklarından haber toplama ve filtreleme sınıfı"""
     
     def __init__(self, config_path: str = "config/news_sources.json", 
-                 watchlist_path: str = "config/watchlist.json"):
+                 watchlist_path: str = "config/watchlist.json",
+                 watchlist_store=None, provider=None):
         """
         Args:
             config_path: Haber kaynakları config dosyası
             watchlist_path: Takip listesi config dosyası
+            watchlist_store: Paylaşılan WatchlistStore (verilmezse watchlist_path'ten alınır)
+            provider: Kayıt/tekrar veri sağlayıcısı (verilmezse ortamdan)
         """
         self.config = self._load_config(config_path)
-        self.watchlist = self._load_config(watchlist_path)
+        self.watchlist_store = watchlist_store or get_watchlist_store(watchlist_path)
+        self.provider = provider or get_data_provider()
         self.news_cache = []
         self.last_update = None
         
         logger.info("RSS News Aggregator başlatıldı")
         
+    @property
+    def watchlist(self) -> dict:
+        """Güncel watchlist (dosya değiştiyse yeniden yüklenir)"""
+        return self.watchlist_store.get()
+
     def _load_config(self, path: str) -> dict:
         """Config dosyasını yükle"""
         try:
@@ -53,29 +67,41 @@ class RSSNewsAggregator:
             logger.error(f"Config yükleme hatası ({path}): {e}")
             return {}
     
-    def fetch_rss_feed(self, feed_url: str, feed_name: str) -> List[Dict]:
+    @staticmethod
+    def _parse_feed(feed_url: str) -> List[Dict]:
+        """Feed'i indir ve yalnızca kullanılan alanları düz dict olarak döndür (kaydedilebilir)"""
+        feed = feedparser.parse(feed_url)
+        return [{
+            'title': entry.get('title', ''),
+            'link': entry.get('link', ''),
+            'published': entry.get('published', ''),
+            'summary': entry.get('summary', '')
+        } for entry in feed.entries]
+    
+    def fetch_rss_feed(self, feed_url: str, feed_name: str, stage=None) -> List[Dict]:
         """
         Tek bir RSS feed'den haberleri çek
         
         Args:
             feed_url: RSS feed URL'i
             feed_name: Feed adı (loglama için)
+            stage: Opsiyonel metrik aşaması (hata sayımı için)
             
         Returns:
             Haber listesi
         """
         try:
             logger.info(f"RSS feed çekiliyor: {feed_name}")
-            feed = feedparser.parse(feed_url)
+            entries = self.provider.fetch('rss', feed_url, lambda: self._parse_feed(feed_url))
             
             news_items = []
-            for entry in feed.entries:
+            for entry in entries:
                 news_item = {
                     'source': feed_name,
-                    'title': entry.get('title', ''),
-                    'link': entry.get('link', ''),
-                    'published': entry.get('published', ''),
-                    'summary': entry.get('summary', ''),
+                    'title': entry['title'],
+                    'link': entry['link'],
+                    'published': entry['published'],
+                    'summary': entry['summary'],
                     'timestamp': datetime.now().isoformat()
                 }
                 news_items.append(news_item)
@@ -85,15 +111,22 @@ class RSSNewsAggregator:
             
         except Exception as e:
             logger.error(f"[ERROR] RSS feed hatası ({feed_name}): {e}")
+            if stage is not None:
+                stage.add_error()
             return []
     
-    def fetch_all_feeds(self) -> List[Dict]:
+    def fetch_all_feeds(self, metrics=None, on_feed=None) -> List[Dict]:
         """
         Tüm RSS kaynaklarından haberleri çek
         
+        Args:
+            metrics: Opsiyonel CycleMetrics (her feed 'news.rss.<ad>' aşaması olarak ölçülür)
+            on_feed: Verilirse her feed'in haberleri çekilir çekilmez on_feed(news_items) ile iletilir
+            
         Returns:
             Toplanan tüm haberler
         """
+        metrics = metrics or NullMetrics()
         all_news = []
         
         if 'news_sources' not in self.config:
@@ -114,7 +147,9 @@ class RSSNewsAggregator:
                     continue
                 
                 # Feed'i çek
-                news_items = self.fetch_rss_feed(feed_url, feed_name)
+                with metrics.stage(f'news.rss.{feed_name}') as stage:
+                    news_items = self.fetch_rss_feed(feed_url, feed_name, stage=stage)
+                    stage.add_items(len(news_items))
                 
                 # Kategori ve öncelik bilgilerini ekle
                 for item in news_items:
@@ -123,9 +158,11 @@ class RSSNewsAggregator:
                     item['keywords'] = feed.get('keywords', [])
                 
                 all_news.extend(news_items)
+                if on_feed is not None and news_items:
+                    on_feed(news_items)
                 
                 # Rate limiting - API'leri yormamak için
-                time.sleep(1)
+                self.provider.rate_limit(1)
         
         self.news_cache = all_news
         self.last_update = datetime.now()
@@ -8,8 +8,10 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from pathlib import Path
-import requests
 from datetime import datetime
+from src.lazy_import import lazy_import
+
+requests = lazy_import('requests')
 
 class NotificationManager:
     def __init__(self, base_dir, socketio=None):
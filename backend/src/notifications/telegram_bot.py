@@ -3,11 +3,13 @@ MIDAS PRO v6.0 - Telegram Bot Integration
 Anlık sinyal bildirimleri ve komut sistemi
 """
 
-import requests
 import json
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional
+from src.lazy_import import lazy_import
+
+requests = lazy_import('requests')
 
 logger = logging.getLogger(__name__)
 
@@ -0,0 +1,82 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Akış (Streaming) Pipeline Yardımcıları
+Engine aşamaları sınırlı asyncio kuyruklarıyla birbirine bağlanır:
+üretici kuyruk doluysa bekler (backpressure), tüketici öğeleri geldikçe işler.
+
+- END: kuyruğun kapandığını bildiren işaret
+- queue_items(): END gelene kadar öğeleri döndüren async iterator
+- put_threadsafe(): executor thread'inden kuyruğa (backpressure'a uyarak) öğe koy
+- batch_consumer(): öğeleri boyut veya süre dolunca toplu işleyen tüketici
+- run_stages(): aşamaları birlikte çalıştır; biri çökerse diğerlerini iptal et
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List
+
+logger = logging.getLogger(__name__)
+
+# Kuyruk sonu işareti
+END = object()
+
+
+async def queue_items(queue: asyncio.Queue):
+    """END gelene kadar kuyruktaki öğeleri sırayla döndür"""
+    while True:
+        item = await queue.get()
+        if item is END:
+            return
+        yield item
+
+
+def put_threadsafe(queue: asyncio.Queue, item, loop: asyncio.AbstractEventLoop):
+    """
+    Worker thread'inden kuyruğa öğe koy. Kuyruk doluysa thread bekler;
+    böylece yavaş tüketici, executor'daki üreticiyi de yavaşlatır.
+    """
+    asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+
+async def batch_consumer(queue: asyncio.Queue, flush: Callable[[List], Awaitable],
+                         batch_size: int, interval: float):
+    """
+    Kuyruktaki öğeleri biriktir; batch_size'a ulaşınca veya ilk öğeden bu yana
+    interval saniye geçince flush(batch) çağır. END geldiğinde kalanlar yazılır.
+    """
+    batch = []
+    deadline = None
+    while True:
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        try:
+            item = await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            item = None
+
+        done = item is END
+        if item is not None and not done:
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + interval
+
+        if batch and (done or len(batch) >= batch_size or time.monotonic() >= deadline):
+            await flush(batch)
+            batch = []
+            deadline = None
+        if done:
+            return
+
+
+async def run_stages(*coros):
+    """
+    Aşamaları eşzamanlı çalıştır. Bir aşama hata verirse diğerleri iptal edilir
+    (aksi halde dolu kuyruğa yazmaya çalışan üretici sonsuza kadar bekler).
+    """
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -0,0 +1,222 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Kayıt/Tekrar Veri Sağlayıcısı
+Dış kaynak çağrıları (Yahoo, Finnhub, RSS, Gemini) bu katmandan geçer:
+- live:   doğrudan kaynağa gider (varsayılan)
+- record: kaynağa gider ve yanıtı diske yazar
+- replay: yanıtı diskten okur, ağa hiç çıkmaz; isteğe bağlı yapay gecikme eklenir
+
+Ortam değişkenleri:
+    METHEFOR_DATA_MODE=live|record|replay
+    METHEFOR_REPLAY_DIR=data/replay
+    METHEFOR_REPLAY_LATENCY_MS="20-80,yahoo.history=150-400,gemini=800"
+        (kaynak adı öneki bazında sabit veya min-max aralığı; öneksiz değer varsayılan)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from src.lazy_import import lazy_import
+from src.serialization import to_json
+
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+MODES = ('live', 'record', 'replay')
+DEFAULT_REPLAY_DIR = Path(__file__).resolve().parent.parent.parent / 'data' / 'replay'
+
+
+class ReplayMiss(LookupError):
+    """Replay modunda istenen çağrının kaydı yok"""
+
+
+def parse_latency(spec: Optional[str]) -> Dict[str, Tuple[float, float]]:
+    """
+    "20-80,yahoo.history=150-400,gemini=800" -> {'': (20, 80), 'yahoo.history': (150, 400), 'gemini': (800, 800)}
+    """
+    latency = {}
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        source, _, value = part.rpartition('=')
+        low, _, high = value.partition('-')
+        try:
+            low = float(low)
+            high = float(high) if high else low
+        except ValueError:
+            logger.warning(f"Geçersiz gecikme tanımı yok sayıldı: {part}")
+            continue
+        latency[source.strip()] = (min(low, high), max(low, high))
+    return latency
+
+
+def _encode(value):
+    """Kaydedilecek değeri JSON'a uygun hale getir (DataFrame'ler etiketlenir)"""
+    if isinstance(value, pd.DataFrame):
+        index = value.index
+        tz = str(index.tz) if getattr(index, 'tz', None) is not None else None
+        return {
+            '__dataframe__': True,
+            'tz': tz,
+            'index': [ts.isoformat() for ts in index],
+            'columns': list(value.columns),
+            'data': value.to_numpy().tolist()
+        }
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict) and value.get('__dataframe__'):
+        index = pd.to_datetime(value['index'], utc=True) if value['index'] else pd.DatetimeIndex([])
+        if value.get('tz'):
+            index = index.tz_convert(value['tz'])
+        columns = value['columns']
+        if columns and isinstance(columns[0], list):
+            # Çok seviyeli kolonlar (örn. yf.download: (alan, sembol)) liste olarak yazılır
+            columns = pd.MultiIndex.from_tuples([tuple(c) for c in columns])
+        return pd.DataFrame(value['data'], index=index, columns=columns)
+    return value
+
+
+class DataProvider:
+    """Kaynak + anahtar bazında kayıt/tekrar yapan çağrı sarmalayıcı"""
+
+    def __init__(self, mode: str = 'live', replay_dir=None, latency: Optional[Dict] = None,
+                 seed: Optional[int] = None):
+        if mode not in MODES:
+            raise ValueError(f"Geçersiz veri modu: {mode} ({', '.join(MODES)})")
+        self.mode = mode
+        self.replay_dir = Path(replay_dir) if replay_dir else DEFAULT_REPLAY_DIR
+        self.latency = latency or {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'live': 0, 'recorded': 0, 'replayed': 0, 'misses': 0}
+        if mode != 'live':
+            logger.info(f"[PROVIDER] Veri modu: {mode} ({self.replay_dir})")
+
+    @property
+    def is_replay(self) -> bool:
+        return self.mode == 'replay'
+
+    # ---- disk ----
+
+    def _path(self, source: str, key: str) -> Path:
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+        return self.replay_dir / source / f"{digest}.json"
+
+    def _load(self, source: str, key: str):
+        path = self._path(source, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.stats['misses'] += 1
+            raise ReplayMiss(f"{source}: kayıt yok ({key[:120]})")
+        with self._lock:
+            self.stats['replayed'] += 1
+        return _decode(entry['payload'])
+
+    def _save(self, source: str, key: str, value):
+        path = self._path(source, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            'source': source,
+            'key': key,
+            'recorded_at': datetime.now().isoformat(),
+            'payload': _encode(value)
+        }
+        tmp = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp.write_text(to_json(entry), encoding='utf-8')
+        os.replace(tmp, path)
+        with self._lock:
+            self.stats['recorded'] += 1
+
+    # ---- gecikme ----
+
+    def _latency_seconds(self, source: str) -> float:
+        # En uzun eşleşen önek kazanır ('yahoo.history' > 'yahoo' > '')
+        best = None
+        for prefix in self.latency:
+            if (prefix == '' or source == prefix or source.startswith(prefix + '.')) and \
+                    (best is None or len(prefix) > len(best)):
+                best = prefix
+        if best is None:
+            return 0.0
+        low, high = self.latency[best]
+        with self._lock:
+            return self._rng.uniform(low, high) / 1000
+
+    # ---- çağrı ----
+
+    def fetch(self, source: str, key: str, fetch_fn: Callable):
+        """
+        Senkron çağrı. live/record modunda fetch_fn() çalıştırılır;
+        replay modunda kayıt döner (yoksa ReplayMiss).
+        """
+        if self.mode == 'replay':
+            delay = self._latency_seconds(source)
+            if delay:
+                time.sleep(delay)
+            return self._load(source, key)
+
+        value = fetch_fn()
+        if self.mode == 'record':
+            self._save(source, key, value)
+        else:
+            with self._lock:
+                self.stats['live'] += 1
+        return value
+
+    async def fetch_async(self, source: str, key: str, fetch_coro_fn: Callable):
+        """fetch'in async hali; fetch_coro_fn çağrıldığında coroutine döndürmeli"""
+        if self.mode == 'replay':
+            delay = self._latency_seconds(source)
+            if delay:
+                await asyncio.sleep(delay)
+            return self._load(source, key)
+
+        value = await fetch_coro_fn()
+        if self.mode == 'record':
+            self._save(source, key, value)
+        else:
+            with self._lock:
+                self.stats['live'] += 1
+        return value
+
+    def rate_limit(self, seconds: float):
+        """Kaynağa nezaket beklemesi; replay'de ağ olmadığı için atlanır (gecikmeyi latency modeller)"""
+        if self.mode != 'replay':
+            time.sleep(seconds)
+
+
+_default_provider = None
+_default_lock = threading.Lock()
+
+
+def get_data_provider() -> DataProvider:
+    """Ortam değişkenlerinden oluşturulan süreç içi varsayılan sağlayıcı"""
+    global _default_provider
+    with _default_lock:
+        if _default_provider is None:
+            mode = os.getenv('METHEFOR_DATA_MODE', 'live').lower()
+            if mode not in MODES:
+                logger.warning(f"Geçersiz METHEFOR_DATA_MODE={mode}, live kullanılacak")
+                mode = 'live'
+            _default_provider = DataProvider(
+                mode=mode,
+                replay_dir=os.getenv('METHEFOR_REPLAY_DIR') or None,
+                latency=parse_latency(os.getenv('METHEFOR_REPLAY_LATENCY_MS')),
+                seed=int(os.getenv('METHEFOR_REPLAY_SEED', '0'))
+            )
+        return _default_provider
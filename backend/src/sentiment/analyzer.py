@@ -310,6 +310,51 @@ class SentimentAnalyzer:
         print("="*60 + "\n")
 
 
+class RunningSentiment:
+    """
+    Haberler geldikçe güncellenen sembol bazlı sentiment toplamları.
+    get() değerleri get_symbol_sentiment ile aynı formülle hesaplanır
+    (güven ağırlıklı ortalama), ancak tüm haber listesini beklemeden.
+    """
+
+    def __init__(self):
+        # sembol -> [skor*güven toplamı, güven toplamı, skor toplamı, haber sayısı]
+        self._totals: Dict[str, List[float]] = {}
+        self.version = 0
+
+    def add(self, news_items: List[Dict]):
+        """Sentiment'i hesaplanmış ve sembolle eşleşmiş haberleri ekle"""
+        for item in news_items:
+            symbol = (item.get('matched_symbol') or '').upper()
+            if not symbol:
+                continue
+            sentiment = item.get('sentiment', {})
+            score = sentiment.get('score', 0)
+            confidence = sentiment.get('confidence', 0)
+            totals = self._totals.setdefault(symbol, [0.0, 0.0, 0.0, 0])
+            totals[0] += score * confidence
+            totals[1] += confidence
+            totals[2] += score
+            totals[3] += 1
+            self.version += 1
+
+    def news_count(self, symbol: str) -> int:
+        totals = self._totals.get(symbol.upper())
+        return totals[3] if totals else 0
+
+    def get(self, symbol: str) -> Dict:
+        totals = self._totals.get(symbol.upper())
+        if not totals:
+            return {'overall_sentiment': 0.0, 'avg_confidence': 0.0, 'news_count': 0}
+        weighted, confidence, score, count = totals
+        overall = weighted / confidence if confidence > 0 else score / count
+        return {
+            'overall_sentiment': round(overall, 3),
+            'avg_confidence': round(confidence / count, 1),
+            'news_count': count
+        }
+
+
 def main():
     """Test fonksiyonu"""
     print("=== MIDAS PRO v5.0 - Sentiment Analyzer Test ===\n")
@@ -0,0 +1,115 @@
+"""
+METHEFOR FİNANSAL ÖZGÜRLÜK - Serileştirme Katmanı
+API, Socket.IO ve veritabanı JSON alanları için ortak encoder.
+- orjson kuruluysa: NumPy tiplerini doğrudan serileştiren hızlı JSON
+- Değilse: standart json + NumpyEncoder
+- msgpack kuruluysa: opsiyonel ikili (binary) format
+"""
+
+import json
+from datetime import date, datetime
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    HAS_ORJSON = False
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    msgpack = None
+    HAS_MSGPACK = False
+
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+def _convert_numpy(obj):
+    """NumPy skaler/dizilerini yerleşik Python tiplerine çevir. Desteklenmiyorsa TypeError."""
+    import numpy as np
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class NumpyEncoder(json.JSONEncoder):
+    """NumPy types encoder for JSON (orjson yoksa kullanılır)"""
+    def default(self, obj):
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        try:
+            return _convert_numpy(obj)
+        except TypeError:
+            return super(NumpyEncoder, self).default(obj)
+
+
+if HAS_ORJSON:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj) -> bytes:
+        """Objeyi JSON byte dizisine çevir"""
+        return orjson.dumps(obj, default=_convert_numpy, option=_ORJSON_OPTIONS)
+
+    def loads(data):
+        """
+        JSON (str/bytes) çöz. orjson NaN/Infinity kabul etmez; eski kayıtlar
+        (stdlib json ile yazılmış technical_results.details gibi) standart json ile çözülür.
+        Yeni kayıtlarda NaN null olarak yazılır.
+        """
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+else:
+    def dumps(obj) -> bytes:
+        """Objeyi JSON byte dizisine çevir"""
+        return json.dumps(obj, cls=NumpyEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(data):
+        """JSON (str/bytes) çöz"""
+        return json.loads(data)
+
+
+def to_json(obj) -> str:
+    """Objeyi JSON metnine çevir (veritabanı alanları ve Socket.IO paketleri için)"""
+    return dumps(obj).decode('utf-8')
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return _convert_numpy(obj)
+
+
+def packb(obj) -> bytes:
+    """Objeyi MessagePack formatına çevir. msgpack kurulu değilse RuntimeError."""
+    if not HAS_MSGPACK:
+        raise RuntimeError("msgpack kurulu değil")
+    return msgpack.packb(obj, default=_msgpack_default, use_bin_type=True)
+
+
+def unpackb(data):
+    """MessagePack verisini çöz"""
+    if not HAS_MSGPACK:
+        raise RuntimeError("msgpack kurulu değil")
+    return msgpack.unpackb(data, raw=False)
+
+
+class SocketIOJSON:
+    """python-socketio'nun beklediği json modülü arayüzü (dumps/loads)"""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        return to_json(obj)
+
+    @staticmethod
+    def loads(data, *args, **kwargs):
+        return loads(data)
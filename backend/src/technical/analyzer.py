@@ -3,14 +3,18 @@ MIDAS PRO v6.0 - Technical Analysis Module
 RSI, MACD, Volume, Moving Averages ve daha fazlası
 """
 
-import yfinance as yf
-import pandas as pd
-import numpy as np
+from __future__ import annotations
+
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-import ta
 import logging
 from src.technical.patterns import PatternRecognizer
+from src.providers.replay import get_data_provider
+from src.lazy_import import lazy_import
+
+yf = lazy_import('yfinance')
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
 
 logger = logging.getLogger(__name__)
 
@@ -18,8 +22,12 @@ logger = logging.getLogger(__name__)
 class TechnicalAnalyzer:
     """Teknik analiz göstergeleri hesaplama"""
     
-    def __init__(self):
+    def __init__(self, provider=None):
         self.pattern_recognizer = PatternRecognizer()
+        # Yahoo çağrıları kayıt/tekrar sağlayıcısından geçer
+        self.provider = provider or get_data_provider()
+        # Son çekilen OHLCV verisi (engine bunu price_bars önbelleğine yazar)
+        self.last_history = {}
         """Initialize technical analyzer"""
         logger.info("[OK] Technical Analyzer başlatıldı")
     
@@ -36,8 +44,10 @@ class TechnicalAnalyzer:
             DataFrame with OHLCV data
         """
         try:
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period=period, interval=interval)
+            data = self.provider.fetch(
+                'yahoo.history', f"{symbol}|{period}|{interval}",
+                lambda: yf.Ticker(symbol).history(period=period, interval=interval)
+            )
             
             if data.empty:
                 logger.warning(f"{symbol}: Veri bulunamadı")
@@ -229,6 +239,21 @@ class TechnicalAnalyzer:
             logger.error(f"Bollinger Bands hatası: {e}")
             return {}
     
+    def detect_whale_activity(self, data: pd.DataFrame, volume_metrics: Dict, threshold: float = 3.0) -> Dict:
+        """
+        Son mumdaki hacim ortalamanın threshold katını aşıyorsa balina hareketi say
+        
+        Returns:
+            {'detected': bool, 'type': str, 'volume_ratio': float}
+        """
+        volume_ratio = volume_metrics.get('volume_ratio', 0) if volume_metrics else 0
+        if data.empty or volume_ratio < threshold:
+            return {'detected': False, 'type': None, 'volume_ratio': volume_ratio}
+        
+        last = data.iloc[-1]
+        whale_type = 'Alım Balinası' if last['Close'] >= last['Open'] else 'Satış Balinası'
+        return {'detected': True, 'type': whale_type, 'volume_ratio': volume_ratio}
+    
     def analyze_dataframe(self, symbol: str, data: pd.DataFrame) -> Dict:
         """
         Verilen DataFrame üzerinde teknik analiz yap (Backtest için uygun)
@@ -262,6 +287,10 @@ class TechnicalAnalyzer:
             # Bollinger Bands
             bb_metrics = self.calculate_bollinger_bands(data)
             
+            # Mum formasyonları ve olağandışı hacim
+            patterns = self.pattern_recognizer.check_patterns(data)
+            whale_alert = self.detect_whale_activity(data, volume_metrics)
+            
             # Price change
             price_change_1d = ((data['Close'].iloc[-1] / data['Close'].iloc[-2] - 1) * 100) if len(data) >= 2 else 0
             price_change_5d = ((data['Close'].iloc[-1] / data['Close'].iloc[-6] - 1) * 100) if len(data) >= 6 else 0
@@ -300,14 +329,26 @@ class TechnicalAnalyzer:
                 'bollinger_bands': bb_metrics,
                 'technical_signals': signals,
                 'overall_score': signals['score'],
-                'whale_alert': whale_alert, # Yeni eklenen alan
-                'patterns': patterns # Placeholder for patterns, as it was in the original return
+                'whale_alert': whale_alert,
+                'patterns': patterns
             }
             
         except Exception as e:
             logger.error(f"{symbol} analiz hatası: {e}")
             return {'error': str(e)}
 
+    def fetch_history(self, symbol: str, period: str = "1y") -> pd.DataFrame:
+        """
+        Canlı analiz için geçmiş veriyi çek (ağ kısmı; analyze_dataframe'den ayrı ölçülebilsin diye)
+        """
+        hist = self.provider.fetch(
+            'yahoo.history', f"{symbol}|{period}|1d",
+            lambda: yf.Ticker(symbol).history(period=period)
+        )
+        if not hist.empty:
+            self.last_history[symbol] = hist
+        return hist
+
     def analyze_symbol(self, symbol: str, period: str = "3mo") -> Dict:
         """
         Bir sembol için canlı teknik analiz yap
@@ -318,10 +359,7 @@ class TechnicalAnalyzer:
         try:
             # yfinance bazen sembol bulunsa bile 'no data' hatası verebiliyor
             # veya internal index error fırlatabiliyor.
-            ticker = yf.Ticker(symbol)
-            
-            # Geçmiş verisi (1 yıl)
-            hist = ticker.history(period="1y")
+            hist = self.fetch_history(symbol)
             
             if hist.empty:
                 logger.warning(f"No historical data for {symbol}")
@@ -1,5 +1,9 @@
-import pandas as pd
-import numpy as np
+from __future__ import annotations
+
+from src.lazy_import import lazy_import
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
 
 class PatternRecognizer:
     def __init__(self):
@@ -22,7 +22,7 @@ import { Portfolio, Signal } from './types';
 import { fadeIn, slideIn } from './utils/animations';
 
 const App = () => {
-  const { signals, news, portfolio, settings, status } = useSocket();
+  const { signals, news, portfolio, settings, status, socket } = useSocket();
   const [activeTab, setActiveTab] = useState('signals');
   const [selectedSignal, setSelectedSignal] = useState<Signal | null>(null);
   const [searchTerm, setSearchTerm] = useState('');
@@ -229,7 +229,7 @@ const App = () => {
       )}
 
       {/* Floating Chat */}
-      <ChatPanel />
+      <ChatPanel socket={socket} />
     </div>
   );
 };
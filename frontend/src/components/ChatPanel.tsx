@@ -1,14 +1,20 @@
 import axios from 'axios';
 import { Bot, MessageSquare, Send, Sparkles, X } from 'lucide-react';
 import { useEffect, useRef, useState } from 'react';
+import { Socket } from 'socket.io-client';
 import { popIn } from '../utils/animations';
 
 interface Message {
+  id?: string;
   role: 'user' | 'ai';
   content: string;
 }
 
-export const ChatPanel = () => {
+interface ChatPanelProps {
+  socket: Socket | null;
+}
+
+export const ChatPanel = ({ socket }: ChatPanelProps) => {
   const [isOpen, setIsOpen] = useState(false);
   const [messages, setMessages] = useState<Message[]>([
     { role: 'ai', content: 'Merhaba! Ben Methefor Asistanı. Finansal veriler ve sistem durumu hakkında sana nasıl yardımcı olabilirim?' }
@@ -17,6 +23,50 @@ export const ChatPanel = () => {
   const [loading, setLoading] = useState(false);
   const scrollRef = useRef<HTMLDivElement>(null);
   const chatWindowRef = useRef<HTMLDivElement>(null);
+  const pendingRef = useRef<string | null>(null);
+
+  // Yanıtlar useSocket'in bağlantısı üzerinden parça parça gelir (bağlantı yoksa REST'e düşülür)
+  useEffect(() => {
+    if (!socket) return;
+
+    const chunk = ({ request_id, text }: { request_id: string; text: string }) => {
+      setMessages(prev => prev.some(m => m.id === request_id)
+        ? prev.map(m => m.id === request_id ? { ...m, content: m.content + text } : m)
+        : [...prev, { id: request_id, role: 'ai', content: text }]);
+    };
+
+    const finish = ({ request_id }: { request_id: string }) => {
+      if (pendingRef.current === request_id) {
+        pendingRef.current = null;
+        setLoading(false);
+      }
+    };
+    const error = (payload: { request_id: string; error: string }) => {
+      setMessages(prev => [...prev, { role: 'ai', content: `❌ ${payload.error}` }]);
+      finish(payload);
+    };
+
+    socket.on('chat_chunk', chunk);
+    socket.on('chat_done', finish);
+    socket.on('chat_error', error);
+
+    // Bağlantı useSocket'e ait; burada yalnızca dinleyiciler kaldırılır
+    return () => {
+      socket.off('chat_chunk', chunk);
+      socket.off('chat_done', finish);
+      socket.off('chat_error', error);
+    };
+  }, [socket]);
+
+  const closePanel = () => {
+    // Okunmayacak yanıtın üretimini durdur
+    if (pendingRef.current && socket) {
+      socket.emit('chat_cancel', { request_id: pendingRef.current });
+      pendingRef.current = null;
+      setLoading(false);
+    }
+    setIsOpen(false);
+  };
 
   useEffect(() => {
     if (scrollRef.current) {
@@ -38,6 +88,13 @@ export const ChatPanel = () => {
     setInput('');
     setLoading(true);
 
+    if (socket?.connected) {
+      const requestId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 8)}`;
+      pendingRef.current = requestId;
+      socket.emit('chat_message', { message: input, request_id: requestId });
+      return;
+    }
+
     try {
       const res = await axios.post('/api/chat', { message: input });
       setMessages(prev => [...prev, { role: 'ai', content: res.data.response }]);
@@ -84,7 +141,7 @@ export const ChatPanel = () => {
               </div>
             </div>
             <button 
-              onClick={() => setIsOpen(false)} 
+              onClick={closePanel} 
               className="w-10 h-10 border border-dark-bg/10 rounded-xl flex items-center justify-center hover:bg-dark-bg/10 transition-all"
             >
               <X size={20} />
@@ -104,7 +161,7 @@ export const ChatPanel = () => {
                 </div>
               </div>
             ))}
-            {loading && (
+            {loading && !messages.some(m => m.id && m.id === pendingRef.current) && (
               <div className="flex justify-start">
                 <div className="bg-white/5 border border-white/5 p-5 rounded-[24px] rounded-tl-none">
                   <div className="flex gap-2">
@@ -19,6 +19,8 @@ export const useSocket = () => {
     status: 'connecting'
   });
   const socketRef = useRef<Socket | null>(null);
+  // Sayfa başına tek bağlantı; diğer bileşenler (ör. ChatPanel) olaylarını bu sokete bağlar
+  const [socket, setSocket] = useState<Socket | null>(null);
 
   useEffect(() => {
     const socket = io('/', {
@@ -27,6 +29,7 @@ export const useSocket = () => {
       withCredentials: true
     });
     socketRef.current = socket;
+    setSocket(socket);
 
     socket.on('connect', () => {
       console.log('Socket connected');
@@ -54,6 +57,17 @@ export const useSocket = () => {
       }));
     });
 
+    // Engine'in arka planda ürettiği AI açıklamaları (yalnızca değişen sinyaller)
+    socket.on('signal_explanations', (update: { updates: { id: number; symbol: string; ai_explanation: string }[] }) => {
+      setData(prev => ({
+        ...prev,
+        signals: prev.signals.map(signal => {
+          const match = update.updates.find(u => u.symbol === signal.symbol && u.id === signal.id);
+          return match ? { ...signal, ai_explanation: match.ai_explanation } : signal;
+        })
+      }));
+    });
+
     socket.on('disconnect', () => {
       setData(prev => ({ ...prev, status: 'disconnected' }));
     });
@@ -69,5 +83,5 @@ export const useSocket = () => {
     }
   };
 
-  return { ...data, requestUpdate };
+  return { ...data, socket, requestUpdate };
 };
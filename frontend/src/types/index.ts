@@ -1,4 +1,5 @@
 export interface Signal {
+  id?: number;
   symbol: string;
   decision: 'STRONG BUY' | 'BUY' | 'HOLD' | 'SELL' | 'STRONG SELL';
   combined_score: number;